@@ -0,0 +1,288 @@
+"""
+Rolling-origin backtesting for forecasting ensembles
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import CashFlowForecaster, ModelType, thread_limits
+
+logger = logging.getLogger(__name__)
+
+# Worker-process copy of the shared feature matrix, set once per worker
+_FOLD_DATA: Dict[str, Any] = {}
+
+
+@dataclass
+class BacktestResult:
+    """Backtest predictions, actuals, metrics and per-fold member costs over all cutoffs"""
+    cutoffs: np.ndarray
+    actuals: np.ndarray
+    predictions: Dict[str, np.ndarray]
+    metrics: Dict[str, Dict[str, float]]
+    # Mean seconds per fold to train and forecast with each member
+    costs: Dict[str, float] = field(default_factory=dict)
+    z_score: float = 1.96
+
+    def residuals(self, member: str = 'ensemble') -> np.ndarray:
+        """(n_cutoffs, horizon) actual minus predicted values"""
+        return self.actuals - self.predictions[member]
+
+    def members(self) -> List[str]:
+        """Members with predictions at every cutoff"""
+        return [name for name, values in self.predictions.items()
+                if name != 'ensemble' and not np.isnan(values).any()]
+
+    def subset(self, members: Sequence[str]) -> 'BacktestResult':
+        """
+        The result an ensemble of only these members would have had. A
+        recursive ensemble path is kept for the full member set; a smaller
+        set is approximated by the mean of its member paths.
+        """
+        predictions = {name: self.predictions[name] for name in members}
+        ensemble = self.predictions.get('ensemble') if set(members) == set(self.members()) else None
+        predictions, metrics = ensemble_metrics(predictions, self.actuals, self.z_score, ensemble)
+        return BacktestResult(cutoffs=self.cutoffs, actuals=self.actuals, predictions=predictions,
+                              metrics=metrics, costs={name: self.costs[name] for name in members
+                                                      if name in self.costs},
+                              z_score=self.z_score)
+
+    def flat_metrics(self) -> Dict[str, float]:
+        """Ensemble metrics at the top level, members prefixed by their name"""
+        flat = dict(self.metrics.get('ensemble', {}))
+        for member, metrics in self.metrics.items():
+            if member != 'ensemble':
+                flat.update({f'{member}_{name}': value for name, value in metrics.items()})
+        return flat
+
+
+def compute_metrics(predictions: np.ndarray, actuals: np.ndarray,
+                    lower: Optional[np.ndarray] = None,
+                    upper: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """MAE/MSE/RMSE/R2/MAPE (and interval coverage) over all cutoffs and horizon steps at once"""
+    errors = predictions - actuals
+    mse = float(np.mean(errors ** 2))
+    nonzero = actuals != 0
+    variance = float(np.var(actuals))
+    metrics = {
+        'mae': float(np.mean(np.abs(errors))),
+        'mse': mse,
+        'rmse': float(np.sqrt(mse)),
+        'r2': 1.0 - mse / variance if variance > 0 else 0.0,
+        'mape': float(np.mean(np.abs(errors[nonzero] / actuals[nonzero])) * 100) if nonzero.any() else 0.0,
+    }
+    if lower is not None and upper is not None:
+        metrics['coverage'] = float(np.mean((actuals >= lower) & (actuals <= upper)))
+    return metrics
+
+
+def ensemble_metrics(predictions: Dict[str, np.ndarray], actuals: np.ndarray,
+                     z_score: float = 1.96, ensemble: Optional[np.ndarray] = None
+                     ) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, float]]]:
+    """
+    Add the ensemble to member predictions and compute everyone's metrics.
+    The ensemble is the given prediction (the ensemble's own recursive path)
+    when it has no failed folds, else the mean of the members without any.
+    """
+    predictions = dict(predictions)
+    usable = [values for values in predictions.values() if not np.isnan(values).any()]
+    if usable:
+        members = np.stack(usable)
+        if ensemble is not None and not np.isnan(ensemble).any():
+            predictions['ensemble'] = ensemble
+        else:
+            predictions['ensemble'] = members.mean(axis=0)
+        spread = members.std(axis=0)
+    else:
+        predictions['ensemble'] = np.full_like(actuals, np.nan)
+        spread = np.zeros_like(actuals)
+
+    metrics = {}
+    for name, member_predictions in predictions.items():
+        if np.isnan(member_predictions).any():
+            continue
+        if name == 'ensemble':
+            # Coverage of the ensemble-spread band, for comparison with calibrated intervals
+            metrics[name] = compute_metrics(member_predictions, actuals,
+                                            member_predictions - z_score * spread,
+                                            member_predictions + z_score * spread)
+        else:
+            metrics[name] = compute_metrics(member_predictions, actuals)
+    return predictions, metrics
+
+
+def _init_fold_worker(data: Dict[str, Any]) -> None:
+    _FOLD_DATA.update(data)
+
+
+def _fit_member(forecaster: CashFlowForecaster, model_type: ModelType,
+                X_train: np.ndarray, y_train: np.ndarray, n_jobs: int) -> Any:
+    model = forecaster.build_model(model_type, n_jobs=n_jobs)
+    if model_type == ModelType.LINEAR_REGRESSION:
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler().fit(X_train)
+        forecaster.scalers[model_type] = scaler
+        return model.fit(scaler.transform(X_train), y_train)
+    with thread_limits(n_jobs):
+        return model.fit(X_train, y_train)
+
+
+def _run_fold(model_config: Dict, model_params: Dict, model_types: List[ModelType],
+              cutoff: int, horizon: int, n_jobs: int, mode: str,
+              data: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Train every member on rows before cutoff and predict the next horizon rows
+    in the given BacktestEngine mode. Returns the predictions, the seconds
+    each member took and, in recursive mode, the path of the whole ensemble
+    fed its own predictions (NaN if a member failed or in other modes).
+    """
+    data = _FOLD_DATA if data is None else data
+    values, target, columns = data['values'], data['target'], data['columns']
+    X_train = values[:cutoff]
+    y_train = target[:cutoff]
+
+    forecaster = CashFlowForecaster(model_config)
+    forecaster.model_params = model_params
+    forecaster.feature_columns = columns
+    forecaster.target_col = data['target_col']
+    forecaster.is_trained = True
+    history = data['frame'].iloc[:data['rows'][cutoff]] if mode != 'observed' else None
+
+    predictions = np.full((len(model_types), horizon), np.nan)
+    ensemble = np.full(horizon, np.nan)
+    seconds = np.zeros(len(model_types))
+    fitted = {}
+    for i, model_type in enumerate(model_types):
+        started = time.perf_counter()
+        try:
+            model = _fit_member(forecaster, model_type, X_train, y_train, n_jobs)
+            fitted[model_type] = model
+            forecaster.models = {model_type: model}
+            if mode == 'recursive':
+                predictions[i] = forecaster.recursive_predict(history, horizon)[0]
+            elif mode == 'direct':
+                predictions[i] = forecaster.predict(forecaster.future_features(history, horizon),
+                                                    model_type)
+            else:
+                predictions[i] = forecaster.predict(values[cutoff:cutoff + horizon], model_type)
+        except Exception as e:
+            logger.warning(f"Backtest fold at {cutoff} failed for {model_type.value}: {str(e)}")
+        seconds[i] = time.perf_counter() - started
+
+    # The mean of member paths is not what forecast() produces: recursively,
+    # every member is fed the ensemble's prediction, not its own
+    if mode == 'recursive' and len(fitted) == len(model_types) and not np.isnan(predictions).any():
+        forecaster.models = fitted
+        try:
+            ensemble = forecaster.recursive_predict(history, horizon)[0]
+        except Exception as e:
+            logger.warning(f"Backtest fold at {cutoff} failed for the ensemble: {str(e)}")
+    return predictions, seconds, ensemble
+
+
+class BacktestEngine:
+    """
+    Rolling-origin evaluation of each ensemble member and the ensemble.
+
+    The feature matrix is built once and every cutoff trains on a prefix
+    slice of it. Each member then forecasts the next `horizon` days from the
+    history before the cutoff exactly as forecast() does, recursively in
+    'recursive' mode (the default) or from future_features() in 'direct'
+    mode, so the residuals reflect real forecast errors of that mode;
+    'observed' mode predicts from the observed features of those days
+    instead, which is cheaper but optimistic. The ensemble prediction is
+    the ensemble's own recursive path in 'recursive' mode (the mean of the
+    member paths if a member failed a fold) and the mean of the member
+    predictions otherwise, so its residuals are those of the predictor
+    forecast() uses. Folds run in a process pool that receives
+    the data once per worker rather than once per fold.
+    """
+
+    MODES = ('recursive', 'direct', 'observed')
+
+    def __init__(self, horizon: int = 30, n_cutoffs: int = 5, step: Optional[int] = None,
+                 min_train_size: int = 180, parallel: Optional[bool] = None,
+                 mode: str = 'recursive', z_score: float = 1.96):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown backtest mode: {mode}")
+        self.horizon = horizon
+        self.n_cutoffs = n_cutoffs
+        self.step = step or horizon
+        self.min_train_size = min_train_size
+        self.parallel = parallel
+        self.mode = mode
+        self.z_score = z_score
+
+    def cutoffs(self, n_rows: int) -> np.ndarray:
+        """Cutoff row indices, oldest first, ending so the last fold fills the horizon"""
+        last = n_rows - self.horizon
+        cutoffs = last - self.step * np.arange(self.n_cutoffs)
+        return np.sort(cutoffs[cutoffs >= self.min_train_size])
+
+    def run(self, forecaster: CashFlowForecaster, df: pd.DataFrame, target_col: str = 'net_flow',
+            model_types: Optional[List[ModelType]] = None) -> Optional[BacktestResult]:
+        """Backtest forecaster's members on a raw daily frame (sorted by date)"""
+        model_types = model_types or list(forecaster.models) or [
+            ModelType.RANDOM_FOREST, ModelType.XGBOOST,
+            ModelType.LIGHTGBM, ModelType.LINEAR_REGRESSION,
+        ]
+        matrix = forecaster.feature_matrix(df, target_col)
+        target = np.asarray(matrix.target, dtype=np.float64)
+        cutoffs = self.cutoffs(len(target))
+        if len(cutoffs) == 0:
+            logger.info(f"Not enough history to backtest ({len(target)} rows)")
+            return None
+
+        data = {
+            'values': matrix.values,
+            'target': target,
+            'columns': matrix.columns,
+            'target_col': target_col,
+            # Raw frame row of each matrix row, for the forecast history
+            'rows': np.searchsorted(
+                pd.to_datetime(df['date'], cache=False).to_numpy(dtype='datetime64[D]'),
+                matrix.dates
+            ),
+            'frame': df if self.mode != 'observed' else None,
+        }
+
+        core_budget = forecaster.model_config.get('core_budget') or os.cpu_count() or 1
+        processes = min(len(cutoffs), core_budget)
+        parallel = processes > 1 if self.parallel is None else self.parallel and processes > 1
+        n_jobs = max(core_budget // processes, 1) if parallel else core_budget
+        args = [(forecaster.model_config, forecaster.model_params, model_types,
+                 int(cutoff), self.horizon, n_jobs, self.mode) for cutoff in cutoffs]
+
+        if parallel:
+            pool = forecaster._process_pool(processes, initializer=_init_fold_worker,
+                                            initargs=(data,))
+            try:
+                folds = pool.starmap(_run_fold, args)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            folds = [_run_fold(*fold_args, data=data) for fold_args in args]
+
+        # (members, cutoffs, horizon)
+        stacked = np.stack([fold[0] for fold in folds], axis=1)
+        seconds = np.stack([fold[1] for fold in folds]).mean(axis=0)
+        ensemble = np.stack([fold[2] for fold in folds])
+        actuals = target[cutoffs[:, np.newaxis] + np.arange(self.horizon)]
+        predictions, metrics = ensemble_metrics(
+            {model_type.value: stacked[i] for i, model_type in enumerate(model_types)},
+            actuals, self.z_score, ensemble
+        )
+
+        logger.info(f"Backtested {len(model_types)} models over {len(cutoffs)} cutoffs "
+                    f"({self.mode}): ensemble {metrics.get('ensemble')}")
+        return BacktestResult(cutoffs=cutoffs, actuals=actuals, predictions=predictions,
+                              metrics=metrics, z_score=self.z_score,
+                              costs={model_type.value: float(seconds[i])
+                                     for i, model_type in enumerate(model_types)})
@@ -0,0 +1,74 @@
+"""
+Benchmark: cold-start import time and RSS of the forecasting engine
+
+Each measurement runs in a fresh interpreter so module caches do not leak
+between runs.
+
+Usage:
+    python benchmarks/import_benchmark.py --repeats 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {engine_dir!r})
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed,
+                  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+SCENARIOS = [
+    ('all backends eagerly (previous behaviour)',
+     'import forecasting_engine\n'
+     'import sklearn.ensemble, sklearn.linear_model, xgboost, lightgbm, prophet, optuna\n'
+     'import statsmodels.api'),
+    ('forecasting_engine only',
+     'import forecasting_engine'),
+    ('engine + linear_regression backend',
+     'import forecasting_engine as fe\n'
+     'fe.CashFlowForecaster().build_model(fe.ModelType.LINEAR_REGRESSION)'),
+    ('engine + lightgbm backend',
+     'import forecasting_engine as fe\n'
+     'fe.CashFlowForecaster().build_model(fe.ModelType.LIGHTGBM)'),
+]
+
+
+def run_probe(code: str) -> dict:
+    script = PROBE.format(engine_dir=ENGINE_DIR, code=code)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=3, help='Fresh interpreters per scenario')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ENGINE_DIR)
+    from forecasting_engine import ModelBackends
+    available = {m.value: ok for m, ok in ModelBackends.available().items()}
+    print(f"Available backends: {available}")
+
+    for name, code in SCENARIOS:
+        try:
+            runs = [run_probe(code) for _ in range(args.repeats)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:45s} failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        seconds = min(run['seconds'] for run in runs)
+        rss = min(run['max_rss_mb'] for run in runs)
+        print(f"{name:45s} {seconds * 1000:8.0f} ms  max RSS {rss:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+On-disk cache of engineered training datasets in Arrow IPC format
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import FeatureEngineering, FeatureMatrix
+from model_registry import default_root
+
+logger = logging.getLogger(__name__)
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ImportError("The dataset cache needs pyarrow; install it with `pip install pyarrow`") from e
+    return pa
+
+
+class DatasetCache:
+    """
+    Per-organization feature matrices stored as uncompressed Arrow IPC files.
+
+    The matrix is one row-major fixed-size-list column, so a memory-mapped
+    read hands back the (rows, features) array without copying or parsing;
+    worker processes reading the same entry share one copy through the page
+    cache. Entries are keyed by a data fingerprint plus the feature-set
+    version and configuration, written atomically (temp file + rename) and
+    evicted least-recently-used first beyond max_bytes.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 10 * 1024 ** 3):
+        base = Path(root or default_root())
+        self.root = base / 'datasets'
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(data_fingerprint: str, target_col: str, lags: List[int], windows: List[int],
+            dtype: Any = np.float64, columns: Optional[List[str]] = None) -> str:
+        """Entry key for a data fingerprint and feature configuration"""
+        config = (FeatureEngineering.FEATURE_SET_VERSION, target_col, list(lags), list(windows),
+                  np.dtype(dtype).name)
+        if columns is not None:
+            config += (list(columns),)
+        return hashlib.sha256(f"{data_fingerprint}:{config!r}".encode()).hexdigest()[:32]
+
+    def _entry_path(self, organization_id: str, key: str) -> Path:
+        return self.root / str(organization_id) / f"{key}.arrow"
+
+    def get(self, organization_id: str, key: str) -> Optional[FeatureMatrix]:
+        """Memory-mapped feature matrix, or None on a miss"""
+        pa = _pyarrow()
+        path = self._entry_path(organization_id, key)
+        try:
+            source = pa.memory_map(str(path), 'r')
+        except FileNotFoundError:
+            return None
+
+        try:
+            table = pa.ipc.open_file(source).read_all()
+            metadata = table.schema.metadata or {}
+            columns = metadata[b'columns'].decode().split('\n') if metadata.get(b'columns') else []
+            matrix = table.column('values').combine_chunks()
+            values = matrix.values.to_numpy(zero_copy_only=True).reshape(len(table), len(columns))
+            target = table.column('target').combine_chunks().to_numpy(zero_copy_only=True)
+            dates = table.column('date').to_numpy().astype('datetime64[D]')
+        except Exception as e:
+            logger.warning(f"Failed to read dataset cache entry {key}: {str(e)}")
+            return None
+
+        # Touch the entry so LRU eviction sees it as recently used
+        os.utime(path)
+        return FeatureMatrix(values=values, target=target, columns=columns, dates=dates)
+
+    def put(self, organization_id: str, key: str, matrix: FeatureMatrix) -> Path:
+        """Write a feature matrix atomically"""
+        pa = _pyarrow()
+        values = np.ascontiguousarray(matrix.values)
+        n_rows, n_columns = values.shape
+        flat = pa.array(values.reshape(-1))
+        table = pa.table(
+            {
+                'values': pa.FixedSizeListArray.from_arrays(flat, n_columns),
+                'target': pa.array(np.asarray(matrix.target)),
+                'date': pa.array(np.asarray(matrix.dates, dtype='datetime64[D]')),
+            },
+            metadata={'columns': '\n'.join(matrix.columns)}
+        )
+
+        path = self._entry_path(organization_id, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        logger.info(f"Cached {n_rows}x{n_columns} dataset for {organization_id} ({key})")
+
+        self.evict()
+        return path
+
+    def get_or_build(self, organization_id: str, df: pd.DataFrame, target_col: str = 'net_flow',
+                     lags: Optional[List[int]] = None, windows: Optional[List[int]] = None,
+                     dtype: Any = np.float64, data_fingerprint: Optional[str] = None,
+                     columns: Optional[List[str]] = None) -> FeatureMatrix:
+        """
+        Cached feature matrix for df (or its `columns` subset), building and
+        caching it on a miss.
+
+        Pass data_fingerprint (e.g. a source data version) to skip hashing df.
+        """
+        from model_registry import ModelRegistry
+        lags = lags or [1, 7, 30]
+        windows = windows or [7, 30, 90]
+        data_fingerprint = data_fingerprint or ModelRegistry.fingerprint(df)
+        key = self.key(data_fingerprint, target_col, lags, windows, dtype, columns)
+
+        matrix = self.get(organization_id, key)
+        if matrix is None:
+            matrix = FeatureEngineering.build_feature_matrix(
+                df, target_col, lags=lags, windows=windows, dtype=dtype, columns=columns
+            )
+            self.put(organization_id, key, matrix)
+        return matrix
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits max_bytes"""
+        entries = []
+        for path in self.root.glob('*/*.arrow'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and total_bytes > self.max_bytes:
+            _, size, path = entries.pop(0)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Evicted {removed} dataset cache entries")
+        return removed
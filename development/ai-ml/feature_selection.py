@@ -0,0 +1,147 @@
+"""
+Importance-driven pruning of the engineered feature set
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import (
+    CashFlowForecaster, FeatureEngineering, ModelBackends, ModelType, SeriesCache
+)
+
+logger = logging.getLogger(__name__)
+
+SELECTION_METHODS = ('importance', 'permutation')
+
+
+class FeatureSelectionCache(SeriesCache):
+    """
+    Pruned feature sets per series, reused while the series only extends
+    the one they were selected on and has grown by at most `research_growth`.
+    """
+
+    FILENAME = 'feature_selections.json'
+
+    def __init__(self, path: Optional[str] = None, research_growth: float = 0.5,
+                 persist: bool = True):
+        super().__init__(path, research_growth, persist)
+
+    def store(self, y: np.ndarray, columns: List[str], scores: Dict[str, float],
+              series_key: Optional[str] = None) -> None:
+        self._put(y, series_key, {'columns': list(columns), 'scores': scores})
+
+
+# Process-wide cache so retrains of the same organization reuse its feature set
+FEATURE_SELECTION_CACHE = FeatureSelectionCache()
+
+
+class FeatureSelector:
+    """
+    Drops low-value features using a first fit on the full feature set.
+
+    A screening model (LightGBM by default) is fitted once and features are
+    scored by its normalized importances ('importance') or by permutation
+    importance on the most recent `holdout` fraction of rows
+    ('permutation'). The highest-scoring features that together hold
+    `cumulative` of the total are kept, at least `min_features` and at most
+    `max_features`; zero-scored features beyond min_features are always
+    dropped. The kept columns stay in the full set's order.
+    """
+
+    def __init__(self, method: str = 'importance', cumulative: float = 0.95,
+                 min_features: int = 8, max_features: Optional[int] = None,
+                 screening_model: Optional[str] = None, holdout: float = 0.2,
+                 n_repeats: int = 5, cache: Optional[FeatureSelectionCache] = None):
+        if method not in SELECTION_METHODS:
+            raise ValueError(f"Unknown feature selection method: {method}")
+        self.method = method
+        self.cumulative = cumulative
+        self.min_features = min_features
+        self.max_features = max_features
+        self.screening_model = screening_model
+        self.holdout = holdout
+        self.n_repeats = n_repeats
+        self.cache = cache or FEATURE_SELECTION_CACHE
+
+    def _screening_type(self) -> ModelType:
+        if self.screening_model is not None:
+            return ModelType(self.screening_model)
+        if ModelBackends.is_available(ModelType.LIGHTGBM):
+            return ModelType.LIGHTGBM
+        return ModelType.RANDOM_FOREST
+
+    def scores(self, forecaster: CashFlowForecaster, X: pd.DataFrame,
+               y: np.ndarray) -> Dict[str, float]:
+        """Normalized score per feature column from one screening fit"""
+        model_type = self._screening_type()
+        model = forecaster.build_model(model_type)
+
+        if self.method == 'importance':
+            model.fit(X, y)
+            # Same normalization the forecast's feature_importance uses
+            screening = CashFlowForecaster(forecaster.model_config)
+            screening.models = {model_type: model}
+            screening.feature_columns = list(X.columns)
+            scores = screening._get_feature_importance()
+        else:
+            from sklearn.inspection import permutation_importance
+            split = int(len(y) * (1 - self.holdout))
+            model.fit(X.iloc[:split], y[:split])
+            result = permutation_importance(model, X.iloc[split:], y[split:],
+                                            n_repeats=self.n_repeats, random_state=42,
+                                            scoring='neg_mean_absolute_error')
+            importances = np.maximum(result.importances_mean, 0.0)
+            total = importances.sum()
+            if total > 0:
+                importances = importances / total
+            scores = dict(sorted(zip(X.columns, importances.tolist()),
+                                 key=lambda x: x[1], reverse=True))
+
+        return {name: float(scores.get(name, 0.0)) for name in X.columns}
+
+    def select(self, scores: Dict[str, float]) -> List[str]:
+        """Columns to keep for the given scores, in their original order"""
+        ranked = sorted(scores, key=lambda name: scores[name], reverse=True)
+        values = np.array([scores[name] for name in ranked])
+        total = values.sum()
+        if total <= 0:
+            return list(scores)
+
+        n_keep = int(np.searchsorted(np.cumsum(values) / total, self.cumulative) + 1)
+        n_keep = min(n_keep, int((values > 0).sum()))
+        n_keep = max(n_keep, min(self.min_features, len(ranked)))
+        if self.max_features is not None:
+            n_keep = min(n_keep, self.max_features)
+        keep = set(ranked[:n_keep])
+        return [name for name in scores if name in keep]
+
+    def apply(self, forecaster: CashFlowForecaster, df: pd.DataFrame,
+              target_col: str = 'net_flow') -> List[str]:
+        """
+        Set forecaster.feature_subset for df, reusing the series' stored
+        selection when possible, so prepare_data engineers only those columns.
+        """
+        y_raw = np.ascontiguousarray(df[target_col].to_numpy(dtype=np.float64))
+        passthrough = [col for col in df.columns if col not in ('date', target_col)]
+        available = set(FeatureEngineering.feature_names(passthrough, target_col,
+                                                         forecaster.lags, forecaster.windows))
+
+        entry = self.cache.lookup(y_raw, forecaster.series_key)
+        if entry is not None and set(entry['columns']) <= available:
+            forecaster.feature_subset = list(entry['columns'])
+            logger.info(f"Reusing pruned feature set of {len(entry['columns'])} columns")
+            return forecaster.feature_subset
+
+        forecaster.feature_subset = None
+        X, y = forecaster.prepare_data(df, target_col)
+        scores = self.scores(forecaster, X, y)
+        columns = self.select(scores)
+        self.cache.store(y_raw, columns, scores, forecaster.series_key)
+
+        forecaster.feature_subset = columns
+        logger.info(f"Kept {len(columns)} of {len(scores)} features "
+                    f"(dropped {[name for name in scores if name not in columns]})")
+        return columns
@@ -6,26 +6,25 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+import hashlib
+import importlib
+import importlib.util
+import json
 import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
 from dataclasses import dataclass
 from enum import Enum
+from statistics import NormalDist
 
-# ML Libraries
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import LinearRegression, Ridge
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import TimeSeriesSplit
-import xgboost as xgb
-import lightgbm as lgb
-from prophet import Prophet
-import optuna
-
-# Time series processing
-import statsmodels.api as sm
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.seasonal import seasonal_decompose
-from statsmodels.tsa.stattools import adfuller
+# ML libraries (scikit-learn, XGBoost, LightGBM, Prophet, statsmodels, Optuna)
+# are imported on first use through ModelBackends to keep cold starts cheap
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +40,50 @@ class ModelType(Enum):
     ENSEMBLE = "ensemble"
 
 
+class ModelBackends:
+    """Registry of the optional libraries that back each model type"""
+
+    BACKENDS = {
+        ModelType.LINEAR_REGRESSION: 'sklearn',
+        ModelType.RANDOM_FOREST: 'sklearn',
+        ModelType.XGBOOST: 'xgboost',
+        ModelType.LIGHTGBM: 'lightgbm',
+        ModelType.PROPHET: 'prophet',
+        ModelType.ARIMA: 'statsmodels',
+    }
+
+    @classmethod
+    def module_name(cls, model_type: ModelType) -> str:
+        if model_type not in cls.BACKENDS:
+            raise ValueError(f"Model {model_type.value} has no backend")
+        return cls.BACKENDS[model_type]
+
+    @classmethod
+    def is_available(cls, model_type: ModelType) -> bool:
+        """Whether the backend is installed, without importing it"""
+        name = cls.module_name(model_type)
+        return name in sys.modules or importlib.util.find_spec(name) is not None
+
+    @classmethod
+    def available(cls) -> Dict[ModelType, bool]:
+        return {model_type: cls.is_available(model_type) for model_type in cls.BACKENDS}
+
+    @classmethod
+    def loaded(cls) -> Dict[ModelType, bool]:
+        return {model_type: name in sys.modules for model_type, name in cls.BACKENDS.items()}
+
+    @classmethod
+    def load(cls, model_type: ModelType) -> Any:
+        """Import (once) and return the top-level module backing model_type"""
+        name = cls.module_name(model_type)
+        if name not in sys.modules:
+            logger.info(f"Loading {name} backend for {model_type.value}")
+        try:
+            return importlib.import_module(name)
+        except ImportError as e:
+            raise ImportError(f"Model {model_type.value} requires the '{name}' package") from e
+
+
 @dataclass
 class ForecastResult:
     """Forecast result container"""
@@ -53,8 +96,42 @@ class ForecastResult:
     confidence_score: float
 
 
+@dataclass
+class FeatureMatrix:
+    """Feature matrix container with named column metadata"""
+    values: np.ndarray
+    target: np.ndarray
+    columns: List[str]
+    dates: np.ndarray
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def column_index(self, name: str) -> int:
+        """Get the position of a named feature column"""
+        return self.columns.index(name)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Wrap the matrix in a DataFrame without copying the values"""
+        return pd.DataFrame(self.values, columns=self.columns, copy=False)
+
+
 class FeatureEngineering:
     """Feature engineering for cash flow forecasting"""
+
+    TIME_FEATURES = [
+        'year', 'month', 'day', 'day_of_week', 'day_of_year', 'week_of_year', 'quarter',
+        'month_sin', 'month_cos', 'day_sin', 'day_cos',
+        'is_weekend', 'is_month_start', 'is_month_end', 'is_quarter_start', 'is_quarter_end'
+    ]
+    BUSINESS_FEATURES = [
+        'cash_velocity', 'inflow_growth', 'outflow_growth',
+        'inflow_outflow_ratio', 'balance_inflow_ratio'
+    ]
+    ROLLING_STATS = ['mean', 'std', 'min', 'max']
+    # Bump whenever the computed features change, so cached datasets are rebuilt
+    FEATURE_SET_VERSION = 2
     
     @staticmethod
     def create_time_features(df: pd.DataFrame, date_col: str = 'date') -> pd.DataFrame:
@@ -96,13 +173,14 @@ class FeatureEngineering:
     
     @staticmethod
     def create_rolling_features(df: pd.DataFrame, target_col: str, windows: List[int]) -> pd.DataFrame:
-        """Create rolling statistics features"""
+        """Create rolling statistics features over the `window` days before each day"""
         df = df.copy()
+        previous = df[target_col].shift(1)
         for window in windows:
-            df[f'{target_col}_rolling_mean_{window}'] = df[target_col].rolling(window).mean()
-            df[f'{target_col}_rolling_std_{window}'] = df[target_col].rolling(window).std()
-            df[f'{target_col}_rolling_min_{window}'] = df[target_col].rolling(window).min()
-            df[f'{target_col}_rolling_max_{window}'] = df[target_col].rolling(window).max()
+            df[f'{target_col}_rolling_mean_{window}'] = previous.rolling(window).mean()
+            df[f'{target_col}_rolling_std_{window}'] = previous.rolling(window).std()
+            df[f'{target_col}_rolling_min_{window}'] = previous.rolling(window).min()
+            df[f'{target_col}_rolling_max_{window}'] = previous.rolling(window).max()
         return df
     
     @staticmethod
@@ -123,142 +201,801 @@ class FeatureEngineering:
         
         return df
 
+    @classmethod
+    def feature_names(cls, passthrough: List[str], target_col: str,
+                      lags: List[int], windows: List[int]) -> List[str]:
+        """Column names produced by build_feature_matrix, in prepare_data order"""
+        names = list(passthrough) + list(cls.TIME_FEATURES)
+        names += [f'{target_col}_lag_{lag}' for lag in lags]
+        for window in windows:
+            names += [f'{target_col}_rolling_{stat}_{window}' for stat in cls.ROLLING_STATS]
+        return names + list(cls.BUSINESS_FEATURES)
+
+    @staticmethod
+    def _fill_time_features(out: np.ndarray, dates: np.ndarray) -> None:
+        """Write the TIME_FEATURES block for datetime64[D] dates into out"""
+        years = dates.astype('datetime64[Y]')
+        months = dates.astype('datetime64[M]')
+        month = (months - years).astype(np.int64) + 1
+        day = (dates - months).astype(np.int64) + 1
+        # 1970-01-01 was a Thursday; shift so Monday == 0
+        day_of_week = (dates.astype(np.int64) + 3) % 7
+        # ISO week: the week containing the Thursday of the current week
+        thursday = dates + (3 - day_of_week).astype('timedelta64[D]')
+        week_of_year = (thursday - thursday.astype('datetime64[Y]')).astype(np.int64) // 7 + 1
+        is_month_start = day == 1
+        is_month_end = (dates + np.timedelta64(1, 'D')).astype('datetime64[M]') != months
+        quarter_start_month = (month - 1) % 3 == 0
+
+        out[:, 0] = years.astype(np.int64) + 1970
+        out[:, 1] = month
+        out[:, 2] = day
+        out[:, 3] = day_of_week
+        out[:, 4] = (dates - years).astype(np.int64) + 1
+        out[:, 5] = week_of_year
+        out[:, 6] = (month - 1) // 3 + 1
+        out[:, 7] = np.sin(2 * np.pi * month / 12)
+        out[:, 8] = np.cos(2 * np.pi * month / 12)
+        out[:, 9] = np.sin(2 * np.pi * day_of_week / 7)
+        out[:, 10] = np.cos(2 * np.pi * day_of_week / 7)
+        out[:, 11] = day_of_week >= 5
+        out[:, 12] = is_month_start
+        out[:, 13] = is_month_end
+        out[:, 14] = is_month_start & quarter_start_month
+        out[:, 15] = is_month_end & (month % 3 == 0)
+
+    @staticmethod
+    def _fill_rolling_features(out: np.ndarray, values: np.ndarray, window: int) -> None:
+        """Write rolling mean/std/min/max of values into the 4 columns of out"""
+        out[:window - 1] = np.nan
+        if len(values) < window:
+            return
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        if np.isnan(values).any():
+            out[window - 1:, 0] = windows.mean(axis=1)
+            out[window - 1:, 1] = windows.std(axis=1, ddof=1)
+        else:
+            # Windowed sums from cumulative sums of the centred series avoid
+            # materialising an (n, window) temporary for mean/std
+            centred = values - values.mean()
+            sums = np.concatenate(([0.0], np.cumsum(centred)))
+            sq_sums = np.concatenate(([0.0], np.cumsum(centred * centred)))
+            win_sum = sums[window:] - sums[:-window]
+            win_sq_sum = sq_sums[window:] - sq_sums[:-window]
+            out[window - 1:, 0] = win_sum / window + values.mean()
+            variance = (win_sq_sum - win_sum * win_sum / window) / (window - 1)
+            out[window - 1:, 1] = np.sqrt(np.maximum(variance, 0.0))
+        out[window - 1:, 2] = windows.min(axis=1)
+        out[window - 1:, 3] = windows.max(axis=1)
+
+    @staticmethod
+    def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+        shifted = np.empty_like(values)
+        shifted[:periods] = np.nan
+        shifted[periods:] = values[:-periods]
+        return shifted
+
+    @staticmethod
+    def future_business_features(inflow: Any, outflow: Any, balance: Any,
+                                 last_inflow: Any, last_outflow: Any) -> Dict[str, Any]:
+        """
+        Business features for a future day whose flows are assumed, not observed.
+
+        The day's balance is the previous balance plus the assumed net flow.
+        Works on scalars or on arrays with one entry per series.
+        """
+        inflow, outflow = np.asarray(inflow, dtype=np.float64), np.asarray(outflow, dtype=np.float64)
+        balance = np.asarray(balance, dtype=np.float64)
+        expected_balance = balance + (inflow - outflow)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'total_balance': expected_balance,
+                'cash_velocity': np.divide(inflow - outflow, balance),
+                'inflow_growth': np.divide(inflow, last_inflow) - 1,
+                'outflow_growth': np.divide(outflow, last_outflow) - 1,
+                'inflow_outflow_ratio': inflow / (outflow + 1e-8),
+                'balance_inflow_ratio': expected_balance / (inflow + 1e-8),
+            }
+
+    @classmethod
+    def build_feature_matrix(cls, df: pd.DataFrame, target_col: str = 'net_flow',
+                             lags: Optional[List[int]] = None,
+                             windows: Optional[List[int]] = None,
+                             date_col: str = 'date',
+                             dtype: Any = np.float64,
+                             dropna: bool = True,
+                             columns: Optional[List[str]] = None) -> FeatureMatrix:
+        """
+        Build the full prepare_data feature set in a single pass.
+
+        Every feature is written straight into one preallocated C-contiguous
+        matrix instead of copying the frame once per feature group. Columns
+        and values match the create_* chain followed by dropna(). Pass
+        `columns` (a subset of the full set, e.g. a pruned feature set) to
+        compute only those columns, in that order.
+        """
+        lags = [1, 7, 30] if lags is None else list(lags)
+        windows = [7, 30, 90] if windows is None else list(windows)
+
+        passthrough = [col for col in df.columns if col not in (date_col, target_col)]
+        all_columns = cls.feature_names(passthrough, target_col, lags, windows)
+        if columns is None:
+            columns = all_columns
+        else:
+            columns = list(columns)
+            unknown = set(columns) - set(all_columns)
+            if unknown:
+                raise ValueError(f"Unknown feature columns: {sorted(unknown)}")
+        col_index = {name: i for i, name in enumerate(columns)}
+        n_rows = len(df)
+
+        values = np.empty((n_rows, len(columns)), dtype=dtype, order='C')
+        target = df[target_col].to_numpy(dtype=np.float64)
+        dates = pd.to_datetime(df[date_col], cache=False).to_numpy(dtype='datetime64[D]')
+
+        def fill_block(names: List[str], block: np.ndarray) -> None:
+            for j, name in enumerate(names):
+                if name in col_index:
+                    values[:, col_index[name]] = block[:, j]
+
+        for name in passthrough:
+            if name in col_index:
+                values[:, col_index[name]] = df[name].to_numpy(dtype=np.float64)
+
+        if columns is all_columns:
+            start = len(passthrough)
+            cls._fill_time_features(values[:, start:start + len(cls.TIME_FEATURES)], dates)
+        elif col_index.keys() & set(cls.TIME_FEATURES):
+            time_block = np.empty((n_rows, len(cls.TIME_FEATURES)))
+            cls._fill_time_features(time_block, dates)
+            fill_block(cls.TIME_FEATURES, time_block)
+
+        for lag in lags:
+            col = col_index.get(f'{target_col}_lag_{lag}')
+            if col is not None:
+                values[:lag, col] = np.nan
+                values[lag:, col] = target[:-lag] if lag else target
+
+        # Rolling windows end the day before, as the lags do, so a row's
+        # features never include its own target (and match RecursiveFeatureState)
+        for window in windows:
+            names = [f'{target_col}_rolling_{stat}_{window}' for stat in cls.ROLLING_STATS]
+            if columns is all_columns:
+                col = col_index[names[0]]
+                rolling_block = values[:, col:col + 4]
+            elif col_index.keys() & set(names):
+                rolling_block = np.empty((n_rows, 4))
+            else:
+                continue
+            if n_rows:
+                rolling_block[0] = np.nan
+                cls._fill_rolling_features(rolling_block[1:], target[:-1], window)
+            if columns is not all_columns:
+                fill_block(names, rolling_block)
+
+        business = [name for name in cls.BUSINESS_FEATURES if name in col_index]
+        if business:
+            net_flow = df['net_flow'].to_numpy(dtype=np.float64)
+            inflow = df['total_inflow'].to_numpy(dtype=np.float64)
+            outflow = df['total_outflow'].to_numpy(dtype=np.float64)
+            balance = df['total_balance'].to_numpy(dtype=np.float64)
+            features = {
+                'cash_velocity': lambda: net_flow / cls._shift(balance),
+                'inflow_growth': lambda: inflow / cls._shift(inflow) - 1,
+                'outflow_growth': lambda: outflow / cls._shift(outflow) - 1,
+                'inflow_outflow_ratio': lambda: inflow / (outflow + 1e-8),
+                'balance_inflow_ratio': lambda: balance / (inflow + 1e-8),
+            }
+            with np.errstate(divide='ignore', invalid='ignore'):
+                for name in business:
+                    values[:, col_index[name]] = features[name]()
+
+        if dropna:
+            valid = ~(np.isnan(values).any(axis=1) | np.isnan(target))
+            first = int(np.argmax(valid)) if valid.any() else n_rows
+            if valid[first:].all():
+                # Common case: only the lag/rolling warm-up rows are missing,
+                # so a view keeps the matrix contiguous without a copy
+                values, target, dates = values[first:], target[first:], dates[first:]
+            else:
+                values, target, dates = values[valid], target[valid], dates[valid]
+
+        return FeatureMatrix(values=values, target=target, columns=columns, dates=dates)
+
+
+ARIMA_ORDERS = [(p, d, q) for p in range(3) for d in range(2) for q in range(3)]
+
+
+def _fit_arima_order(y: np.ndarray, order: Tuple[int, int, int],
+                     start_params: Optional[List[float]] = None) -> Tuple[Tuple, float, Any]:
+    """Fit one ARIMA order, returning (order, aic, fitted) with aic=inf on failure"""
+    ModelBackends.load(ModelType.ARIMA)
+    from statsmodels.tsa.arima.model import ARIMA
+    
+    try:
+        fitted_model = ARIMA(y, order=order).fit(
+            start_params=None if start_params is None else np.asarray(start_params)
+        )
+        return order, float(fitted_model.aic), fitted_model
+    except Exception as e:
+        logger.debug(f"ARIMA{order} failed: {str(e)}")
+        return order, float('inf'), None
+
+
+def _arima_from_params(y: np.ndarray, order: Tuple[int, int, int], params: List[float]) -> Any:
+    """
+    Fitted ARIMA results for known parameters: one Kalman smoothing pass with
+    no optimisation, identical to the results the parameters came from
+    """
+    ModelBackends.load(ModelType.ARIMA)
+    from statsmodels.tsa.arima.model import ARIMA
+    return ARIMA(y, order=order).smooth(np.asarray(params, dtype=np.float64))
+
+
+def _score_arima_order(y: np.ndarray, order: Tuple[int, int, int]) -> Tuple[Tuple, float, Optional[List[float]]]:
+    """
+    Process pool entry point: fit one ARIMA order and return (order, aic,
+    params) only, so the fitted results (which hold copies of the data) are
+    not pickled back for every order
+    """
+    order, aic, fitted_model = _fit_arima_order(y, order)
+    params = None if fitted_model is None else np.asarray(fitted_model.params, dtype=np.float64).tolist()
+    return order, aic, params
+
+
+class SeriesCache:
+    """
+    Decisions fitted on a series (an ARIMA order, a feature or model
+    selection, ...), keyed per series and reused while the series only
+    extends the one they were made on.
+
+    Entries are keyed by an explicit series key (e.g. organization id) or by
+    a hash of the first values of the series, and remember a hash of the
+    whole series they were fitted on. A later series that merely extends
+    that one gets the entry back until it has grown by more than
+    `research_growth`. Entries persist as JSON at `path`, by default
+    FILENAME under the model registry root, so decisions survive restarts
+    and are shared by the processes using that root; the file is read on
+    first use and written atomically (temp file + rename), merged with
+    what other processes have written since.
+    """
+
+    HEAD_LENGTH = 30
+    FILENAME: Optional[str] = None
+
+    def __init__(self, path: Optional[str] = None, research_growth: float = 0.25,
+                 persist: bool = True):
+        self._path = path
+        self.persist = persist
+        self.research_growth = research_growth
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def path(self) -> Optional[str]:
+        if not self.persist:
+            return None
+        if self._path is None and self.FILENAME:
+            from model_registry import default_root
+            self._path = os.path.join(default_root(), self.FILENAME)
+        return self._path
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        path = self.path
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {type(self).__name__} file {path}: {str(e)}")
+            return {}
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    @staticmethod
+    def _hash(values: np.ndarray) -> str:
+        return hashlib.sha1(values.tobytes()).hexdigest()
+
+    def _key(self, y: np.ndarray, series_key: Optional[str]) -> str:
+        return series_key if series_key is not None else self._hash(y[:self.HEAD_LENGTH])
+
+    def lookup(self, y: np.ndarray, series_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Cached entry if y equals or extends the series it was fitted on"""
+        entry = self.entries.get(self._key(y, series_key))
+        if entry is None:
+            return None
+        n_obs = entry['n_obs']
+        if len(y) < n_obs or len(y) > n_obs * (1 + self.research_growth):
+            return None
+        if self._hash(y[:n_obs]) != entry['series_hash']:
+            return None
+        return entry
+
+    def _put(self, y: np.ndarray, series_key: Optional[str], entry: Dict[str, Any]) -> None:
+        entry.update(n_obs=len(y), series_hash=self._hash(y))
+        key = self._key(y, series_key)
+        path = self.path
+        if path:
+            self._entries = {**self.entries, **self._read()}
+        self.entries[key] = entry
+        if not path:
+            return
+        try:
+            directory = os.path.dirname(path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.",
+                                            suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Keeping {type(self).__name__} entry in memory only: {str(e)}")
+
+
+class ArimaOrderCache(SeriesCache):
+    """
+    Best ARIMA order and parameters per series. A series that extends a
+    cached one reuses its order and warm-starts from its parameters; once
+    it has grown by more than `research_growth` the full search runs again.
+    """
+
+    FILENAME = 'arima_orders.json'
+
+    def store(self, y: np.ndarray, order: Tuple[int, int, int], fitted_model: Any,
+              series_key: Optional[str] = None) -> None:
+        self._put(y, series_key, {
+            'order': list(order),
+            'params': np.asarray(fitted_model.params, dtype=np.float64).tolist(),
+            'aic': float(fitted_model.aic),
+        })
+
+
+# Process-wide cache so fresh forecaster instances share ARIMA order searches
+ARIMA_ORDER_CACHE = ArimaOrderCache()
+
+
+# Prophet's Stan parameters, as accepted by Prophet.fit(init=...)
+PROPHET_SCALAR_PARAMS = ['k', 'm', 'sigma_obs']
+PROPHET_VECTOR_PARAMS = ['delta', 'beta']
+
+
+class ProphetParamCache(SeriesCache):
+    """
+    Fitted Prophet parameters per series, used to warm-start the next fit.
+
+    Entries also record the first date of the series. Parameters are only
+    an optimiser starting point, so they are reused however far the series
+    has grown.
+    """
+
+    FILENAME = 'prophet_params.json'
+
+    def __init__(self, path: Optional[str] = None, research_growth: float = float('inf'),
+                 persist: bool = True):
+        super().__init__(path, research_growth, persist)
+
+    def lookup(self, y: np.ndarray, series_key: Optional[str] = None,
+               start: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        entry = super().lookup(y, series_key)
+        if entry is None or (start is not None and entry.get('start') != str(start)):
+            return None
+        return entry
+
+    @staticmethod
+    def init_params(fitted_model: Any) -> Dict[str, Any]:
+        """Point estimates of a fitted model's parameters (posterior means when sampled)"""
+        params = {}
+        for name in PROPHET_SCALAR_PARAMS:
+            params[name] = float(np.mean(fitted_model.params[name]))
+        for name in PROPHET_VECTOR_PARAMS:
+            params[name] = np.mean(fitted_model.params[name], axis=0).tolist()
+        return params
+
+    def store(self, y: np.ndarray, fitted_model: Any, series_key: Optional[str] = None,
+              start: Optional[Any] = None) -> None:
+        self._put(y, series_key, {
+            'params': self.init_params(fitted_model),
+            'start': str(start) if start is not None else None,
+        })
+
+
+# Process-wide cache so refits of the same series start from the last fit
+PROPHET_PARAM_CACHE = ProphetParamCache()
+
+
+# Ensemble members that do not benefit from more than one core
+SINGLE_THREADED_MODELS = {ModelType.LINEAR_REGRESSION, ModelType.PROPHET, ModelType.ARIMA}
+
+# Two-sided level of a +/- one standard deviation band
+ONE_SIGMA_LEVEL = 0.6827
+
+
+@contextmanager
+def thread_limits(n_jobs: int):
+    """
+    Run a fit on n_jobs threads: caps the BLAS/OpenMP pools and runs
+    joblib loops (RandomForest) on threads. Pool workers are daemonic, and
+    joblib drops process-based loops to n_jobs=1 inside them.
+    """
+    from joblib import parallel_backend
+    from threadpoolctl import threadpool_limits
+    
+    with threadpool_limits(limits=n_jobs), parallel_backend('threading', n_jobs=n_jobs):
+        yield
+
+
+def _train_ensemble_member(model_config: Dict, model_type: ModelType, X: pd.DataFrame,
+                           y: np.ndarray, n_jobs: int) -> Tuple[Any, Any]:
+    """Process pool entry point: train one ensemble member with a thread limit"""
+    forecaster = CashFlowForecaster(model_config)
+    with thread_limits(n_jobs):
+        model = forecaster.train_model(model_type, X, y, n_jobs=n_jobs)
+    return model, forecaster.scalers.get(model_type)
+
+
+class StreamingLinearStats:
+    """
+    Mergeable sufficient statistics for (ridge) linear regression.
+
+    Keeps the count, means and centred co-moment matrix of [X, y]. Batches
+    are merged with the pairwise update of Chan et al., which stays accurate
+    for large-valued features, and coefficients are re-solved in the
+    standardised space the linear member is trained in.
+    """
+
+    def __init__(self, X: Any, y: np.ndarray):
+        data = np.column_stack([np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        self.n = len(data)
+        self.mean = data.mean(axis=0)
+        centred = data - self.mean
+        self.comoment = centred.T @ centred
+
+    def update(self, X: Any, y: np.ndarray) -> None:
+        batch = StreamingLinearStats(X, y)
+        if batch.n == 0:
+            return
+        n = self.n + batch.n
+        delta = batch.mean - self.mean
+        self.comoment += batch.comoment + np.outer(delta, delta) * (self.n * batch.n / n)
+        self.mean += delta * (batch.n / n)
+        self.n = n
+
+    def solve(self, scale: np.ndarray, alpha: float = 0.0) -> Tuple[np.ndarray, float]:
+        """Coefficients and intercept on features standardised by the running mean and scale"""
+        sxx = self.comoment[:-1, :-1] / np.outer(scale, scale)
+        sxy = self.comoment[:-1, -1] / scale
+        if alpha:
+            sxx = sxx + alpha * np.eye(len(sxx))
+        coef = np.linalg.lstsq(sxx, sxy, rcond=None)[0]
+        # Standardised features have zero mean, so the intercept is the target mean
+        return coef, float(self.mean[-1])
+
+
+class RecursiveFeatureState:
+    """
+    Incremental lag and rolling-window state for recursive forecasting.
+
+    A fixed-size ring buffer holds the most recent target values. Each window
+    keeps running sums for mean/std and monotonic deques for min/max, so
+    pushing a new value and reading any lag or rolling statistic is O(1)
+    amortised regardless of the forecast horizon.
+    """
+
+    def __init__(self, history: np.ndarray, lags: List[int], windows: List[int]):
+        self.lags = list(lags)
+        self.windows = list(windows)
+        self.capacity = max(self.lags + self.windows + [1])
+        self._buffer = np.zeros(self.capacity, dtype=np.float64)
+        self._count = 0
+
+        history = np.asarray(history, dtype=np.float64)[-self.capacity:]
+        # Sums are kept relative to an offset so the variance stays accurate
+        # for series with a large mean
+        self._offset = float(history.mean()) if len(history) else 0.0
+        self._sums = {window: 0.0 for window in self.windows}
+        self._sq_sums = {window: 0.0 for window in self.windows}
+        self._min_deques = {window: deque() for window in self.windows}
+        self._max_deques = {window: deque() for window in self.windows}
+
+        for value in history:
+            self.push(value)
+
+    def push(self, value: float) -> None:
+        """Append the next observed or predicted value"""
+        value = float(value)
+        t = self._count
+        centred = value - self._offset
+
+        for window in self.windows:
+            if t >= window:
+                old = self._buffer[(t - window) % self.capacity] - self._offset
+                self._sums[window] -= old
+                self._sq_sums[window] -= old * old
+            self._sums[window] += centred
+            self._sq_sums[window] += centred * centred
+
+            min_deque = self._min_deques[window]
+            while min_deque and min_deque[-1][1] >= value:
+                min_deque.pop()
+            min_deque.append((t, value))
+            if min_deque[0][0] <= t - window:
+                min_deque.popleft()
+
+            max_deque = self._max_deques[window]
+            while max_deque and max_deque[-1][1] <= value:
+                max_deque.pop()
+            max_deque.append((t, value))
+            if max_deque[0][0] <= t - window:
+                max_deque.popleft()
+
+        self._buffer[t % self.capacity] = value
+        self._count += 1
+
+    def lag(self, lag: int) -> float:
+        """Value observed `lag` steps before the next one"""
+        if lag > self._count or lag <= 0:
+            return np.nan
+        return float(self._buffer[(self._count - lag) % self.capacity])
+
+    def rolling(self, window: int) -> Tuple[float, float, float, float]:
+        """Rolling (mean, std, min, max) over the last `window` values"""
+        if self._count < window:
+            return np.nan, np.nan, np.nan, np.nan
+        total = self._sums[window]
+        mean = total / window + self._offset
+        if window > 1:
+            variance = (self._sq_sums[window] - total * total / window) / (window - 1)
+            std = float(np.sqrt(max(variance, 0.0)))
+        else:
+            std = np.nan
+        return mean, std, self._min_deques[window][0][1], self._max_deques[window][0][1]
+
 
 class CashFlowForecaster:
     """Main forecasting engine"""
     
-    def __init__(self, model_config: Optional[Dict] = None):
+    # BacktestEngine options of the backtest train_ensemble runs by default
+    DEFAULT_BACKTEST = {'n_cutoffs': 3}
+    # model_config keys that change the trained ensemble, and so its fingerprint
+    # (model_params is taken from the instance, where tuned parameters land)
+    FINGERPRINT_CONFIG_KEYS = ['feature_selection', 'model_selection', 'recursive_forecast',
+                               'feature_dtype']
+    
+    def __init__(self, model_config: Optional[Dict] = None, registry: Optional[Any] = None):
         self.model_config = model_config or {}
+        self.registry = registry
+        self.arima_cache = self.model_config.get('arima_cache') or ARIMA_ORDER_CACHE
+        self.prophet_cache = self.model_config.get('prophet_cache') or PROPHET_PARAM_CACHE
+        # Identifies the series (e.g. organization id) in the warm-start caches
+        self.series_key = None
+        self.model_params = dict(self.model_config.get('model_params', {}))
+        self.online_state = {}
+        self.model_metrics = {}
+        self.backtest_residuals = None
+        self.model_selection = None
+        self._backtest_result = None
+        self._calibrator = (None, None)
         self.models = {}
         self.scalers = {}
         self.feature_columns = []
+        # Pruned feature set to engineer instead of the full one (see feature_selection)
+        self.feature_subset = None
+        self.training_dates = None
+        self.target_col = 'net_flow'
+        self.lags = self.model_config.get('lags', [1, 7, 30])
+        self.windows = self.model_config.get('windows', [7, 30, 90])
         self.is_trained = False
         
     def prepare_data(self, df: pd.DataFrame, target_col: str = 'net_flow') -> Tuple[pd.DataFrame, np.ndarray]:
         """Prepare data for training"""
         logger.info("Preparing data for forecasting")
         
-        # Feature engineering
-        feature_eng = FeatureEngineering()
-        df = feature_eng.create_time_features(df)
-        df = feature_eng.create_lag_features(df, target_col, [1, 7, 30])
-        df = feature_eng.create_rolling_features(df, target_col, [7, 30, 90])
-        df = feature_eng.create_business_features(df)
+        matrix = self.feature_matrix(df, target_col)
+        X = matrix.to_frame()
+        y = matrix.target
         
-        # Remove rows with NaN values
-        df = df.dropna()
-        
-        # Separate features and target
-        feature_cols = [col for col in df.columns if col not in ['date', target_col]]
-        X = df[feature_cols]
-        y = df[target_col].values
-        
-        self.feature_columns = feature_cols
-        logger.info(f"Prepared {len(feature_cols)} features for {len(df)} samples")
+        self.feature_columns = matrix.columns
+        self.training_dates = matrix.dates
+        self.target_col = target_col
+        logger.info(f"Prepared {len(matrix.columns)} features for {len(y)} samples")
         
         return X, y
     
-    def train_model(self, model_type: ModelType, X: pd.DataFrame, y: np.ndarray) -> Any:
-        """Train a specific model"""
-        logger.info(f"Training {model_type.value} model")
+    def feature_matrix(self, df: pd.DataFrame, target_col: str = 'net_flow') -> FeatureMatrix:
+        """
+        Feature engineering into a single contiguous matrix, reused from the
+        on-disk dataset cache (model_config['dataset_cache']) when one is
+        configured, so training and backtesting build it once
+        """
+        dtype = self.model_config.get('feature_dtype', np.float64)
+        dataset_cache = self.model_config.get('dataset_cache')
+        if dataset_cache is not None:
+            return dataset_cache.get_or_build(
+                self.series_key or 'default', df, target_col, self.lags, self.windows, dtype,
+                columns=self.feature_subset
+            )
+        return FeatureEngineering.build_feature_matrix(
+            df, target_col, lags=self.lags, windows=self.windows, dtype=dtype,
+            columns=self.feature_subset
+        )
+    
+    def build_model(self, model_type: ModelType, n_jobs: Optional[int] = None,
+                    params: Optional[Dict[str, Any]] = None) -> Any:
+        """Create an unfitted estimator with default, configured and explicit parameters"""
+        if n_jobs is None:
+            n_jobs = self.model_config.get('core_budget', -1)
+        
+        overrides = dict(self.model_params.get(model_type, {}))
+        overrides.update(params or {})
+        ModelBackends.load(model_type)
         
         if model_type == ModelType.LINEAR_REGRESSION:
-            model = LinearRegression()
+            from sklearn.linear_model import LinearRegression, Ridge
+            
+            # A tuned L2 penalty turns the linear member into ridge regression
+            if 'alpha' in overrides:
+                return Ridge(**overrides)
+            return LinearRegression(**overrides)
             
         elif model_type == ModelType.RANDOM_FOREST:
-            model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-                n_jobs=-1
-            )
+            from sklearn.ensemble import RandomForestRegressor
+            defaults = dict(n_estimators=100, max_depth=10, random_state=42)
+            return RandomForestRegressor(**{**defaults, **overrides}, n_jobs=n_jobs)
             
         elif model_type == ModelType.XGBOOST:
-            model = xgb.XGBRegressor(
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42,
-                n_jobs=-1
-            )
+            import xgboost as xgb
+            defaults = dict(n_estimators=100, max_depth=6, learning_rate=0.1, random_state=42)
+            return xgb.XGBRegressor(**{**defaults, **overrides}, n_jobs=n_jobs)
             
         elif model_type == ModelType.LIGHTGBM:
-            model = lgb.LGBMRegressor(
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42,
-                n_jobs=-1,
-                verbose=-1
-            )
-            
-        elif model_type == ModelType.PROPHET:
-            return self._train_prophet_model(X, y)
+            import lightgbm as lgb
+            defaults = dict(n_estimators=100, max_depth=6, learning_rate=0.1, random_state=42)
+            return lgb.LGBMRegressor(**{**defaults, **overrides}, n_jobs=n_jobs, verbose=-1)
+        
+        raise ValueError(f"Model {model_type.value} has no estimator to build")
+    
+    def train_model(self, model_type: ModelType, X: pd.DataFrame, y: np.ndarray,
+                    n_jobs: Optional[int] = None) -> Any:
+        """Train a specific model"""
+        logger.info(f"Training {model_type.value} model")
+        
+        if model_type == ModelType.PROPHET:
+            return self._train_prophet_model(X, y, self.series_key)
             
         elif model_type == ModelType.ARIMA:
-            return self._train_arima_model(y)
+            return self._train_arima_model(y, self.series_key)
+        
+        model = self.build_model(model_type, n_jobs)
+        # Estimators (and scalers) see the bare matrix, as predict() passes
+        # one, so serving skips frame construction and feature-name checks
+        values = np.asarray(X)
         
         # Scale features for non-tree models
         if model_type in [ModelType.LINEAR_REGRESSION]:
+            from sklearn.preprocessing import StandardScaler
             scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
+            X_scaled = scaler.fit_transform(values)
             self.scalers[model_type] = scaler
             model.fit(X_scaled, y)
         else:
-            model.fit(X, y)
+            model.fit(values, y)
         
         return model
     
-    def _train_prophet_model(self, X: pd.DataFrame, y: np.ndarray) -> Prophet:
-        """Train Prophet model"""
+    def _train_prophet_model(self, X: pd.DataFrame, y: np.ndarray,
+                             series_key: Optional[str] = None) -> Any:
+        """
+        Train Prophet on the real training dates.
+
+        When the series only extends a previous fit, Stan is initialised from
+        that fit's parameters. model_config['prophet_mcmc_samples'] > 0 switches
+        from the MAP estimate to (much slower) full posterior sampling.
+        """
+        ModelBackends.load(ModelType.PROPHET)
+        from prophet import Prophet
+        
+        if self.training_dates is None or len(self.training_dates) != len(y):
+            raise ValueError("Prophet needs the training dates from prepare_data")
+        
         # Prophet expects specific column names
         prophet_df = pd.DataFrame({
-            'ds': pd.date_range(start='2020-01-01', periods=len(y), freq='D'),
+            'ds': pd.DatetimeIndex(self.training_dates),
             'y': y
         })
+        y = np.ascontiguousarray(y, dtype=np.float64)
+        start = prophet_df['ds'].iloc[0].date()
         
-        model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=True,
-            daily_seasonality=False,
-            changepoint_prior_scale=0.05
-        )
-        model.fit(prophet_df)
+        def make_model() -> Any:
+            return Prophet(
+                yearly_seasonality=True,
+                weekly_seasonality=True,
+                daily_seasonality=False,
+                changepoint_prior_scale=0.05,
+                mcmc_samples=self.model_config.get('prophet_mcmc_samples', 0),
+                uncertainty_samples=self.model_config.get('prophet_uncertainty_samples', 1000)
+            )
+        
+        cached = self.prophet_cache.lookup(y, series_key, start)
+        model = None
+        if cached is not None:
+            try:
+                init = {name: np.asarray(value) if isinstance(value, list) else value
+                        for name, value in cached['params'].items()}
+                model = make_model().fit(prophet_df, init=init)
+                logger.info("Warm-started Prophet from cached parameters")
+            except Exception as e:
+                # e.g. a different number of changepoints for the longer series
+                logger.debug(f"Prophet warm start failed, fitting from scratch: {str(e)}")
+                model = None
+        if model is None:
+            model = make_model().fit(prophet_df)
+        
+        self.prophet_cache.store(y, model, series_key, start)
         return model
     
-    def _train_arima_model(self, y: np.ndarray) -> ARIMA:
+    def _train_arima_model(self, y: np.ndarray, series_key: Optional[str] = None) -> Any:
         """Train ARIMA model"""
-        # Find optimal ARIMA parameters
-        best_aic = float('inf')
-        best_order = None
-        
-        for p in range(3):
-            for d in range(2):
-                for q in range(3):
-                    try:
-                        model = ARIMA(y, order=(p, d, q))
-                        fitted_model = model.fit()
-                        if fitted_model.aic < best_aic:
-                            best_aic = fitted_model.aic
-                            best_order = (p, d, q)
-                    except:
-                        continue
-        
-        if best_order:
-            model = ARIMA(y, order=best_order)
-            return model.fit()
+        y = np.ascontiguousarray(y, dtype=np.float64)
+        
+        # Warm start from the previous best order when the series was only extended
+        cached = self.arima_cache.lookup(y, series_key)
+        if cached is not None:
+            order, _, fitted_model = _fit_arima_order(y, tuple(cached['order']), cached['params'])
+            if fitted_model is not None:
+                logger.info(f"Warm-started ARIMA{order} from cached parameters")
+                self.arima_cache.store(y, order, fitted_model, series_key)
+                return fitted_model
+        
+        # Find optimal ARIMA parameters. Pool workers only report each order's
+        # AIC and parameters; the winner's results are rebuilt from those
+        # parameters without re-estimating them
+        core_budget = self.model_config.get('core_budget') or os.cpu_count() or 1
+        processes = min(len(ARIMA_ORDERS), core_budget)
+        if processes > 1 and self.model_config.get('arima_parallel', True):
+            pool = self._process_pool(processes)
+            try:
+                scores = pool.starmap(_score_arima_order, [(y, order) for order in ARIMA_ORDERS])
+            finally:
+                pool.terminate()
+                pool.join()
+            best_order, best_aic, best_params = min(scores, key=lambda score: score[1])
+            best_model = None
+            if best_params is not None:
+                best_model = _arima_from_params(y, best_order, best_params)
         else:
+            results = [_fit_arima_order(y, order) for order in ARIMA_ORDERS]
+            best_order, best_aic, best_model = min(results, key=lambda result: result[1])
+        if best_model is None:
             # Fallback to simple ARIMA(1,1,1)
-            model = ARIMA(y, order=(1, 1, 1))
-            return model.fit()
+            from statsmodels.tsa.arima.model import ARIMA
+            best_order = (1, 1, 1)
+            best_model = ARIMA(y, order=best_order).fit()
+        
+        logger.info(f"Selected ARIMA{best_order} (aic={best_aic:.2f})")
+        self.arima_cache.store(y, best_order, best_model, series_key)
+        return best_model
     
     def train_ensemble(self, df: pd.DataFrame, target_col: str = 'net_flow') -> Dict[ModelType, Any]:
         """Train ensemble of models"""
         logger.info("Training ensemble of forecasting models")
         
+        feature_selection = self.model_config.get('feature_selection')
+        if feature_selection:
+            from feature_selection import FeatureSelector
+            FeatureSelector(**({} if feature_selection is True else feature_selection)).apply(
+                self, df, target_col
+            )
+        
         X, y = self.prepare_data(df, target_col)
         
-        # Train individual models
+        # Train individual models. Prophet and ARIMA are not members: they
+        # forecast from the series alone rather than from feature rows, which
+        # predict(), backtests, incremental updates and serving all rely on;
+        # train_model() fits them on their own
         model_types = [
             ModelType.RANDOM_FOREST,
             ModelType.XGBOOST,
@@ -266,22 +1003,345 @@ class CashFlowForecaster:
             ModelType.LINEAR_REGRESSION
         ]
         
-        models = {}
-        for model_type in model_types:
-            try:
-                model = self.train_model(model_type, X, y)
-                models[model_type] = model
-                logger.info(f"Successfully trained {model_type.value}")
-            except Exception as e:
-                logger.error(f"Failed to train {model_type.value}: {str(e)}")
+        unavailable = [m for m in model_types if not ModelBackends.is_available(m)]
+        for model_type in unavailable:
+            logger.warning(f"Skipping {model_type.value}: {ModelBackends.module_name(model_type)} "
+                           f"is not installed")
+        model_types = [m for m in model_types if m not in unavailable]
+        
+        # Automatic selection: reuse this series' stored sub-ensemble, or train
+        # every member and pick one from the backtest below
+        selector, selection = None, None
+        selection_config = self.model_config.get('model_selection')
+        if selection_config:
+            from model_selection import ModelSelector
+            selector = ModelSelector(**({} if selection_config is True else selection_config))
+            selection = selector.lookup(y, self.series_key)
+            if selection is not None:
+                logger.info(f"Reusing model selection {[m.value for m in selection.model_types]}")
+                model_types = [m for m in model_types if m in selection.model_types] or model_types
+        
+        if self.model_config.get('parallel_training', False):
+            models = self._train_parallel(model_types, X, y)
+        else:
+            models = {}
+            for model_type in model_types:
+                try:
+                    model = self.train_model(model_type, X, y)
+                    models[model_type] = model
+                    logger.info(f"Successfully trained {model_type.value}")
+                except Exception as e:
+                    logger.error(f"Failed to train {model_type.value}: {str(e)}")
         
         self.models = models
         self.is_trained = True
         
+        # Sufficient statistics let the linear member be updated without the full history
+        self.online_state = {}
+        if ModelType.LINEAR_REGRESSION in models:
+            self.online_state[ModelType.LINEAR_REGRESSION] = StreamingLinearStats(X, y)
+        
+        # Out-of-sample metrics and interval residuals from a short backtest,
+        # or in-sample metrics when it is disabled or the history too short
+        self.model_metrics = self.backtest(df, target_col) or self._in_sample_metrics(X, y)
+        
+        if selector is not None and selection is None:
+            if self._backtest_result is None:
+                logger.warning("Model selection needs a backtest; keeping every member")
+            else:
+                selection = selector.select(self._backtest_result)
+                if selection is not None:
+                    self._keep_models(selection.model_types)
+                    selector.store(y, selection, self.series_key)
+        self.model_selection = selection.to_dict() if selection is not None else None
+        
+        return self.models
+    
+    def _keep_models(self, model_types: List[ModelType]) -> None:
+        """Drop the other members, with the backtest metrics of the ones kept"""
+        self.models = {m: model for m, model in self.models.items() if m in model_types}
+        self.scalers = {m: scaler for m, scaler in self.scalers.items() if m in self.models}
+        self.online_state = {m: state for m, state in self.online_state.items() if m in self.models}
+        result = self._backtest_result.subset([m.value for m in self.models])
+        self.model_metrics = result.flat_metrics()
+        self.backtest_residuals = result.residuals()
+    
+    def backtest(self, df: pd.DataFrame, target_col: str = 'net_flow') -> Dict[str, float]:
+        """
+        Rolling-origin backtest of the trained members on the training data.
+
+        train_ensemble runs it after every training: DEFAULT_BACKTEST unless
+        model_config['backtest'] is True (BacktestEngine defaults) or a dict
+        of BacktestEngine options; False disables it. Unless a mode is given, members forecast each fold the
+        way forecast() does: recursively when model_config['recursive_forecast']
+        is set, from future_features() otherwise. Returns {} when the history
+        is too short.
+        """
+        backtest_config = self.model_config.get('backtest')
+        self._backtest_result = None
+        if backtest_config is False or not self.models:
+            self.backtest_residuals = None
+            return {}
+        
+        from backtesting import BacktestEngine
+        
+        if isinstance(backtest_config, dict):
+            options = dict(backtest_config)
+        else:
+            options = dict(self.DEFAULT_BACKTEST) if backtest_config is None else {}
+        options.setdefault('mode', 'recursive' if self.model_config.get('recursive_forecast', False)
+                           else 'direct')
+        result = BacktestEngine(**options).run(self, df, target_col, list(self.models))
+        if result is None:
+            self.backtest_residuals = None
+            return {}
+        self._backtest_result = result
+        # (cutoffs, horizon) out-of-sample ensemble errors, used to calibrate
+        # prediction intervals and for scenario simulation
+        self.backtest_residuals = result.residuals()
+        return result.flat_metrics()
+    
+    def _in_sample_metrics(self, X: Any, y: np.ndarray) -> Dict[str, float]:
+        """Ensemble metrics on the training rows, marked 'in_sample' as they are optimistic"""
+        from backtesting import compute_metrics
+        
+        try:
+            predictions, _ = self.ensemble_predict(np.asarray(X))
+        except ValueError:
+            return {}
+        metrics = compute_metrics(predictions, np.asarray(y, dtype=np.float64))
+        metrics['in_sample'] = 1.0
+        return metrics
+    
+    def update(self, df: pd.DataFrame, new_rows: int,
+               target_col: Optional[str] = None) -> Dict[ModelType, bool]:
+        """
+        Incrementally update trained models with the last `new_rows` rows of df.
+
+        df must hold at least the feature warm-up history before the new rows;
+        the work done scales with the new data, not the total history:
+        - the StandardScaler is updated with streaming mean/variance
+        - the linear member is re-solved from merged sufficient statistics
+        - XGBoost/LightGBM continue boosting from the existing booster on a
+          recent window ('incremental_window' rows, 'incremental_rounds' trees)
+        - the random forest cannot be updated in place and is left as is
+        
+        Returns which models were updated.
+        """
+        if not self.is_trained:
+            raise ValueError("Models must be trained before they can be updated")
+        
+        target_col = target_col or self.target_col
+        window = max(self.model_config.get('incremental_window', 90), new_rows)
+        warmup = max(self.lags + self.windows) + 1
+        matrix = FeatureEngineering.build_feature_matrix(
+            df.tail(warmup + window), target_col, lags=self.lags, windows=self.windows,
+            columns=self.feature_subset
+        )
+        if matrix.columns != self.feature_columns:
+            raise ValueError("Update data does not produce the trained feature columns")
+        
+        X_new, y_new = matrix.values[-new_rows:], matrix.target[-new_rows:]
+        X_window, y_window = matrix.values[-window:], matrix.target[-window:]
+        updated = {}
+        
+        for model_type, model in self.models.items():
+            try:
+                if model_type == ModelType.LINEAR_REGRESSION:
+                    updated[model_type] = self._update_linear(model, X_new, y_new)
+                elif model_type in (ModelType.XGBOOST, ModelType.LIGHTGBM):
+                    updated[model_type] = self._update_booster(model_type, model, X_window, y_window)
+                else:
+                    updated[model_type] = False
+            except Exception as e:
+                logger.error(f"Incremental update of {model_type.value} failed: {str(e)}")
+                updated[model_type] = False
+        
+        logger.info(f"Incrementally updated {[m.value for m, ok in updated.items() if ok]} "
+                    f"with {new_rows} new rows")
+        return updated
+    
+    def _update_linear(self, model: Any, X_new: np.ndarray, y_new: np.ndarray) -> bool:
+        stats = self.online_state.get(ModelType.LINEAR_REGRESSION)
+        scaler = self.scalers.get(ModelType.LINEAR_REGRESSION)
+        if stats is None or scaler is None:
+            return False
+        
+        scaler.partial_fit(self._scaler_input(scaler, X_new))
+        stats.update(X_new, y_new)
+        coef, intercept = stats.solve(scaler.scale_, alpha=getattr(model, 'alpha', 0.0))
+        model.coef_, model.intercept_ = coef, intercept
+        return True
+    
+    def _scaler_input(self, scaler: Any, X: np.ndarray) -> Any:
+        """
+        X as the scaler was fitted: scalers are fitted on the bare matrix, but
+        one fitted on a frame (feature_names_in_ set) gets a frame of
+        feature_columns, or scikit-learn warns about missing feature names
+        """
+        if hasattr(scaler, 'feature_names_in_'):
+            return pd.DataFrame(X, columns=self.feature_columns, copy=False)
+        return X
+    
+    def _update_booster(self, model_type: ModelType, model: Any, X: np.ndarray,
+                        y: np.ndarray) -> bool:
+        rounds = self.model_config.get('incremental_rounds', 10)
+        max_rounds = self.model_config.get('max_boosting_rounds', 1000)
+        
+        continued = self.build_model(model_type, params={'n_estimators': rounds})
+        if model_type == ModelType.XGBOOST:
+            booster = model.get_booster()
+            if booster.num_boosted_rounds() + rounds > max_rounds:
+                logger.info(f"{model_type.value} reached {max_rounds} rounds; full retrain needed")
+                return False
+            continued.fit(X, y, xgb_model=booster)
+        else:
+            booster = model.booster_
+            if booster.current_iteration() + rounds > max_rounds:
+                logger.info(f"{model_type.value} reached {max_rounds} rounds; full retrain needed")
+                return False
+            continued.fit(X, y, init_model=booster)
+        
+        self.models[model_type] = continued
+        return True
+    
+    @staticmethod
+    def allocate_threads(model_types: List[ModelType], core_budget: int) -> Dict[ModelType, int]:
+        """
+        Split a core budget across ensemble members.
+
+        Single-threaded members get one core each; the rest of the budget is
+        shared evenly between the multi-threaded tree models.
+        """
+        threaded = [m for m in model_types if m not in SINGLE_THREADED_MODELS]
+        shares = {m: 1 for m in model_types}
+        spare = max(core_budget - len(model_types), 0)
+        for i, model_type in enumerate(threaded):
+            shares[model_type] += spare // len(threaded) + (1 if i < spare % len(threaded) else 0)
+        return shares
+    
+    def _train_parallel(self, model_types: List[ModelType], X: pd.DataFrame,
+                        y: np.ndarray) -> Dict[ModelType, Any]:
+        """
+        Train ensemble members concurrently in a process pool under a core budget.
+
+        Members are handed to the pool only as workers free up, so each one's
+        member_timeout runs from its own start. A timed-out member keeps its
+        worker busy; once every worker is stuck the pool is replaced.
+        """
+        core_budget = self.model_config.get('core_budget') or os.cpu_count() or 1
+        member_timeout = self.model_config.get('member_timeout')
+        shares = self.allocate_threads(model_types, core_budget)
+        processes = min(len(model_types), core_budget)
+        logger.info(f"Training {len(model_types)} models in {processes} processes "
+                    f"with {core_budget} cores: {[(m.value, n) for m, n in shares.items()]}")
+        
+        config = {k: v for k, v in self.model_config.items() if k != 'parallel_training'}
+        models = {}
+        waiting = list(model_types)
+        running: Dict[ModelType, Tuple[Any, Optional[float]]] = {}
+        pool, slots = None, 0
+        try:
+            while waiting or running:
+                if waiting and slots == 0:
+                    if pool is not None:
+                        pool.terminate()
+                        pool.join()
+                    slots = min(len(waiting), processes)
+                    pool = self._process_pool(slots)
+                while waiting and len(running) < slots:
+                    model_type = waiting.pop(0)
+                    deadline = None if member_timeout is None else time.monotonic() + member_timeout
+                    running[model_type] = (pool.apply_async(
+                        _train_ensemble_member, (config, model_type, X, y, shares[model_type])
+                    ), deadline)
+                
+                # Wait for the next member to finish or run out of time
+                deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+                wait = 0.05 if not deadlines else min(0.05, max(min(deadlines) - time.monotonic(), 0))
+                next(iter(running.values()))[0].wait(wait)
+                
+                for model_type, (result, deadline) in list(running.items()):
+                    if result.ready():
+                        del running[model_type]
+                        try:
+                            model, scaler = result.get()
+                        except Exception as e:
+                            logger.error(f"Failed to train {model_type.value}: {str(e)}")
+                            continue
+                        models[model_type] = model
+                        if scaler is not None:
+                            self.scalers[model_type] = scaler
+                        logger.info(f"Successfully trained {model_type.value}")
+                    elif deadline is not None and time.monotonic() >= deadline:
+                        del running[model_type]
+                        # Its worker stays busy until the pool is terminated
+                        slots -= 1
+                        logger.error(f"Training {model_type.value} timed out after {member_timeout}s")
+        finally:
+            # Terminate rather than close so timed-out members stop consuming cores
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        
         return models
     
-    def predict(self, X: pd.DataFrame, model_type: ModelType) -> np.ndarray:
-        """Make predictions with a specific model"""
+    def _process_pool(self, processes: int, initializer: Optional[Any] = None,
+                      initargs: Tuple = ()) -> Any:
+        """Create a worker pool for CPU-bound training"""
+        # forkserver children start from a clean process that has only imported
+        # this module, avoiding fork-after-OpenMP deadlocks in the tree libraries
+        context = multiprocessing.get_context(self.model_config.get('mp_start_method', 'forkserver'))
+        if context.get_start_method() == 'forkserver':
+            # Preload the backends this process already uses so workers share them
+            loaded = [name for name in set(ModelBackends.BACKENDS.values()) if name in sys.modules]
+            context.set_forkserver_preload([__name__] + sorted(loaded))
+        return context.Pool(processes=processes, initializer=initializer, initargs=initargs)
+    
+    def config_signature(self) -> str:
+        """Canonical JSON of the feature and model configuration a trained ensemble depends on"""
+        config = {key: self.model_config.get(key) for key in self.FINGERPRINT_CONFIG_KEYS}
+        for key, value in config.items():
+            # Selection caches only decide where results are stored
+            if isinstance(value, dict):
+                config[key] = {name: option for name, option in value.items() if name != 'cache'}
+        config['model_params'] = {getattr(model_type, 'value', model_type): params
+                                  for model_type, params in self.model_params.items()}
+        config['feature_set_version'] = FeatureEngineering.FEATURE_SET_VERSION
+        if config['feature_dtype'] is not None:
+            config['feature_dtype'] = np.dtype(config['feature_dtype']).name
+        return json.dumps(config, sort_keys=True, default=str)
+    
+    def training_fingerprint(self, df: pd.DataFrame, target_col: str = 'net_flow') -> str:
+        """
+        Content hash identifying a training series plus the feature and model
+        configuration (hyperparameters included, see config_signature)
+        """
+        from model_registry import ModelRegistry
+        return ModelRegistry.fingerprint(df, target_col, self.lags, self.windows,
+                                         self.config_signature())
+    
+    def load_or_train(self, df: pd.DataFrame, organization_id: str,
+                      target_col: str = 'net_flow') -> bool:
+        """
+        Load the registered ensemble for unchanged training data, otherwise
+        train one and register it. Returns True on a registry hit.
+        """
+        if self.registry is None:
+            raise ValueError("No model registry configured")
+        
+        fingerprint = self.training_fingerprint(df, target_col)
+        if self.registry.load(organization_id, fingerprint, self):
+            logger.info(f"Loaded registered model for {organization_id} ({fingerprint})")
+            return True
+        
+        self.series_key = str(organization_id)
+        self.train_ensemble(df, target_col)
+        self.registry.save(organization_id, fingerprint, self)
+        return False
+    
+    def predict(self, X: Any, model_type: ModelType) -> np.ndarray:
+        """Make predictions with a specific model from a frame or matrix of feature_columns"""
         if not self.is_trained:
             raise ValueError("Models must be trained before making predictions")
         
@@ -289,15 +1349,18 @@ class CashFlowForecaster:
         if not model:
             raise ValueError(f"Model {model_type.value} not found")
         
+        X = np.asarray(X)
         # Apply scaling if needed
         if model_type in self.scalers:
-            X_scaled = self.scalers[model_type].transform(X)
+            scaler = self.scalers[model_type]
+            X_scaled = scaler.transform(self._scaler_input(scaler, X))
             return model.predict(X_scaled)
         else:
             return model.predict(X)
     
-    def ensemble_predict(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Make ensemble predictions"""
+    def ensemble_predict(self, X: Any,
+                         predictors: Optional[Dict[ModelType, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Make ensemble predictions, with predictors from _row_predictors() if given"""
         if not self.models:
             raise ValueError("No models trained for ensemble prediction")
         
@@ -306,7 +1369,10 @@ class CashFlowForecaster:
         
         for model_type, model in self.models.items():
             try:
-                pred = self.predict(X, model_type)
+                if predictors is not None:
+                    pred = predictors[model_type](X)
+                else:
+                    pred = self.predict(X, model_type)
                 predictions.append(pred)
                 weights.append(1.0)  # Equal weights for now
             except Exception as e:
@@ -324,48 +1390,161 @@ class CashFlowForecaster:
         
         return ensemble_pred, pred_std
     
+    def _row_predictors(self) -> Dict[ModelType, Any]:
+        """
+        Predict function per member for one-row matrices. The estimators'
+        predict validates its input and dispatches threads on every call,
+        which dominates a one-row prediction, so LightGBM predicts straight
+        from its booster and the forest and linear member are flattened into
+        their model_serving equivalents (same predictions).
+        """
+        from model_serving import CompactLinearModel, CompactTreeEnsemble
+        
+        predictors = {}
+        for model_type, model in self.models.items():
+            predictors[model_type] = partial(self.predict, model_type=model_type)
+            try:
+                if model_type == ModelType.RANDOM_FOREST and hasattr(model, 'estimators_'):
+                    predictors[model_type] = CompactTreeEnsemble.from_forest(model).predict
+                elif model_type == ModelType.LIGHTGBM and hasattr(model, 'booster_'):
+                    predictors[model_type] = model.booster_.predict
+                elif model_type == ModelType.LINEAR_REGRESSION and hasattr(model, 'coef_'):
+                    predictors[model_type] = CompactLinearModel(model, self.scalers.get(model_type)).predict
+            except Exception as e:
+                logger.warning(f"Predicting {model_type.value} rows with the estimator: {str(e)}")
+        return predictors
+    
+    def recursive_predict(self, df: pd.DataFrame, forecast_days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict the horizon one step at a time, feeding each prediction back
+        into the lag and rolling features of the next step.
+
+        Exogenous columns that are unknown in the future (inflow, outflow) are
+        held at their trailing 7-day mean; the balance is rolled forward with
+        the predicted net flow.
+        """
+        if not self.models:
+            raise ValueError("No models trained for ensemble prediction")
+
+        target_col = self.target_col
+        history = df[target_col].to_numpy(dtype=np.float64)
+        state = RecursiveFeatureState(history, self.lags, self.windows)
+        col_index = {name: i for i, name in enumerate(self.feature_columns)}
+
+        last_date = pd.to_datetime(df['date']).max()
+        future_dates = np.arange(1, forecast_days + 1).astype('timedelta64[D]') + \
+            np.datetime64(last_date, 'D')
+
+        # Calendar features are known up front, so fill them for the whole horizon at once
+        horizon = np.zeros((forecast_days, len(self.feature_columns)), dtype=np.float64)
+        time_block = np.empty((forecast_days, len(FeatureEngineering.TIME_FEATURES)))
+        FeatureEngineering._fill_time_features(time_block, future_dates)
+        for j, name in enumerate(FeatureEngineering.TIME_FEATURES):
+            if name in col_index:
+                horizon[:, col_index[name]] = time_block[:, j]
+
+        # Exogenous columns: hold at recent levels, other passthrough at last value
+        recent = df.tail(7)
+        exogenous = {col: float(df[col].iloc[-1]) for col in df.columns
+                     if col in col_index}
+        for col in ('total_inflow', 'total_outflow'):
+            if col in df.columns:
+                exogenous[col] = float(recent[col].mean())
+        inflow = exogenous.get('total_inflow', np.nan)
+        outflow = exogenous.get('total_outflow', np.nan)
+        last_inflow = float(df['total_inflow'].iloc[-1]) if 'total_inflow' in df.columns else np.nan
+        last_outflow = float(df['total_outflow'].iloc[-1]) if 'total_outflow' in df.columns else np.nan
+        balance = float(df['total_balance'].iloc[-1]) if 'total_balance' in df.columns else np.nan
+
+        lag_cols = [(lag, col_index.get(f'{target_col}_lag_{lag}')) for lag in self.lags]
+        rolling_cols = [
+            (window, [col_index.get(f'{target_col}_rolling_{stat}_{window}')
+                      for stat in FeatureEngineering.ROLLING_STATS])
+            for window in self.windows
+        ]
+
+        predictors = self._row_predictors()
+        predictions = np.empty(forecast_days)
+        std_dev = np.empty(forecast_days)
+        for step in range(forecast_days):
+            row = horizon[step]
+
+            for lag, idx in lag_cols:
+                if idx is not None:
+                    row[idx] = state.lag(lag)
+            for window, idxs in rolling_cols:
+                for idx, value in zip(idxs, state.rolling(window)):
+                    if idx is not None:
+                        row[idx] = value
+
+            for col, value in exogenous.items():
+                row[col_index[col]] = value
+            business = FeatureEngineering.future_business_features(
+                inflow, outflow, balance, last_inflow, last_outflow
+            )
+            for col, value in business.items():
+                if col in col_index:
+                    row[col_index[col]] = value
+
+            step_pred, step_std = self.ensemble_predict(row[np.newaxis, :], predictors)
+            predictions[step] = step_pred[0]
+            std_dev[step] = step_std[0]
+
+            state.push(predictions[step])
+            balance += predictions[step]
+            last_inflow, last_outflow = inflow, outflow
+
+        return predictions, std_dev
+
+    def future_features(self, df: pd.DataFrame, forecast_days: int) -> pd.DataFrame:
+        """
+        Feature rows for the forecast_days after df for non-recursive
+        forecasting: calendar features of each day, lag features at the mean
+        of the last 10 days and every other feature at 0.
+        """
+        last_date = pd.to_datetime(df['date']).max()
+        future_df = pd.DataFrame({'date': [last_date + timedelta(days=i + 1)
+                                           for i in range(forecast_days)]})
+        future_df = FeatureEngineering().create_time_features(future_df)
+        
+        for col in self.feature_columns:
+            if col not in future_df.columns:
+                if col.startswith(('net_flow_lag', 'total_inflow_lag', 'total_outflow_lag')):
+                    future_df[col] = df[col.split('_lag')[0]].tail(10).mean()
+                else:
+                    future_df[col] = 0
+        
+        return future_df.reindex(columns=self.feature_columns, fill_value=0)
+    
     def forecast(self, df: pd.DataFrame, forecast_days: int = 30, 
-                confidence_level: float = 0.95) -> ForecastResult:
+                confidence_level: float = 0.95,
+                recursive: Optional[bool] = None,
+                organization_id: Optional[str] = None) -> ForecastResult:
         """Generate forecast for specified number of days"""
         logger.info(f"Generating {forecast_days}-day forecast")
         
         if not self.is_trained:
-            self.train_ensemble(df)
+            if self.registry is not None and organization_id is not None:
+                self.load_or_train(df, organization_id)
+            else:
+                self.train_ensemble(df)
         
         # Prepare future dates
         last_date = pd.to_datetime(df['date']).max()
         future_dates = [last_date + timedelta(days=i+1) for i in range(forecast_days)]
         
-        # Create future features (simplified approach)
-        future_df = pd.DataFrame({'date': future_dates})
-        feature_eng = FeatureEngineering()
-        future_df = feature_eng.create_time_features(future_df)
+        if recursive is None:
+            recursive = self.model_config.get('recursive_forecast', False)
         
-        # Fill missing features with last known values or averages
-        for col in self.feature_columns:
-            if col not in future_df.columns:
-                if col.startswith(('net_flow_lag', 'total_inflow_lag', 'total_outflow_lag')):
-                    # Use recent values for lag features
-                    recent_values = df[col.split('_lag')[0]].tail(10).mean()
-                    future_df[col] = recent_values
-                else:
-                    future_df[col] = 0  # Default value
-        
-        # Ensure all required columns are present
-        future_df = future_df.reindex(columns=self.feature_columns, fill_value=0)
-        
-        # Make ensemble predictions
-        predictions, std_dev = self.ensemble_predict(future_df)
+        if recursive:
+            predictions, std_dev = self.recursive_predict(df, forecast_days)
+        else:
+            predictions, std_dev = self.ensemble_predict(self.future_features(df, forecast_days))
         
-        # Calculate confidence intervals
-        z_score = 1.96 if confidence_level == 0.95 else 2.58  # 95% or 99%
-        confidence_intervals = np.column_stack([
-            predictions - z_score * std_dev,
-            predictions + z_score * std_dev
-        ])
+        confidence_intervals, one_sigma = self.prediction_intervals(predictions, std_dev, confidence_level)
         
-        # Calculate confidence score based on prediction stability
-        confidence_score = max(0.1, min(0.95, 1.0 - (np.mean(std_dev) / np.mean(np.abs(predictions)))))
+        # Confidence score from the calibrated one-sigma band relative to the forecast scale
+        confidence_score = max(0.1, min(0.95, 1.0 - (np.mean(one_sigma) / np.mean(np.abs(predictions)))))
         
         return ForecastResult(
             predictions=predictions,
@@ -377,6 +1556,44 @@ class CashFlowForecaster:
             confidence_score=confidence_score
         )
     
+    def interval_calibrator(self) -> Optional[Any]:
+        """Conformal calibrator for the current backtest residuals, built once per set of residuals"""
+        residuals, calibrator = self._calibrator
+        if residuals is not self.backtest_residuals:
+            calibrator = None
+            if self.backtest_residuals is not None and np.size(self.backtest_residuals):
+                from prediction_intervals import ConformalCalibrator
+                calibrator = ConformalCalibrator(self.backtest_residuals,
+                                                 **self.model_config.get('conformal', {}))
+            self._calibrator = (self.backtest_residuals, calibrator)
+        return calibrator
+    
+    def prediction_intervals(self, predictions: np.ndarray, std_dev: np.ndarray,
+                             confidence_level: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (horizon, 2) interval bounds at any confidence level, plus the one-sigma
+        equivalent half-width used for the confidence score.
+
+        Intervals are split-conformal from the backtest residuals unless
+        model_config['interval_method'] is 'spread' or the model was not
+        backtested, in which case they fall back to the ensemble spread.
+        """
+        calibrator = None
+        if self.model_config.get('interval_method', 'conformal') == 'conformal':
+            calibrator = self.interval_calibrator()
+        
+        if calibrator is not None:
+            intervals = calibrator.intervals(predictions, confidence_level)
+            one_sigma = calibrator.half_width(ONE_SIGMA_LEVEL, len(predictions))
+            return intervals, one_sigma
+        
+        z_score = NormalDist().inv_cdf(0.5 + confidence_level / 2)
+        intervals = np.column_stack([
+            predictions - z_score * std_dev,
+            predictions + z_score * std_dev
+        ])
+        return intervals, std_dev
+    
     def _get_feature_importance(self) -> Dict[str, float]:
         """Get feature importance from tree-based models"""
         importance_dict = {}
@@ -397,63 +1614,32 @@ class CashFlowForecaster:
         return dict(sorted(importance_dict.items(), key=lambda x: x[1], reverse=True))
     
     def _calculate_metrics(self, df: pd.DataFrame) -> Dict[str, float]:
-        """Calculate model performance metrics"""
-        # This would typically use a validation set
-        # For now, return placeholder metrics
-        return {
-            'mae': 0.15,
-            'mse': 0.03,
-            'rmse': 0.17,
-            'r2': 0.85,
-            'mape': 12.5
-        }
+        """Backtest metrics of the trained ensemble (in-sample if it was not backtested)"""
+        return dict(self.model_metrics)
     
     def optimize_hyperparameters(self, X: pd.DataFrame, y: np.ndarray, 
-                                model_type: ModelType, n_trials: int = 100) -> Dict:
-        """Optimize hyperparameters using Optuna"""
-        logger.info(f"Optimizing hyperparameters for {model_type.value}")
+                                model_type: ModelType, n_trials: int = 100,
+                                study_name: Optional[str] = None,
+                                fingerprint: Optional[str] = None) -> Dict:
+        """
+        Optimize hyperparameters using Optuna.
+
+        Tuning options come from model_config['tuning'] (see HyperparameterTuner).
+        Studies are keyed by series_key and the training data fingerprint
+        (pass training_fingerprint(df) to reuse the registry's). The best
+        parameters are kept in model_params so later training uses them.
+        """
+        from hyperparameter_tuning import HyperparameterTuner
         
-        def objective(trial):
-            if model_type == ModelType.XGBOOST:
-                params = {
-                    'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                    'max_depth': trial.suggest_int('max_depth', 3, 10),
-                    'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                    'subsample': trial.suggest_float('subsample', 0.6, 1.0),
-                    'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
-                }
-                model = xgb.XGBRegressor(**params, random_state=42, n_jobs=-1)
-                
-            elif model_type == ModelType.LIGHTGBM:
-                params = {
-                    'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                    'max_depth': trial.suggest_int('max_depth', 3, 10),
-                    'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                    'num_leaves': trial.suggest_int('num_leaves', 10, 100),
-                    'feature_fraction': trial.suggest_float('feature_fraction', 0.6, 1.0),
-                }
-                model = lgb.LGBMRegressor(**params, random_state=42, n_jobs=-1, verbose=-1)
-            
-            else:
-                return float('inf')  # Skip unsupported models
-            
-            # Time series cross-validation
-            tscv = TimeSeriesSplit(n_splits=5)
-            scores = []
-            
-            for train_idx, val_idx in tscv.split(X):
-                X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-                y_train, y_val = y[train_idx], y[val_idx]
-                
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_val)
-                score = mean_absolute_error(y_val, y_pred)
-                scores.append(score)
-            
-            return np.mean(scores)
+        logger.info(f"Optimizing hyperparameters for {model_type.value}")
         
-        study = optuna.create_study(direction='minimize')
-        study.optimize(objective, n_trials=n_trials)
+        tuning_config = dict(self.model_config.get('tuning', {}))
+        tuning_config.setdefault('core_budget', self.model_config.get('core_budget'))
+        tuner = HyperparameterTuner(**tuning_config)
+        best_params = tuner.tune(self, X, y, model_type, n_trials=n_trials, study_name=study_name,
+                                 fingerprint=fingerprint)
         
-        logger.info(f"Best parameters: {study.best_params}")
-        return study.best_params
+        if best_params:
+            self.model_params[model_type] = best_params
+        logger.info(f"Best parameters: {best_params}")
+        return best_params
@@ -0,0 +1,246 @@
+"""
+Hyperparameter tuning for forecasting ensemble members
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import optuna
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+from forecasting_engine import CashFlowForecaster, ModelType, thread_limits
+
+logger = logging.getLogger(__name__)
+
+Fold = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+TUNABLE_MODELS = [
+    ModelType.LINEAR_REGRESSION,
+    ModelType.RANDOM_FOREST,
+    ModelType.XGBOOST,
+    ModelType.LIGHTGBM,
+]
+
+
+def suggest_params(trial: optuna.Trial, model_type: ModelType) -> Dict[str, Any]:
+    """Search space for each ensemble member"""
+    if model_type == ModelType.XGBOOST:
+        return {
+            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'max_depth': trial.suggest_int('max_depth', 3, 10),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+            'subsample': trial.suggest_float('subsample', 0.6, 1.0),
+            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
+        }
+    elif model_type == ModelType.LIGHTGBM:
+        return {
+            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'max_depth': trial.suggest_int('max_depth', 3, 10),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+            'num_leaves': trial.suggest_int('num_leaves', 10, 100),
+            'feature_fraction': trial.suggest_float('feature_fraction', 0.6, 1.0),
+        }
+    elif model_type == ModelType.RANDOM_FOREST:
+        return {
+            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'max_depth': trial.suggest_int('max_depth', 3, 20),
+            'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 20),
+            'max_features': trial.suggest_float('max_features', 0.3, 1.0),
+        }
+    elif model_type == ModelType.LINEAR_REGRESSION:
+        return {
+            'alpha': trial.suggest_float('alpha', 1e-4, 100.0, log=True),
+        }
+    raise ValueError(f"Model {model_type.value} is not tunable")
+
+
+def build_folds(X: pd.DataFrame, y: np.ndarray, n_splits: int = 5,
+                scale: bool = False) -> List[Fold]:
+    """
+    Build the time series cross-validation fold matrices once.
+
+    TimeSeriesSplit folds are contiguous ranges, so each fold is a view
+    into a single float64 copy of X; only scaled folds allocate new arrays.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    folds = []
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        train_end = train_idx[-1] + 1
+        val_start, val_end = val_idx[0], val_idx[-1] + 1
+        X_train, X_val = X[:train_end], X[val_start:val_end]
+        if scale:
+            scaler = StandardScaler().fit(X_train)
+            X_train, X_val = scaler.transform(X_train), scaler.transform(X_val)
+        folds.append((X_train, y[:train_end], X_val, y[val_start:val_end]))
+    return folds
+
+
+def _objective(trial: optuna.Trial, forecaster: CashFlowForecaster, model_type: ModelType,
+               folds: List[Fold], n_jobs: int) -> float:
+    """Mean validation MAE across folds, reported per fold so the pruner can stop early"""
+    params = suggest_params(trial, model_type)
+    scores = []
+
+    for step, (X_train, y_train, X_val, y_val) in enumerate(folds):
+        model = forecaster.build_model(model_type, n_jobs=n_jobs, params=params)
+        with thread_limits(n_jobs):
+            model.fit(X_train, y_train)
+        scores.append(float(np.mean(np.abs(y_val - model.predict(X_val)))))
+
+        trial.report(float(np.mean(scores)), step)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+
+    return float(np.mean(scores))
+
+
+def _run_worker(tuner_config: Dict[str, Any], model_config: Dict, study_name: str,
+                model_type: ModelType, folds: List[Fold], n_trials: int,
+                n_jobs: int, seed: int) -> int:
+    """Process pool entry point: run a share of the trials against the shared study"""
+    tuner = HyperparameterTuner(**tuner_config)
+    study = tuner.create_study(study_name, seed=seed)
+    forecaster = CashFlowForecaster(model_config)
+    study.optimize(lambda trial: _objective(trial, forecaster, model_type, folds, n_jobs),
+                   n_trials=n_trials)
+    return n_trials
+
+
+class HyperparameterTuner:
+    """
+    Optuna tuning with fold pruning, resumable studies and parallel workers.
+
+    Studies live in a local SQLite database when storage_path is set, so an
+    interrupted run resumes where it stopped and several worker processes can
+    share one study. Without storage the study is in-memory and runs in this
+    process.
+    """
+
+    def __init__(self, storage_path: Optional[str] = None, pruner: str = 'median',
+                 n_workers: int = 1, n_splits: int = 5, core_budget: Optional[int] = None,
+                 seed: int = 42):
+        self.storage_path = storage_path
+        self.pruner = pruner
+        self.n_workers = n_workers
+        self.n_splits = n_splits
+        self.core_budget = core_budget or os.cpu_count() or 1
+        self.seed = seed
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {
+            'storage_path': self.storage_path,
+            'pruner': self.pruner,
+            'n_workers': self.n_workers,
+            'n_splits': self.n_splits,
+            'core_budget': self.core_budget,
+            'seed': self.seed,
+        }
+
+    def _make_pruner(self) -> optuna.pruners.BasePruner:
+        if self.pruner == 'median':
+            return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+        elif self.pruner == 'halving':
+            return optuna.pruners.SuccessiveHalvingPruner()
+        elif self.pruner == 'none':
+            return optuna.pruners.NopPruner()
+        raise ValueError(f"Unknown pruner: {self.pruner}")
+
+    def _storage(self) -> Optional[optuna.storages.RDBStorage]:
+        if not self.storage_path:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(self.storage_path)), exist_ok=True)
+        return optuna.storages.RDBStorage(
+            f"sqlite:///{self.storage_path}",
+            # Concurrent workers wait on SQLite's write lock instead of failing
+            engine_kwargs={'connect_args': {'timeout': 60}},
+        )
+
+    def create_study(self, study_name: str, seed: Optional[int] = None) -> optuna.Study:
+        return optuna.create_study(
+            study_name=study_name,
+            storage=self._storage(),
+            load_if_exists=True,
+            direction='minimize',
+            sampler=optuna.samplers.TPESampler(seed=self.seed if seed is None else seed),
+            pruner=self._make_pruner(),
+        )
+
+    @staticmethod
+    def study_name(model_type: ModelType, X: pd.DataFrame, y: np.ndarray,
+                   series_key: Optional[str] = None, fingerprint: Optional[str] = None) -> str:
+        """
+        Study name for one series, model and training set, so a shared
+        storage never resumes another series' (or older data's) study.
+        """
+        if fingerprint is None:
+            from model_registry import ModelRegistry
+            fingerprint = ModelRegistry.fingerprint(pd.DataFrame(X).assign(__target__=np.asarray(y)))
+        return f"{series_key or 'default'}:{model_type.value}:{fingerprint}"
+
+    def tune(self, forecaster: CashFlowForecaster, X: pd.DataFrame, y: np.ndarray,
+             model_type: ModelType, n_trials: int = 100,
+             study_name: Optional[str] = None,
+             fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run (or resume) a study until it has n_trials finished trials.
+
+        The study is named after forecaster.series_key, the model and the
+        training data fingerprint (hashed from X and y unless given) unless
+        study_name is set. Returns {} when no trial completed.
+        """
+        if model_type not in TUNABLE_MODELS:
+            raise ValueError(f"Model {model_type.value} is not tunable")
+
+        folds = build_folds(X, y, self.n_splits,
+                            scale=model_type == ModelType.LINEAR_REGRESSION)
+        study_name = study_name or self.study_name(model_type, X, y, forecaster.series_key,
+                                                   fingerprint)
+        study = self.create_study(study_name)
+
+        finished = sum(1 for trial in study.trials if trial.state in (
+            optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED))
+        remaining = max(n_trials - finished, 0)
+        if finished:
+            logger.info(f"Resuming study {study_name}: {finished} trials done, {remaining} to go")
+
+        n_workers = min(self.n_workers, remaining) if remaining else 0
+        if n_workers > 1 and not self.storage_path:
+            logger.warning("Parallel tuning needs storage_path; running trials in-process")
+            n_workers = 1
+
+        n_jobs = max(self.core_budget // max(n_workers, 1), 1)
+        if n_workers > 1:
+            shares = [remaining // n_workers + (1 if i < remaining % n_workers else 0)
+                      for i in range(n_workers)]
+            pool = forecaster._process_pool(n_workers)
+            try:
+                pool.starmap(_run_worker, [
+                    (self.config, forecaster.model_config, study_name, model_type,
+                     folds, share, n_jobs, self.seed + i + 1)
+                    for i, share in enumerate(shares)
+                ])
+            finally:
+                pool.close()
+                pool.join()
+            study = self.create_study(study_name)
+        elif remaining:
+            study.optimize(lambda trial: _objective(trial, forecaster, model_type, folds, n_jobs),
+                           n_trials=remaining)
+
+        pruned = sum(1 for trial in study.trials if trial.state == optuna.trial.TrialState.PRUNED)
+        completed = [trial for trial in study.trials
+                     if trial.state == optuna.trial.TrialState.COMPLETE]
+        if not completed:
+            logger.warning(f"Study {study_name}: no trial completed ({len(study.trials)} trials, "
+                           f"{pruned} pruned); keeping default parameters")
+            return {}
+        logger.info(f"Study {study_name}: {len(study.trials)} trials, {pruned} pruned, "
+                    f"best MAE {study.best_value:.4f}")
+        return study.best_params
@@ -0,0 +1,235 @@
+"""
+Persistent registry of trained forecasting models
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Forecaster attributes that make up a trained model
+STATE_ATTRIBUTES = ['models', 'scalers', 'feature_columns', 'feature_subset', 'target_col',
+                    'lags', 'windows', 'online_state', 'model_metrics', 'backtest_residuals',
+                    'model_selection']
+
+# Libraries whose versions are recorded with an entry, by module and distribution name
+LIBRARY_DISTRIBUTIONS = {
+    'numpy': 'numpy', 'pandas': 'pandas', 'sklearn': 'scikit-learn', 'xgboost': 'xgboost',
+    'lightgbm': 'lightgbm', 'prophet': 'prophet', 'statsmodels': 'statsmodels',
+}
+
+
+def default_root() -> str:
+    """The backend's settings.ML_MODEL_PATH when running in the backend, else $ML_MODEL_PATH"""
+    try:
+        from config import settings
+        return settings.ML_MODEL_PATH
+    except (ImportError, AttributeError):
+        return os.environ.get('ML_MODEL_PATH', 'models/')
+
+
+class ModelRegistry:
+    """
+    On-disk store of trained ensembles keyed by organization and a content
+    hash of the training data.
+
+    Each entry is a pickled payload plus a JSON metadata sidecar written
+    atomically (temp file + rename), so concurrent readers never see a
+    partial file. Entries are evicted least-recently-used first once the
+    registry exceeds its entry count or size budget. Usage is tracked from
+    the last scan plus this process's saves; the tree is rescanned only
+    when that estimate is over budget or older than scan_interval seconds
+    (other processes may be writing too).
+    """
+
+    FORMAT_VERSION = 6
+
+    def __init__(self, root: Optional[str] = None, max_entries: int = 1000,
+                 max_bytes: int = 5 * 1024 ** 3, scan_interval: float = 300.0):
+        self.root = Path(root or default_root())
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.scan_interval = scan_interval
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._usage: Optional[List[int]] = None
+        self._scanned_at = 0.0
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame, *extra: Any) -> str:
+        """Content hash of a training frame plus any feature configuration"""
+        digest = hashlib.sha256()
+        digest.update(','.join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        for item in extra:
+            digest.update(repr(item).encode())
+        return digest.hexdigest()[:32]
+
+    def _entry_path(self, organization_id: str, fingerprint: str) -> Path:
+        return self.root / str(organization_id) / f"{fingerprint}.pkl"
+
+    @staticmethod
+    def _library_versions(names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Versions of the given libraries (default: those this process has
+        loaded). Libraries that are not imported are looked up from their
+        installed distribution, since backends are imported lazily.
+        """
+        versions = {'python': sys.version.split()[0]}
+        if names is None:
+            names = [name for name in LIBRARY_DISTRIBUTIONS if name in sys.modules]
+        for name in names:
+            if name == 'python':
+                continue
+            module = sys.modules.get(name)
+            if module is not None:
+                versions[name] = getattr(module, '__version__', 'unknown')
+                continue
+            try:
+                versions[name] = importlib.metadata.version(LIBRARY_DISTRIBUTIONS.get(name, name))
+            except importlib.metadata.PackageNotFoundError:
+                versions[name] = 'missing'
+        return versions
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def save(self, organization_id: str, fingerprint: str, forecaster: Any) -> Path:
+        """Serialize a trained forecaster's models, scalers and feature columns"""
+        if not forecaster.is_trained:
+            raise ValueError("Only trained forecasters can be registered")
+
+        state = {attr: getattr(forecaster, attr) for attr in STATE_ATTRIBUTES}
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        metadata = {
+            'format_version': self.FORMAT_VERSION,
+            'organization_id': str(organization_id),
+            'fingerprint': fingerprint,
+            'model_types': [model_type.value for model_type in forecaster.models],
+            'feature_count': len(forecaster.feature_columns),
+            'size_bytes': len(payload),
+            'created_at': time.time(),
+            'libraries': self._library_versions(),
+        }
+
+        path = self._entry_path(organization_id, fingerprint)
+        self._atomic_write(path, payload)
+        self._atomic_write(path.with_suffix('.json'), json.dumps(metadata).encode())
+        logger.info(f"Registered model for {organization_id} ({fingerprint}, {len(payload)} bytes)")
+
+        self._track_save(len(payload))
+        return path
+
+    def metadata(self, organization_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Read an entry's metadata, or None if it does not exist"""
+        path = self._entry_path(organization_id, fingerprint).with_suffix('.json')
+        try:
+            return json.loads(path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def load(self, organization_id: str, fingerprint: str, forecaster: Any) -> bool:
+        """
+        Restore a registered model into forecaster.
+
+        Returns False on a miss, including entries written by an incompatible
+        registry format or library version.
+        """
+        path = self._entry_path(organization_id, fingerprint)
+        metadata = self.metadata(organization_id, fingerprint)
+        if metadata is None or not path.exists():
+            return False
+
+        if metadata.get('format_version') != self.FORMAT_VERSION:
+            logger.info(f"Ignoring registry entry {fingerprint}: format version mismatch")
+            return False
+        recorded = metadata.get('libraries', {})
+        current = self._library_versions(list(recorded))
+        stale = [name for name, version in recorded.items() if current.get(name) != version]
+        if stale:
+            logger.info(f"Ignoring registry entry {fingerprint}: library versions changed ({stale})")
+            return False
+
+        try:
+            state = pickle.loads(path.read_bytes())
+        except Exception as e:
+            logger.warning(f"Failed to load registry entry {fingerprint}: {str(e)}")
+            return False
+
+        for attr, value in state.items():
+            setattr(forecaster, attr, value)
+        forecaster.is_trained = True
+        # Caches keyed by series (ARIMA orders, Prophet params, selections) use it on retrain
+        forecaster.series_key = str(organization_id)
+
+        # Touch the entry so LRU eviction sees it as recently used
+        os.utime(path)
+        return True
+
+    def _entries(self) -> List[Path]:
+        return list(self.root.glob('*/*.pkl'))
+
+    def remove(self, path: Path) -> None:
+        for file in (path, path.with_suffix('.json')):
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _track_save(self, size: int) -> None:
+        stale = time.monotonic() - self._scanned_at > self.scan_interval
+        if self._usage is None or stale:
+            self.evict()
+            return
+        # Overwrites are counted as new entries, which only makes the next scan earlier
+        self._usage[0] += 1
+        self._usage[1] += size
+        if self._usage[0] > self.max_entries or self._usage[1] > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the registry fits its budget"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self.remove(path)
+            total_bytes -= size
+            removed += 1
+
+        self._usage = [len(entries), total_bytes]
+        self._scanned_at = time.monotonic()
+        if removed:
+            logger.info(f"Evicted {removed} model registry entries")
+        return removed
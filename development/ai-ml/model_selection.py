@@ -0,0 +1,131 @@
+"""
+Cost-aware selection of ensemble members per organization
+"""
+
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backtesting import BacktestResult
+from forecasting_engine import ModelType, SeriesCache
+
+logger = logging.getLogger(__name__)
+
+# Error metrics a selection can target (lower is better)
+SELECTION_METRICS = ('mae', 'rmse', 'mse', 'mape')
+
+
+@dataclass
+class ModelSelection:
+    """Chosen members with their backtest accuracy and per-fold cost"""
+    model_types: List[ModelType]
+    metric: str
+    score: float
+    best_score: float
+    cost_seconds: float
+    full_cost_seconds: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'model_types': [model_type.value for model_type in self.model_types],
+            'metric': self.metric,
+            'score': self.score,
+            'best_score': self.best_score,
+            'cost_seconds': self.cost_seconds,
+            'full_cost_seconds': self.full_cost_seconds,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ModelSelection':
+        return cls(model_types=[ModelType(value) for value in data['model_types']],
+                   **{name: data[name] for name in ('metric', 'score', 'best_score',
+                                                     'cost_seconds', 'full_cost_seconds')})
+
+
+class ModelSelectionCache(SeriesCache):
+    """
+    Member selections per series, reused while the series only extends the
+    one they were made on and has grown by at most `research_growth`.
+    """
+
+    FILENAME = 'model_selections.json'
+
+    def __init__(self, path: Optional[str] = None, research_growth: float = 0.5,
+                 persist: bool = True):
+        super().__init__(path, research_growth, persist)
+
+    def store(self, y: np.ndarray, selection: ModelSelection,
+              series_key: Optional[str] = None) -> None:
+        self._put(y, series_key, selection.to_dict())
+
+
+# Process-wide cache so retrains of the same organization reuse its selection
+MODEL_SELECTION_CACHE = ModelSelectionCache()
+
+
+class ModelSelector:
+    """
+    Picks the cheapest sub-ensemble that is accurate enough.
+
+    Every non-empty subset of the backtested members is scored by the
+    backtest error of its mean forecast and costed by its members' training
+    plus forecasting time per fold. A subset qualifies if its error is at
+    most `target` or, without a target, within `tolerance` of the best
+    subset's; the cheapest qualifying one wins. If no subset reaches the
+    target, the most accurate one is used.
+    """
+
+    def __init__(self, metric: str = 'mae', tolerance: float = 0.05,
+                 target: Optional[float] = None, cache: Optional[ModelSelectionCache] = None):
+        if metric not in SELECTION_METRICS:
+            raise ValueError(f"Unknown selection metric: {metric}")
+        self.metric = metric
+        self.tolerance = tolerance
+        self.target = target
+        self.cache = cache or MODEL_SELECTION_CACHE
+
+    def lookup(self, y: np.ndarray, series_key: Optional[str] = None) -> Optional[ModelSelection]:
+        """Stored selection for this series, if it can be reused"""
+        entry = self.cache.lookup(np.ascontiguousarray(y, dtype=np.float64), series_key)
+        if entry is None or entry.get('metric') != self.metric:
+            return None
+        return ModelSelection.from_dict(entry)
+
+    def store(self, y: np.ndarray, selection: ModelSelection,
+              series_key: Optional[str] = None) -> None:
+        self.cache.store(np.ascontiguousarray(y, dtype=np.float64), selection, series_key)
+
+    def select(self, result: BacktestResult) -> Optional[ModelSelection]:
+        members = result.members()
+        if not members:
+            return None
+
+        candidates = []
+        for size in range(1, len(members) + 1):
+            for subset in itertools.combinations(members, size):
+                score = result.subset(subset).metrics['ensemble'][self.metric]
+                cost = sum(result.costs.get(name, 0.0) for name in subset)
+                candidates.append((subset, score, cost))
+
+        best_score = min(score for _, score, _ in candidates)
+        threshold = self.target if self.target is not None else best_score * (1 + self.tolerance)
+        qualifying = [c for c in candidates if c[1] <= threshold]
+        if qualifying:
+            subset, score, cost = min(qualifying, key=lambda c: (c[2], c[1]))
+        else:
+            subset, score, cost = min(candidates, key=lambda c: c[1])
+
+        selection = ModelSelection(
+            model_types=[ModelType(name) for name in subset],
+            metric=self.metric,
+            score=float(score),
+            best_score=float(best_score),
+            cost_seconds=float(cost),
+            full_cost_seconds=float(sum(result.costs.get(name, 0.0) for name in members)),
+        )
+        logger.info(f"Selected {list(subset)} ({self.metric}={score:.2f}, best {best_score:.2f}; "
+                    f"{cost:.2f}s of {selection.full_cost_seconds:.2f}s per fold)")
+        return selection
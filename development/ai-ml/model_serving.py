@@ -0,0 +1,408 @@
+"""
+Compact in-memory serving of trained forecasting ensembles
+"""
+
+import copy
+import json
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import CashFlowForecaster, ModelType
+
+logger = logging.getLogger(__name__)
+
+LEAF = -1
+
+
+class CompactTreeEnsemble:
+    """
+    A tree ensemble flattened into a few NumPy arrays.
+
+    All trees share one node table (split feature, threshold, children,
+    missing-value direction, leaf value); prediction walks every tree for
+    every row at once, one depth level per step. Comparisons reproduce the
+    source library: float32 `x <= t` for scikit-learn, float32 `x < t` for
+    XGBoost and float64 `x <= t` for LightGBM.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, default_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, comparison: str, aggregation: str,
+                 base_score: float = 0.0, feature_importances: Optional[np.ndarray] = None):
+        self.feature = feature.astype(np.int16 if feature.max(initial=0) < 2 ** 15 else np.int32)
+        self.threshold = threshold
+        self.left = left.astype(np.int32)
+        self.right = right.astype(np.int32)
+        self.default_left = default_left.astype(bool)
+        self.value = value
+        self.roots = roots.astype(np.int32)
+        self.max_depth = max_depth
+        self.comparison = comparison
+        self.aggregation = aggregation
+        self.base_score = base_score
+        if feature_importances is not None:
+            self.feature_importances_ = feature_importances
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right,
+                                      self.default_left, self.value, self.roots))
+
+    def predict(self, X: Any) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32 if self.comparison != 'lightgbm' else np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            split = feature != LEAF
+            if not split.any():
+                break
+            x = X[rows, np.where(split, feature, 0)]
+            threshold = self.threshold[nodes]
+            if self.comparison == 'xgboost':
+                go_left = x < threshold
+            else:
+                go_left = x <= threshold
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[nodes], go_left)
+            nodes = np.where(split, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+
+        leaves = self.value[nodes].astype(np.float64)
+        if self.aggregation == 'mean':
+            return leaves.mean(axis=1) + self.base_score
+        return leaves.sum(axis=1) + self.base_score
+
+    @classmethod
+    def _from_tables(cls, tables: List[Dict[str, np.ndarray]], **kwargs: Any) -> 'CompactTreeEnsemble':
+        """Concatenate per-tree node tables, offsetting child indices"""
+        offsets = np.cumsum([0] + [len(t['feature']) for t in tables])
+        merged = {}
+        for name in ('feature', 'threshold', 'left', 'right', 'default_left', 'value'):
+            merged[name] = np.concatenate([t[name] for t in tables])
+        for name in ('left', 'right'):
+            parts = []
+            for offset, table in zip(offsets, tables):
+                children = table[name].astype(np.int64)
+                parts.append(np.where(children >= 0, children + offset, LEAF))
+            merged[name] = np.concatenate(parts)
+        return cls(roots=offsets[:-1], max_depth=max(t['depth'] for t in tables),
+                   **merged, **kwargs)
+
+    @classmethod
+    def from_forest(cls, model: Any, max_trees: Optional[int] = None,
+                    value_dtype: Any = np.float64) -> 'CompactTreeEnsemble':
+        """From a fitted scikit-learn RandomForestRegressor"""
+        tables = []
+        for estimator in model.estimators_[:max_trees]:
+            tree = estimator.tree_
+            threshold = tree.threshold.astype(np.float64)
+            # sklearn compares float32 features with float64 thresholds; rounding the
+            # threshold down to float32 keeps every float32 comparison identical
+            threshold32 = threshold.astype(np.float32)
+            too_high = threshold32.astype(np.float64) > threshold
+            threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+            missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, bool))
+            tables.append({
+                'feature': np.where(tree.children_left == LEAF, LEAF, tree.feature),
+                'threshold': threshold32,
+                'left': tree.children_left,
+                'right': tree.children_right,
+                'default_left': np.asarray(missing_left, dtype=bool),
+                'value': tree.value[:, 0, 0].astype(value_dtype),
+                'depth': tree.max_depth + 1,
+            })
+        return cls._from_tables(tables, comparison='sklearn', aggregation='mean',
+                                feature_importances=model.feature_importances_)
+
+    @classmethod
+    def from_xgboost(cls, model: Any, value_dtype: Any = np.float64) -> 'CompactTreeEnsemble':
+        """From a fitted XGBRegressor (squared error objective)"""
+        booster = model.get_booster()
+        config = json.loads(booster.save_config())
+        base_score = float(str(config['learner']['learner_model_param']['base_score']).strip('[]'))
+        names = booster.feature_names or [f'f{i}' for i in range(booster.num_features())]
+        feature_index = {name: i for i, name in enumerate(names)}
+
+        tables = []
+        for tree in booster.get_dump(dump_format='json'):
+            nodes = {}
+            stack = [(json.loads(tree), 1)]
+            depth = 1
+            while stack:
+                node, level = stack.pop()
+                nodes[node['nodeid']] = node
+                depth = max(depth, level)
+                stack.extend((child, level + 1) for child in node.get('children', []))
+            ids = sorted(nodes)
+            position = {node_id: i for i, node_id in enumerate(ids)}
+            table = {name: [] for name in ('feature', 'threshold', 'left', 'right',
+                                           'default_left', 'value')}
+            for node_id in ids:
+                node = nodes[node_id]
+                if 'leaf' in node:
+                    table['feature'].append(LEAF)
+                    table['threshold'].append(0.0)
+                    table['left'].append(LEAF)
+                    table['right'].append(LEAF)
+                    table['default_left'].append(False)
+                    table['value'].append(node['leaf'])
+                else:
+                    table['feature'].append(feature_index[node['split']])
+                    table['threshold'].append(node['split_condition'])
+                    table['left'].append(position[node['yes']])
+                    table['right'].append(position[node['no']])
+                    table['default_left'].append(node['missing'] == node['yes'])
+                    table['value'].append(0.0)
+            tables.append({
+                'feature': np.asarray(table['feature']),
+                'threshold': np.asarray(table['threshold'], dtype=np.float32),
+                'left': np.asarray(table['left']),
+                'right': np.asarray(table['right']),
+                'default_left': np.asarray(table['default_left']),
+                'value': np.asarray(table['value'], dtype=value_dtype),
+                'depth': depth,
+            })
+        return cls._from_tables(tables, comparison='xgboost', aggregation='sum',
+                                base_score=base_score,
+                                feature_importances=model.feature_importances_)
+
+    @classmethod
+    def from_lightgbm(cls, model: Any, value_dtype: Any = np.float64) -> 'CompactTreeEnsemble':
+        """From a fitted LGBMRegressor (numerical splits only)"""
+        dump = model.booster_.dump_model()
+        tables = []
+        for info in dump['tree_info']:
+            table = {name: [] for name in ('feature', 'threshold', 'left', 'right',
+                                           'default_left', 'value')}
+            depth = 1
+            # Pre-order flattening; children are patched once their index is known
+            stack = [(info['tree_structure'], None, None, 1)]
+            while stack:
+                node, parent, side, level = stack.pop()
+                index = len(table['feature'])
+                depth = max(depth, level)
+                if parent is not None:
+                    table[side][parent] = index
+                if 'leaf_value' in node:
+                    table['feature'].append(LEAF)
+                    table['threshold'].append(0.0)
+                    table['default_left'].append(False)
+                    table['value'].append(node['leaf_value'])
+                else:
+                    if node['decision_type'] != '<=':
+                        raise ValueError("Categorical LightGBM splits cannot be compacted")
+                    threshold = float(node['threshold'])
+                    table['feature'].append(node['split_feature'])
+                    table['threshold'].append(threshold)
+                    # missing_type None: NaN is treated as zero
+                    if node['missing_type'] == 'None':
+                        table['default_left'].append(0.0 <= threshold)
+                    else:
+                        table['default_left'].append(node['default_left'])
+                    table['value'].append(0.0)
+                table['left'].append(LEAF)
+                table['right'].append(LEAF)
+                if 'leaf_value' not in node:
+                    stack.append((node['right_child'], index, 'right', level + 1))
+                    stack.append((node['left_child'], index, 'left', level + 1))
+            tables.append({
+                'feature': np.asarray(table['feature']),
+                'threshold': np.asarray(table['threshold'], dtype=np.float64),
+                'left': np.asarray(table['left']),
+                'right': np.asarray(table['right']),
+                'default_left': np.asarray(table['default_left'], dtype=bool),
+                'value': np.asarray(table['value'], dtype=value_dtype),
+                'depth': depth,
+            })
+        return cls._from_tables(tables, comparison='lightgbm', aggregation='sum',
+                                feature_importances=model.feature_importances_)
+
+
+class CompactLinearModel:
+    """Linear member with its StandardScaler folded into the coefficients"""
+
+    def __init__(self, model: Any, scaler: Optional[Any] = None):
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        intercept = float(np.ravel(model.intercept_)[0]) if np.ndim(model.intercept_) else float(model.intercept_)
+        if scaler is not None:
+            scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_)
+            coef = coef / scale
+            intercept -= float(np.dot(coef, scaler.mean_))
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    @property
+    def nbytes(self) -> int:
+        return self.coef_.nbytes
+
+    def predict(self, X: Any) -> np.ndarray:
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+def compact_model(model_type: ModelType, model: Any, scaler: Optional[Any] = None,
+                  max_trees: Optional[int] = None, quantize: bool = False) -> Any:
+    """Compact equivalent of one ensemble member (or the member itself if unsupported)"""
+    value_dtype = np.float32 if quantize else np.float64
+    if model_type == ModelType.RANDOM_FOREST:
+        return CompactTreeEnsemble.from_forest(model, max_trees, value_dtype)
+    elif model_type == ModelType.XGBOOST:
+        return CompactTreeEnsemble.from_xgboost(model, value_dtype)
+    elif model_type == ModelType.LIGHTGBM:
+        return CompactTreeEnsemble.from_lightgbm(model, value_dtype)
+    elif model_type == ModelType.LINEAR_REGRESSION:
+        return CompactLinearModel(model, scaler)
+    return model
+
+
+def compact_forecaster(forecaster: CashFlowForecaster, max_trees: Optional[int] = None,
+                       quantize: bool = False) -> CashFlowForecaster:
+    """
+    Serving copy of a trained forecaster with compact members.
+
+    The copy predicts and forecasts like the original (forests pruned to
+    max_trees or leaf values quantized to float32 only if asked) but keeps
+    no incremental-update state, so it cannot be updated or retrained.
+    """
+    if not forecaster.is_trained:
+        raise ValueError("Only trained forecasters can be compacted")
+
+    serving = copy.copy(forecaster)
+    serving.models = {}
+    for model_type, model in forecaster.models.items():
+        scaler = forecaster.scalers.get(model_type)
+        try:
+            serving.models[model_type] = compact_model(model_type, model, scaler,
+                                                       max_trees, quantize)
+        except Exception as e:
+            logger.warning(f"Keeping uncompacted {model_type.value}: {str(e)}")
+            serving.models[model_type] = model
+    serving.scalers = {model_type: scaler for model_type, scaler in forecaster.scalers.items()
+                       if not isinstance(serving.models.get(model_type), CompactLinearModel)}
+    serving.online_state = {}
+    serving.registry = None
+    return serving
+
+
+def serving_size(forecaster: CashFlowForecaster) -> int:
+    """Approximate resident size of a serving forecaster in bytes"""
+    size = 0
+    for model in forecaster.models.values():
+        nbytes = getattr(model, 'nbytes', None)
+        size += nbytes if nbytes is not None else len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    if forecaster.backtest_residuals is not None:
+        size += np.asarray(forecaster.backtest_residuals).nbytes
+    return size + 64 * len(forecaster.feature_columns)
+
+
+class ModelServingCache:
+    """
+    Compact trained ensembles for many tenants under one memory budget.
+
+    Entries are keyed by organization and training fingerprint and evicted
+    least-recently-used first once their total size exceeds memory_budget.
+    Misses are filled from the model registry. Thread-safe; loading happens
+    outside the lock, so concurrent misses for one key may load twice.
+    """
+
+    def __init__(self, registry: Optional[Any] = None, memory_budget: int = 2 * 1024 ** 3,
+                 max_trees: Optional[int] = None, quantize: bool = False,
+                 model_config: Optional[Dict] = None):
+        self.registry = registry
+        self.memory_budget = memory_budget
+        self.max_trees = max_trees
+        self.quantize = quantize
+        self.model_config = model_config or {}
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[CashFlowForecaster, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'evictions': 0}
+        self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'memory_budget': self.memory_budget,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+            }
+
+    def put(self, organization_id: str, fingerprint: str,
+            forecaster: CashFlowForecaster) -> CashFlowForecaster:
+        """Compact a trained forecaster and cache it"""
+        serving = compact_forecaster(forecaster, self.max_trees, self.quantize)
+        size = serving_size(serving)
+        key = (str(organization_id), fingerprint)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (serving, size)
+            self._size += size
+            while self._size > self.memory_budget and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._stats['evictions'] += 1
+        return serving
+
+    def get(self, organization_id: str, fingerprint: str,
+            loader: Optional[Callable[[], Optional[CashFlowForecaster]]] = None
+            ) -> Optional[CashFlowForecaster]:
+        """
+        Serving forecaster for an organization's model, loading it on a miss
+        with loader() or, by default, from the registry. None if unavailable.
+        """
+        key = (str(organization_id), fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[0]
+            self._stats['misses'] += 1
+
+        forecaster = loader() if loader is not None else self._load(organization_id, fingerprint)
+        if forecaster is None:
+            return None
+        with self._lock:
+            self._stats['loads'] += 1
+        return self.put(organization_id, fingerprint, forecaster)
+
+    def _load(self, organization_id: str, fingerprint: str) -> Optional[CashFlowForecaster]:
+        if self.registry is None:
+            return None
+        forecaster = CashFlowForecaster(self.model_config)
+        if not self.registry.load(organization_id, fingerprint, forecaster):
+            return None
+        return forecaster
+
+    def predict(self, organization_id: str, fingerprint: str,
+                X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Ensemble prediction for one tenant's features"""
+        forecaster = self.get(organization_id, fingerprint)
+        if forecaster is None:
+            raise ValueError(f"No model for {organization_id} ({fingerprint})")
+        return forecaster.ensemble_predict(X)
+
+    def invalidate(self, organization_id: Optional[str] = None) -> None:
+        """Drop one organization's entries, or everything"""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if organization_id is None or key[0] == str(organization_id)]
+            for key in keys:
+                self._size -= self._entries.pop(key)[1]
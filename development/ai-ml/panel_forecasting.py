@@ -0,0 +1,292 @@
+"""
+Batch multi-tenant forecasting with a single global panel model
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import CashFlowForecaster, FeatureEngineering, ModelType
+
+logger = logging.getLogger(__name__)
+
+PANEL_MODELS = [ModelType.LIGHTGBM, ModelType.XGBOOST]
+
+
+class PanelFeatureState:
+    """
+    Lag and rolling-window state for many series at once.
+
+    Holds the last `capacity` values of every series in one (n_series,
+    capacity) array, newest value in the last column, so each step's lags
+    and rolling statistics for all tenants are a handful of array reductions.
+    """
+
+    def __init__(self, histories: List[np.ndarray], lags: List[int], windows: List[int]):
+        self.lags = list(lags)
+        self.windows = list(windows)
+        self.capacity = max(self.lags + self.windows + [1])
+        self.buffer = np.full((len(histories), self.capacity), np.nan)
+        for i, history in enumerate(histories):
+            tail = np.asarray(history, dtype=np.float64)[-self.capacity:]
+            self.buffer[i, self.capacity - len(tail):] = tail
+
+    def push(self, values: np.ndarray) -> None:
+        self.buffer[:, :-1] = self.buffer[:, 1:]
+        self.buffer[:, -1] = values
+
+    def lag(self, lag: int) -> np.ndarray:
+        return self.buffer[:, -lag]
+
+    def rolling(self, window: int) -> List[np.ndarray]:
+        """Rolling (mean, std, min, max) for every series"""
+        values = self.buffer[:, -window:]
+        return [values.mean(axis=1), values.std(axis=1, ddof=1),
+                values.min(axis=1), values.max(axis=1)]
+
+
+class PanelForecaster:
+    """
+    One global gradient-boosted model trained across all tenants.
+
+    Each tenant's target and amount-valued features are standardised with
+    that tenant's own statistics, and the tenant is passed as a categorical
+    identifier, so a single model serves organizations of any size. Tenants
+    the global model cannot serve (unseen at training time or with too little
+    history) fall back to a per-org CashFlowForecaster.
+    """
+
+    def __init__(self, model_type: ModelType = ModelType.LIGHTGBM,
+                 model_config: Optional[Dict] = None, org_col: str = 'organization_id'):
+        if model_type not in PANEL_MODELS:
+            raise ValueError(f"Model {model_type.value} cannot be used as a panel model")
+        self.model_type = model_type
+        self.model_config = model_config or {}
+        self.org_col = org_col
+        self.target_col = 'net_flow'
+        self.lags = self.model_config.get('lags', [1, 7, 30])
+        self.windows = self.model_config.get('windows', [7, 30, 90])
+        self.model = None
+        self.feature_columns: List[str] = []
+        self.org_codes: Dict[Any, int] = {}
+        self.org_stats: Dict[Any, Dict[str, Any]] = {}
+        self._col_index: Dict[str, int] = {}
+        self._scale_plan: Dict[str, str] = {}
+        self.is_trained = False
+
+    def _scaled_columns(self, columns: List[str], passthrough: List[str]) -> Dict[str, str]:
+        """How each amount-valued column is standardised: 'target', 'target_scale' or 'own'"""
+        plan = {col: 'own' for col in passthrough}
+        for col in columns:
+            if col.startswith(f'{self.target_col}_lag_'):
+                plan[col] = 'target'
+            elif col.startswith(f'{self.target_col}_rolling_std_'):
+                plan[col] = 'target_scale'
+            elif col.startswith(f'{self.target_col}_rolling_'):
+                plan[col] = 'target'
+        return plan
+
+    def _org_statistics(self, org_df: pd.DataFrame, passthrough: List[str]) -> Dict[str, Any]:
+        target = org_df[self.target_col].to_numpy(dtype=np.float64)
+        stats = {'target': (float(target.mean()), float(target.std()) or 1.0)}
+        for col in passthrough:
+            values = org_df[col].to_numpy(dtype=np.float64)
+            stats[col] = (float(values.mean()), float(values.std()) or 1.0)
+        return stats
+
+    def _standardise(self, values: np.ndarray, stats: List[Dict[str, Any]],
+                     rows: Optional[np.ndarray] = None) -> None:
+        """Standardise amount-valued columns in place; rows maps each row to its org's stats"""
+        rows = np.arange(len(stats)) if rows is None else rows
+        for col, mode in self._scale_plan.items():
+            idx = self._col_index[col]
+            key = 'target' if mode != 'own' else col
+            mean = np.array([s[key][0] for s in stats])[rows]
+            scale = np.array([s[key][1] for s in stats])[rows]
+            if mode == 'target_scale':
+                values[:, idx] /= scale
+            else:
+                values[:, idx] = (values[:, idx] - mean) / scale
+
+    def _split(self, panel: pd.DataFrame) -> Dict[Any, pd.DataFrame]:
+        panel = panel.sort_values([self.org_col, 'date'], kind='stable')
+        return {org: group.drop(columns=[self.org_col]).reset_index(drop=True)
+                for org, group in panel.groupby(self.org_col, sort=False)}
+
+    def train(self, panel: pd.DataFrame, target_col: str = 'net_flow') -> Any:
+        """Fit the global model on a long-format panel (organization_id, date, features)"""
+        self.target_col = target_col
+        self.org_codes, self.org_stats = {}, {}
+        orgs = self._split(panel)
+
+        matrices, org_rows, stats = [], [], []
+        passthrough = None
+        for org, org_df in orgs.items():
+            matrix = FeatureEngineering.build_feature_matrix(
+                org_df, target_col, lags=self.lags, windows=self.windows
+            )
+            if len(matrix.target) == 0:
+                logger.info(f"Skipping {org} in panel: not enough history")
+                continue
+            if passthrough is None:
+                passthrough = [c for c in org_df.columns if c not in ('date', target_col)]
+                self.feature_columns = matrix.columns + ['org_code']
+                self._col_index = {name: i for i, name in enumerate(self.feature_columns)}
+                self._scale_plan = self._scaled_columns(matrix.columns, passthrough)
+
+            self.org_codes[org] = len(self.org_codes)
+            self.org_stats[org] = self._org_statistics(org_df, passthrough)
+            matrices.append(matrix)
+            org_rows.append(np.full(len(matrix.target), len(stats)))
+            stats.append(self.org_stats[org])
+
+        if not matrices:
+            raise ValueError("No organization has enough history for the panel model")
+
+        # One preallocated panel matrix; each org's features are copied in once
+        n_rows = sum(len(m.target) for m in matrices)
+        X = np.empty((n_rows, len(self.feature_columns)), dtype=np.float64)
+        y = np.empty(n_rows, dtype=np.float64)
+        start = 0
+        for org, matrix in zip(self.org_codes, matrices):
+            end = start + len(matrix.target)
+            X[start:end, :-1] = matrix.values
+            X[start:end, -1] = self.org_codes[org]
+            y[start:end] = matrix.target
+            start = end
+
+        rows = np.concatenate(org_rows)
+        self._standardise(X, stats, rows)
+        target_mean = np.array([s['target'][0] for s in stats])[rows]
+        target_scale = np.array([s['target'][1] for s in stats])[rows]
+        y = (y - target_mean) / target_scale
+
+        n_jobs = self.model_config.get('core_budget', -1)
+        params = self.model_config.get('model_params', {}).get(self.model_type, {})
+        logger.info(f"Training panel {self.model_type.value} on {len(matrices)} orgs, {n_rows} rows")
+        if self.model_type == ModelType.LIGHTGBM:
+            import lightgbm as lgb
+            defaults = dict(n_estimators=300, learning_rate=0.05, num_leaves=63, random_state=42)
+            self.model = lgb.LGBMRegressor(**{**defaults, **params}, n_jobs=n_jobs, verbose=-1)
+            self.model.fit(X, y, categorical_feature=[len(self.feature_columns) - 1])
+        else:
+            import xgboost as xgb
+            defaults = dict(n_estimators=300, learning_rate=0.05, max_depth=8, random_state=42)
+            self.model = xgb.XGBRegressor(**{**defaults, **params}, n_jobs=n_jobs)
+            self.model.fit(X, y)
+
+        self.is_trained = True
+        return self.model
+
+    def _fallback(self, org: Any, org_df: pd.DataFrame, forecast_days: int) -> Optional[pd.DataFrame]:
+        try:
+            result = CashFlowForecaster(self.model_config).forecast(org_df, forecast_days, recursive=True)
+        except Exception as e:
+            logger.error(f"Per-org fallback forecast failed for {org}: {str(e)}")
+            return None
+        return pd.DataFrame({
+            self.org_col: org,
+            'date': result.forecast_dates,
+            'prediction': result.predictions,
+            'model': 'per_org',
+        })
+
+    def predict(self, panel: pd.DataFrame, forecast_days: int = 30) -> pd.DataFrame:
+        """
+        Recursively forecast every tenant in the panel.
+
+        Each horizon step is a single predict call over all tenants. Returns a
+        long frame of (organization_id, date, prediction, model).
+        """
+        if not self.is_trained:
+            raise ValueError("Panel model must be trained before making predictions")
+
+        orgs = self._split(panel)
+        capacity = max(self.lags + self.windows)
+        served = [org for org, org_df in orgs.items()
+                  if org in self.org_codes and len(org_df) >= capacity]
+        fallback = [org for org in orgs if org not in served]
+
+        frames = []
+        if served:
+            frames.append(self._predict_served(orgs, served, forecast_days))
+        for org in fallback:
+            logger.info(f"Using per-org model for {org}")
+            frame = self._fallback(org, orgs[org], forecast_days)
+            if frame is not None:
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=[self.org_col, 'date', 'prediction', 'model'])
+        return pd.concat(frames, ignore_index=True)
+
+    def _predict_served(self, orgs: Dict[Any, pd.DataFrame], served: List[Any],
+                        forecast_days: int) -> pd.DataFrame:
+        n_orgs = len(served)
+        frames = [orgs[org] for org in served]
+        stats = [self.org_stats[org] for org in served]
+        col_index = self._col_index
+        target_col = self.target_col
+
+        state = PanelFeatureState([f[target_col].to_numpy() for f in frames], self.lags, self.windows)
+        last_dates = np.array([np.datetime64(pd.to_datetime(f['date']).max(), 'D') for f in frames])
+
+        def last(col):
+            return np.array([float(f[col].iloc[-1]) if col in f.columns else np.nan for f in frames])
+
+        def recent_mean(col):
+            return np.array([float(f[col].tail(7).mean()) if col in f.columns else np.nan
+                             for f in frames])
+
+        exogenous = {col: last(col) for col in frames[0].columns if col in col_index}
+        inflow, outflow = recent_mean('total_inflow'), recent_mean('total_outflow')
+        exogenous.update({'total_inflow': inflow, 'total_outflow': outflow})
+        last_inflow, last_outflow = last('total_inflow'), last('total_outflow')
+        balance = last('total_balance')
+
+        target_mean = np.array([s['target'][0] for s in stats])
+        target_scale = np.array([s['target'][1] for s in stats])
+        time_block = np.empty((n_orgs, len(FeatureEngineering.TIME_FEATURES)))
+        X = np.empty((n_orgs, len(self.feature_columns)), dtype=np.float64)
+        X[:, -1] = [self.org_codes[org] for org in served]
+        predictions = np.empty((n_orgs, forecast_days))
+
+        for step in range(forecast_days):
+            dates = last_dates + np.timedelta64(step + 1, 'D')
+            FeatureEngineering._fill_time_features(time_block, dates)
+            for j, name in enumerate(FeatureEngineering.TIME_FEATURES):
+                if name in col_index:
+                    X[:, col_index[name]] = time_block[:, j]
+
+            for lag in self.lags:
+                X[:, col_index[f'{target_col}_lag_{lag}']] = state.lag(lag)
+            for window in self.windows:
+                for stat, values in zip(FeatureEngineering.ROLLING_STATS, state.rolling(window)):
+                    X[:, col_index[f'{target_col}_rolling_{stat}_{window}']] = values
+
+            for col, values in exogenous.items():
+                X[:, col_index[col]] = values
+            business = FeatureEngineering.future_business_features(
+                inflow, outflow, balance, last_inflow, last_outflow
+            )
+            for col, values in business.items():
+                if col in col_index:
+                    X[:, col_index[col]] = values
+
+            self._standardise(X, stats)
+            step_pred = self.model.predict(X) * target_scale + target_mean
+            predictions[:, step] = step_pred
+
+            state.push(step_pred)
+            balance = balance + step_pred
+            last_inflow, last_outflow = inflow, outflow
+
+        horizon = np.arange(1, forecast_days + 1).astype('timedelta64[D]')
+        return pd.DataFrame({
+            self.org_col: np.repeat(np.array(served, dtype=object), forecast_days),
+            'date': (last_dates[:, np.newaxis] + horizon).ravel(),
+            'prediction': predictions.ravel(),
+            'model': f'panel_{self.model_type.value}',
+        })
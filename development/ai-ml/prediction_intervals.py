@@ -0,0 +1,89 @@
+"""
+Calibrated prediction intervals from out-of-sample residuals
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ConformalCalibrator:
+    """
+    Split-conformal intervals from backtest residuals (actual - predicted).
+
+    Residuals are sorted once; an interval at any confidence level is then
+    two order statistics added to the predictions. Lower and upper bounds use
+    the signed residual distribution, so bands follow a skewed error
+    distribution, and the order statistics include the finite-sample
+    correction that gives coverage of at least the requested level.
+
+    Each horizon step is calibrated on at least `min_per_step` residuals:
+    with that many cutoffs every step separately, otherwise runs of
+    consecutive steps are pooled into blocks large enough (the last block
+    takes the remainder). The default training backtest has 3 cutoffs, so a
+    30-day horizon is calibrated in blocks of 7 steps; bands still widen
+    with the horizon. Steps beyond the calibrated horizon reuse the last block.
+    """
+
+    def __init__(self, residuals: np.ndarray, min_per_step: int = 20):
+        residuals = np.asarray(residuals, dtype=np.float64)
+        if residuals.ndim == 1:
+            residuals = residuals[:, np.newaxis]
+        n_cutoffs, horizon = residuals.shape
+        block = min(int(np.ceil(min_per_step / max(n_cutoffs, 1))), horizon)
+        n_blocks = max(horizon // block, 1)
+        if block > 1:
+            logger.info(f"{n_cutoffs} backtest cutoffs are fewer than min_per_step={min_per_step}; "
+                        f"calibrating {n_blocks} blocks of {block}+ horizon steps")
+        # Block of each calibrated step; (samples, n_blocks) sorted scores, NaNs last
+        self.step_block = np.minimum(np.arange(horizon) // block, n_blocks - 1)
+        blocks = [np.sort(values[np.isfinite(values)])
+                  for values in (residuals[:, self.step_block == b].ravel() for b in range(n_blocks))]
+        self.counts = np.array([len(values) for values in blocks])
+        if self.counts.min() == 0:
+            raise ValueError("Conformal calibration needs finite residuals")
+        self.scores = np.full((self.counts.max(), n_blocks), np.nan)
+        for b, values in enumerate(blocks):
+            self.scores[:len(values), b] = values
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.counts.sum())
+
+    def _order_statistic(self, level: float) -> np.ndarray:
+        """Per-step residual at quantile level with the (n + 1) conformal correction"""
+        return self._block_statistic(level)[self.step_block]
+
+    def _block_statistic(self, level: float) -> np.ndarray:
+        n = self.counts
+        if level >= 0.5:
+            rank = np.minimum(np.ceil((n + 1) * level), n)
+        else:
+            rank = np.maximum(np.floor((n + 1) * level), 1)
+        return self.scores[rank.astype(int) - 1, np.arange(len(n))]
+
+    def _steps(self, values: np.ndarray, horizon: int) -> np.ndarray:
+        if len(values) >= horizon:
+            return values[:horizon]
+        return np.concatenate([values, np.repeat(values[-1], horizon - len(values))])
+
+    def offsets(self, confidence_level: float, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(lower, upper) offsets to add to predictions for each horizon step"""
+        if not 0 < confidence_level < 1:
+            raise ValueError(f"Confidence level must be between 0 and 1, got {confidence_level}")
+        tail = (1 - confidence_level) / 2
+        return (self._steps(self._order_statistic(tail), horizon),
+                self._steps(self._order_statistic(1 - tail), horizon))
+
+    def intervals(self, predictions: np.ndarray, confidence_level: float = 0.95) -> np.ndarray:
+        """(horizon, 2) lower/upper bounds"""
+        predictions = np.asarray(predictions, dtype=np.float64)
+        lower, upper = self.offsets(confidence_level, len(predictions))
+        return np.column_stack([predictions + lower, predictions + upper])
+
+    def half_width(self, confidence_level: float, horizon: int) -> np.ndarray:
+        lower, upper = self.offsets(confidence_level, horizon)
+        return (upper - lower) / 2
@@ -0,0 +1,346 @@
+"""
+Adaptive retraining of per-organization forecasting models
+"""
+
+import heapq
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import CashFlowForecaster
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelStatus:
+    """What the scheduler remembers about an organization's current model"""
+    fingerprint: str
+    trained_at: float
+    last_date: Optional[str]
+    n_obs: int
+    train_seconds: float
+    baseline_mae: Optional[float]
+    reference: Dict[str, Any]
+    errors: List[float] = field(default_factory=list)
+
+
+@dataclass
+class RetrainDecision:
+    """Whether (and how urgently) one organization's model should be retrained"""
+    organization_id: str
+    fingerprint: str
+    priority: float
+    reasons: List[str]
+    estimated_seconds: float
+    statistics: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def needed(self) -> bool:
+        return self.priority > 0
+
+
+def reference_profile(values: np.ndarray, bins: int = 5) -> Dict[str, Any]:
+    """Distribution summary of a training target for later drift checks"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {'mean': 0.0, 'std': 0.0, 'edges': [], 'fractions': []}
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+    counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'edges': edges.tolist(),
+        'fractions': (counts / len(values)).tolist(),
+    }
+
+
+def drift_statistics(reference: Dict[str, Any], values: np.ndarray) -> Dict[str, float]:
+    """
+    Population stability index over the reference quantile bins, plus the
+    shift of the mean in reference standard deviations and the ratio of
+    spreads.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0 or not reference.get('fractions'):
+        return {'psi': 0.0, 'mean_shift': 0.0, 'std_ratio': 1.0}
+
+    edges = np.asarray(reference['edges'])
+    expected = np.maximum(np.asarray(reference['fractions']), 1e-4)
+    counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(expected))
+    actual = np.maximum(counts / len(values), 1e-4)
+    psi = float(np.sum((actual - expected) * np.log(actual / expected)))
+
+    std = reference['std'] or 1.0
+    return {
+        'psi': psi,
+        'mean_shift': float(abs(values.mean() - reference['mean']) / std),
+        'std_ratio': float(values.std() / std),
+    }
+
+
+class RetrainingScheduler:
+    """
+    Decides which organizations' models to retrain.
+
+    For each organization it keeps the fingerprint and target distribution
+    the current model was trained on, its backtest MAE and the absolute
+    errors of recent forecasts against actuals (record_actuals). A model is
+    retrained only when it is missing, older than max_age_days, its live
+    error exceeds error_ratio times the backtest MAE, or the latest
+    drift_window days have drifted from the training distribution; unchanged
+    training data never triggers a retrain. Untrained organizations get
+    `untrained_priority`, scaled by importance like any other priority.
+    Candidates are run by priority until the compute budget (estimated from
+    previous training times) is used up.
+
+    The error trigger needs an out-of-sample baseline, so models the
+    scheduler trains are always backtested (even with model_config
+    'backtest': False), and a model observed with only in-sample metrics
+    has no baseline until it is retrained.
+
+    When a path is given, state is a JSON snapshot (rewritten atomically
+    when a model is observed) plus an append-only log of recorded errors at
+    `path.log`, so record_actuals costs one appended line however many
+    organizations there are. Every `compact_every` log entries the snapshot
+    is rewritten and the log cleared; entries carry sequence numbers, so
+    none is applied twice after a crash between the two.
+    """
+
+    def __init__(self, model_config: Optional[Dict] = None, registry: Optional[Any] = None,
+                 path: Optional[str] = None, max_age_days: float = 30,
+                 error_ratio: float = 1.5, psi_threshold: float = 0.25,
+                 mean_shift_threshold: float = 0.5, drift_window: int = 60,
+                 error_window: int = 30, min_errors: int = 7,
+                 default_train_seconds: float = 60.0, untrained_priority: float = 100.0,
+                 compact_every: int = 1000):
+        self.model_config = model_config or {}
+        self.registry = registry
+        self.path = path
+        self.max_age_days = max_age_days
+        self.error_ratio = error_ratio
+        self.psi_threshold = psi_threshold
+        self.mean_shift_threshold = mean_shift_threshold
+        self.drift_window = drift_window
+        self.error_window = error_window
+        self.min_errors = min_errors
+        self.default_train_seconds = default_train_seconds
+        self.untrained_priority = untrained_priority
+        self.compact_every = compact_every
+        self._status: Dict[str, ModelStatus] = {}
+        self._seq = 0
+        self._logged = 0
+        if path:
+            self._load()
+
+    @property
+    def log_path(self) -> Optional[str]:
+        return f"{self.path}.log" if self.path else None
+
+    def _load(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            self._seq = state.get('seq', 0)
+            # Snapshots from before the error log were the bare status mapping
+            statuses = state['status'] if 'seq' in state else state
+            self._status = {org: ModelStatus(**status) for org, status in statuses.items()}
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        continue
+                    self._logged += 1
+                    if entry['seq'] > self._seq:
+                        self._seq = entry['seq']
+                        self._add_errors(entry['organization_id'], entry['errors'])
+
+    def _save(self) -> None:
+        """Rewrite the snapshot atomically and clear the error log it now includes"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.",
+                                        suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'seq': self._seq,
+                       'status': {org: asdict(status) for org, status in self._status.items()}}, f)
+        os.replace(tmp_path, self.path)
+        open(self.log_path, 'w').close()
+        self._logged = 0
+
+    def _append(self, organization_id: str, errors: List[float]) -> None:
+        if not self.path:
+            return
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps({'seq': self._seq, 'organization_id': organization_id,
+                                'errors': errors}) + '\n')
+        self._logged += 1
+        if self._logged >= self.compact_every:
+            self._save()
+
+    def _add_errors(self, organization_id: str, errors: List[float]) -> Optional[ModelStatus]:
+        status = self._status.get(organization_id)
+        if status is not None:
+            status.errors = (status.errors + errors)[-self.error_window:]
+        return status
+
+    def status(self, organization_id: str) -> Optional[ModelStatus]:
+        return self._status.get(str(organization_id))
+
+    def fingerprint(self, df: pd.DataFrame, target_col: str = 'net_flow') -> str:
+        return CashFlowForecaster(self.model_config).training_fingerprint(df, target_col)
+
+    def observe(self, organization_id: str, forecaster: CashFlowForecaster, df: pd.DataFrame,
+                target_col: str = 'net_flow', train_seconds: float = 0.0,
+                fingerprint: Optional[str] = None) -> None:
+        """Record a freshly trained (or loaded) model for an organization"""
+        last_date = str(pd.Timestamp(df['date'].iloc[-1]).date()) if 'date' in df and len(df) else None
+        self._status[str(organization_id)] = ModelStatus(
+            fingerprint=fingerprint or forecaster.training_fingerprint(df, target_col),
+            trained_at=time.time(),
+            last_date=last_date,
+            n_obs=len(df),
+            train_seconds=float(train_seconds),
+            baseline_mae=self.baseline_mae(forecaster),
+            reference=reference_profile(df[target_col].to_numpy()),
+        )
+        self._save()
+
+    @staticmethod
+    def baseline_mae(forecaster: CashFlowForecaster) -> Optional[float]:
+        """Backtest MAE of a forecaster; None if it only has in-sample metrics"""
+        if forecaster.model_metrics.get('in_sample'):
+            return None
+        return forecaster.model_metrics.get('mae')
+
+    def training_config(self) -> Dict:
+        """model_config with the backtest the error trigger's baseline comes from"""
+        if self.model_config.get('backtest') is False:
+            return {**self.model_config, 'backtest': None}
+        return self.model_config
+
+    def record_actuals(self, organization_id: str, predicted: Any, actual: Any) -> None:
+        """Add the errors of past forecasts against the actuals that came in"""
+        organization_id = str(organization_id)
+        if organization_id not in self._status:
+            return
+        errors = np.abs(np.asarray(actual, dtype=np.float64) - np.asarray(predicted, dtype=np.float64))
+        errors = errors[np.isfinite(errors)].tolist()
+        self._seq += 1
+        self._add_errors(organization_id, errors)
+        self._append(organization_id, errors)
+
+    def assess(self, organization_id: str, df: pd.DataFrame, target_col: str = 'net_flow',
+               importance: float = 1.0, now: Optional[float] = None) -> RetrainDecision:
+        """
+        Retraining priority for an organization's current data. Each trigger
+        adds its severity (how far past its threshold it is) to the priority,
+        which is then scaled by the organization's importance.
+        """
+        organization_id = str(organization_id)
+        fingerprint = self.fingerprint(df, target_col)
+        status = self._status.get(organization_id)
+        if status is None:
+            return RetrainDecision(organization_id, fingerprint, self.untrained_priority * importance,
+                                   ['untrained'], self.default_train_seconds)
+
+        estimated_seconds = (status.train_seconds or self.default_train_seconds) * len(df) / max(status.n_obs, 1)
+        if fingerprint == status.fingerprint:
+            return RetrainDecision(organization_id, fingerprint, 0.0, [], estimated_seconds)
+
+        reasons, severity = [], 0.0
+        statistics = {'age_days': ((now or time.time()) - status.trained_at) / 86400}
+        if statistics['age_days'] >= self.max_age_days:
+            reasons.append('stale')
+            severity += statistics['age_days'] / self.max_age_days
+
+        if len(status.errors) >= self.min_errors and status.baseline_mae:
+            statistics['error_ratio'] = float(np.mean(status.errors)) / status.baseline_mae
+            if statistics['error_ratio'] > self.error_ratio:
+                reasons.append('degraded')
+                severity += statistics['error_ratio'] / self.error_ratio
+
+        recent = df[target_col].to_numpy()
+        if status.last_date is not None and 'date' in df:
+            new_rows = int((pd.to_datetime(df['date']) > pd.Timestamp(status.last_date)).sum())
+            statistics['new_rows'] = new_rows
+            recent = recent[-max(min(new_rows, len(recent)), self.drift_window):]
+        else:
+            recent = recent[-self.drift_window:]
+        statistics.update(drift_statistics(status.reference, recent))
+        if statistics['psi'] > self.psi_threshold:
+            reasons.append('distribution_drift')
+            severity += statistics['psi'] / self.psi_threshold
+        if statistics['mean_shift'] > self.mean_shift_threshold:
+            reasons.append('mean_shift')
+            severity += statistics['mean_shift'] / self.mean_shift_threshold
+
+        return RetrainDecision(organization_id, fingerprint, severity * importance, reasons,
+                               estimated_seconds, statistics)
+
+    def plan(self, frames: Dict[str, pd.DataFrame], budget_seconds: Optional[float] = None,
+             target_col: str = 'net_flow',
+             importance: Optional[Dict[str, float]] = None) -> List[RetrainDecision]:
+        """
+        Organizations to retrain, highest priority first, whose estimated
+        training time fits in budget_seconds (unlimited if None). A candidate
+        too expensive for the remaining budget is skipped for cheaper ones.
+        """
+        importance = importance or {}
+        heap = []
+        for organization_id, df in frames.items():
+            decision = self.assess(organization_id, df, target_col,
+                                   importance.get(str(organization_id), 1.0))
+            if decision.needed:
+                heapq.heappush(heap, (-decision.priority, decision.estimated_seconds,
+                                      decision.organization_id, decision))
+
+        selected, remaining = [], budget_seconds
+        while heap:
+            decision = heapq.heappop(heap)[-1]
+            if remaining is not None:
+                if decision.estimated_seconds > remaining:
+                    continue
+                remaining -= decision.estimated_seconds
+            selected.append(decision)
+
+        logger.info(f"Retraining {len(selected)} of {len(frames)} organizations")
+        return selected
+
+    def run(self, frames: Dict[str, pd.DataFrame], budget_seconds: Optional[float] = None,
+            target_col: str = 'net_flow',
+            importance: Optional[Dict[str, float]] = None) -> Dict[str, CashFlowForecaster]:
+        """Retrain the planned organizations and register their new models"""
+        trained = {}
+        for decision in self.plan(frames, budget_seconds, target_col, importance):
+            organization_id, df = decision.organization_id, frames[decision.organization_id]
+            logger.info(f"Retraining {organization_id}: {', '.join(decision.reasons)}")
+            forecaster = CashFlowForecaster(self.training_config(), self.registry)
+            forecaster.series_key = organization_id
+            started = time.perf_counter()
+            try:
+                forecaster.train_ensemble(df, target_col)
+            except Exception as e:
+                logger.error(f"Retraining {organization_id} failed: {str(e)}")
+                continue
+            train_seconds = time.perf_counter() - started
+
+            if self.registry is not None:
+                self.registry.save(organization_id, decision.fingerprint, forecaster)
+            self.observe(organization_id, forecaster, df, target_col, train_seconds,
+                         decision.fingerprint)
+            trained[organization_id] = forecaster
+        return trained
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The engine modules import one another as top-level modules
+AI_ML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, AI_ML_DIR)
+sys.path.insert(0, os.path.join(AI_ML_DIR, 'benchmarks'))
+
+from feature_matrix_benchmark import make_history  # noqa: E402
+from forecasting_engine import ModelType  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def history():
+    return make_history(400)
+
+
+@pytest.fixture(scope='session')
+def model_config():
+    """Small tree ensembles on one core, so training stays quick"""
+    trees = {'n_estimators': 20}
+    return {
+        'core_budget': 1,
+        'model_params': {ModelType.RANDOM_FOREST: trees, ModelType.XGBOOST: trees,
+                         ModelType.LIGHTGBM: trees},
+    }
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('statsmodels')
+
+import forecasting_engine  # noqa: E402
+from forecasting_engine import ArimaOrderCache, CashFlowForecaster, ModelType  # noqa: E402
+
+# statsmodels warns about starting parameters for some candidate orders
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture(scope='module')
+def series():
+    rng = np.random.default_rng(3)
+    return np.cumsum(rng.normal(size=160)) + rng.normal(scale=0.5, size=160)
+
+
+def forecaster(core_budget=1):
+    return CashFlowForecaster({'core_budget': core_budget,
+                               'arima_cache': ArimaOrderCache(persist=False)})
+
+
+class TestArimaSearch:
+    def test_parallel_search_returns_the_serial_winner(self, series, monkeypatch):
+        serial = forecaster().train_model(ModelType.ARIMA, None, series)
+
+        # The winner is rebuilt from the worker's parameters, not re-estimated
+        refits = []
+        fit = forecasting_engine._fit_arima_order
+        monkeypatch.setattr(forecasting_engine, '_fit_arima_order',
+                            lambda *args: refits.append(args) or fit(*args))
+        parallel = forecaster(core_budget=2).train_model(ModelType.ARIMA, None, series)
+
+        assert refits == []
+        assert parallel.model.order == serial.model.order
+        np.testing.assert_allclose(parallel.params, serial.params)
+        assert parallel.aic == pytest.approx(serial.aic)
+        np.testing.assert_allclose(parallel.forecast(14), serial.forecast(14), rtol=1e-8)
+
+    def test_extended_series_warm_starts_the_cached_order(self, series, monkeypatch):
+        model = forecaster()
+        first = model.train_model(ModelType.ARIMA, None, series[:140])
+
+        fitted = []
+        fit = forecasting_engine._fit_arima_order
+        monkeypatch.setattr(forecasting_engine, '_fit_arima_order',
+                            lambda *args: fitted.append(args[1:]) or fit(*args))
+        second = model.train_model(ModelType.ARIMA, None, series)
+
+        assert len(fitted) == 1 and fitted[0][0] == first.model.order
+        np.testing.assert_allclose(fitted[0][1], first.params)
+        assert second.nobs == len(series)
+
+    def test_search_is_not_an_ensemble_member(self, history, model_config):
+        model = CashFlowForecaster({**model_config, 'backtest': False})
+        model.train_ensemble(history)
+        assert ModelType.ARIMA not in model.models and ModelType.PROPHET not in model.models
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting import BacktestEngine, ensemble_metrics
+from forecasting_engine import CashFlowForecaster
+
+
+def forecaster(model_config, **options):
+    return CashFlowForecaster({**model_config, **options})
+
+
+class TestTrainEnsembleMetrics:
+    def test_default_training_backtests_a_few_folds(self, history, model_config):
+        trained = forecaster(model_config)
+        trained.train_ensemble(history)
+
+        assert 'in_sample' not in trained.model_metrics and trained.model_metrics['mae'] > 0
+        assert trained.backtest_residuals.shape == (CashFlowForecaster.DEFAULT_BACKTEST['n_cutoffs'], 30)
+        assert trained.forecast(history, 7).model_metrics == trained.model_metrics
+
+    def test_disabled_backtest_reports_in_sample_metrics(self, history, model_config):
+        trained = forecaster(model_config, backtest=False)
+        trained.train_ensemble(history)
+
+        assert trained.model_metrics['in_sample'] == 1.0 and trained.model_metrics['mae'] > 0
+        assert trained.backtest_residuals is None
+
+
+class TestRecursiveBacktest:
+    def test_ensemble_residuals_come_from_the_ensemble_path(self, history, model_config):
+        trained = forecaster(model_config, recursive_forecast=True, backtest=False)
+        trained.train_ensemble(history)
+        result = BacktestEngine(n_cutoffs=1, parallel=False).run(trained, history)
+
+        # The same fold by hand: train on the history before the cutoff and
+        # forecast recursively, as forecast(recursive=True) does
+        matrix = trained.feature_matrix(history)
+        row = np.searchsorted(pd.to_datetime(history['date']).to_numpy(dtype='datetime64[D]'),
+                              matrix.dates[result.cutoffs[0]])
+        fold = forecaster(model_config, backtest=False)
+        fold.train_ensemble(history.iloc[:row])
+        expected = fold.recursive_predict(history.iloc[:row], 30)[0]
+
+        np.testing.assert_allclose(result.predictions['ensemble'][0], expected, rtol=1e-6)
+        member_mean = np.mean([result.predictions[name] for name in result.members()], axis=0)
+        assert not np.allclose(result.predictions['ensemble'], member_mean)
+        np.testing.assert_array_equal(result.residuals(), result.actuals - result.predictions['ensemble'])
+
+        # A sub-ensemble has no path of its own and falls back to the member mean
+        assert result.subset(result.members()).predictions['ensemble'] is result.predictions['ensemble']
+        pair = result.members()[:2]
+        np.testing.assert_allclose(result.subset(pair).predictions['ensemble'],
+                                   np.mean([result.predictions[name] for name in pair], axis=0))
+
+
+class TestEnsembleMetrics:
+    def test_failed_ensemble_path_falls_back_to_the_mean(self):
+        actuals = np.zeros((2, 3))
+        members = {'a': np.ones((2, 3)), 'b': np.full((2, 3), 3.0)}
+        path = np.full((2, 3), np.nan)
+        predictions, metrics = ensemble_metrics(members, actuals, ensemble=path)
+        np.testing.assert_array_equal(predictions['ensemble'], np.full((2, 3), 2.0))
+        assert metrics['ensemble']['mae'] == pytest.approx(2.0)
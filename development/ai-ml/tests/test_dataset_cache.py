@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from dataset_cache import DatasetCache  # noqa: E402
+from forecasting_engine import CashFlowForecaster, FeatureEngineering  # noqa: E402
+
+ORG = 'org-1'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DatasetCache(str(tmp_path))
+
+
+def assert_same_matrix(matrix, expected):
+    assert matrix.columns == expected.columns
+    np.testing.assert_array_equal(matrix.values, expected.values)
+    np.testing.assert_array_equal(matrix.target, expected.target)
+    np.testing.assert_array_equal(matrix.dates, expected.dates)
+
+
+class TestDatasetCache:
+    def test_round_trip_is_memory_mapped(self, cache, history, monkeypatch):
+        built = cache.get_or_build(ORG, history)
+        assert_same_matrix(built, FeatureEngineering.build_feature_matrix(history))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("hit rebuilt the matrix")
+
+        monkeypatch.setattr(FeatureEngineering, 'build_feature_matrix', fail)
+        cached = cache.get_or_build(ORG, history)
+        assert_same_matrix(cached, built)
+        # Read straight from the mapped file: no private, writable copy
+        assert not cached.values.flags.owndata and not cached.values.flags.writeable
+        assert cached.values.flags['C_CONTIGUOUS']
+
+    def test_configuration_is_part_of_the_key(self, cache, history, monkeypatch):
+        float32 = cache.get_or_build(ORG, history, dtype=np.float32)
+        assert float32.values.dtype == np.float32
+        subset = cache.get_or_build(ORG, history, columns=['net_flow_lag_7', 'month_sin'])
+        assert subset.columns == ['net_flow_lag_7', 'month_sin']
+        assert len(list(cache.root.glob('*/*.arrow'))) == 2
+
+        key = DatasetCache.key('data', 'net_flow', [1, 7, 30], [7, 30, 90])
+        assert DatasetCache.key('data', 'net_flow', [1, 7], [7, 30, 90]) != key
+        monkeypatch.setattr(FeatureEngineering, 'FEATURE_SET_VERSION',
+                            FeatureEngineering.FEATURE_SET_VERSION + 1)
+        assert DatasetCache.key('data', 'net_flow', [1, 7, 30], [7, 30, 90]) != key
+
+    def test_unreadable_entries_are_rebuilt(self, cache, history):
+        built = cache.get_or_build(ORG, history)
+        path, = cache.root.glob('*/*.arrow')
+        path.write_bytes(b'not arrow')
+
+        assert cache.get(ORG, path.stem) is None
+        assert_same_matrix(cache.get_or_build(ORG, history), built)
+
+    def test_least_recently_used_entries_are_evicted(self, cache, history):
+        # Equal-length series give entries of equal size
+        windows = [history.iloc[start:start + 300] for start in range(3)]
+        for df in windows[:2]:
+            cache.get_or_build(ORG, df)
+        first, second = cache.root.glob('*/*.arrow')
+        # Reads touch the entry (timestamps set apart, as the clock may be coarse)
+        os.utime(first, (1, 1))
+        os.utime(second, (2, 2))
+        cache.get(ORG, first.stem)
+        assert first.stat().st_mtime > second.stat().st_mtime
+
+        cache.max_bytes = first.stat().st_size + second.stat().st_size
+        cache.get_or_build(ORG, windows[2])
+        assert first.exists() and not second.exists()
+        assert len(list(cache.root.glob('*/*.arrow'))) == 2
+
+    def test_forecaster_trains_from_the_cache(self, cache, history, model_config):
+        config = {**model_config, 'dataset_cache': cache, 'backtest': False}
+        forecaster = CashFlowForecaster(config)
+        X, y = forecaster.prepare_data(history)
+        assert len(list(cache.root.glob('default/*.arrow'))) == 1
+
+        expected = FeatureEngineering.build_feature_matrix(history)
+        np.testing.assert_array_equal(X.to_numpy(), expected.values)
+        np.testing.assert_array_equal(y, expected.target)
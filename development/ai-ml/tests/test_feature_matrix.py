@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from feature_matrix_benchmark import legacy_features
+from forecasting_engine import FeatureEngineering
+
+
+class TestBuildFeatureMatrix:
+    def test_matches_the_create_chain(self, history):
+        X_legacy, y_legacy = legacy_features(history)
+        matrix = FeatureEngineering.build_feature_matrix(history, 'net_flow')
+
+        assert matrix.columns == list(X_legacy.columns)
+        np.testing.assert_allclose(matrix.values, X_legacy.to_numpy(dtype=np.float64),
+                                   rtol=1e-9, atol=1e-6)
+        np.testing.assert_array_equal(matrix.target, y_legacy)
+        assert matrix.values.flags['C_CONTIGUOUS']
+
+    def test_rolling_windows_exclude_the_current_day(self, history):
+        matrix = FeatureEngineering.build_feature_matrix(history, 'net_flow')
+        row = len(history) - 1
+        expected = history['net_flow'].iloc[row - 7:row].mean()
+        assert matrix.values[-1, matrix.column_index('net_flow_rolling_mean_7')] == pytest.approx(expected)
+
+    def test_column_subset_matches_the_full_matrix(self, history):
+        full = FeatureEngineering.build_feature_matrix(history, 'net_flow')
+        subset = ['net_flow_lag_7', 'month_sin', 'cash_velocity']
+        matrix = FeatureEngineering.build_feature_matrix(history, 'net_flow', columns=subset)
+
+        assert matrix.columns == subset
+        # Fewer columns need less warm-up, so the subset keeps earlier rows too
+        assert len(matrix.dates) > len(full.dates)
+        common = np.isin(matrix.dates, full.dates)
+        np.testing.assert_array_equal(matrix.dates[common], full.dates)
+        np.testing.assert_array_equal(matrix.values[common],
+                                      full.values[:, [full.column_index(name) for name in subset]])
+
+    def test_float32_and_unknown_columns(self, history):
+        matrix = FeatureEngineering.build_feature_matrix(history, 'net_flow', dtype=np.float32)
+        assert matrix.values.dtype == np.float32
+        with pytest.raises(ValueError, match='Unknown feature columns'):
+            FeatureEngineering.build_feature_matrix(history, 'net_flow', columns=['nope'])
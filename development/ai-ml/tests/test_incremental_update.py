@@ -0,0 +1,50 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from forecasting_engine import CashFlowForecaster, ModelType
+
+
+def trained(history, model_config):
+    forecaster = CashFlowForecaster(model_config)
+    forecaster.train_ensemble(history)
+    return forecaster
+
+
+class TestUpdate:
+    def test_linear_update_matches_a_refit(self, history, model_config):
+        updated = trained(history.iloc[:-30], model_config)
+        result = updated.update(history, new_rows=30)
+        refit = trained(history, model_config)
+
+        assert result[ModelType.LINEAR_REGRESSION] is True
+        X, y = refit.prepare_data(history)
+        np.testing.assert_allclose(updated.predict(X, ModelType.LINEAR_REGRESSION),
+                                   refit.predict(X, ModelType.LINEAR_REGRESSION),
+                                   rtol=1e-7, atol=1e-6 * np.abs(y).max())
+
+    def test_boosters_continue_and_the_forest_is_kept(self, history, model_config):
+        forecaster = trained(history.iloc[:-30], model_config)
+        forest = forecaster.models[ModelType.RANDOM_FOREST]
+        result = forecaster.update(history, new_rows=30)
+
+        assert result[ModelType.RANDOM_FOREST] is False
+        assert forecaster.models[ModelType.RANDOM_FOREST] is forest
+        assert result[ModelType.XGBOOST] and result[ModelType.LIGHTGBM]
+        assert forecaster.models[ModelType.XGBOOST].get_booster().num_boosted_rounds() == 30
+        assert forecaster.models[ModelType.LIGHTGBM].booster_.current_iteration() == 30
+
+    def test_frame_fitted_scaler_gets_named_features(self, history, model_config):
+        forecaster = trained(history.iloc[:-30], model_config)
+        scaler = forecaster.scalers[ModelType.LINEAR_REGRESSION]
+        # Scalers fitted before training switched to bare matrices saw a frame
+        scaler.feature_names_in_ = np.array(forecaster.feature_columns, dtype=object)
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings('error', message='.*feature names')
+            assert forecaster.update(history, new_rows=30)[ModelType.LINEAR_REGRESSION]
+
+    def test_untrained_forecaster_cannot_update(self, history):
+        with pytest.raises(ValueError, match='must be trained'):
+            CashFlowForecaster().update(history, new_rows=30)
@@ -0,0 +1,123 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from forecasting_engine import CashFlowForecaster, FeatureEngineering, ModelType
+from model_registry import ModelRegistry
+
+ORG = 'org-1'
+
+
+@pytest.fixture
+def config(model_config):
+    return {**model_config, 'backtest': False}
+
+
+@pytest.fixture
+def registered(tmp_path, history, config):
+    registry = ModelRegistry(str(tmp_path))
+    forecaster = CashFlowForecaster(config, registry=registry)
+    assert not forecaster.load_or_train(history, ORG)
+    return registry, forecaster
+
+
+class TestFingerprint:
+    def test_model_configuration_changes_the_fingerprint(self, history, config):
+        fingerprint = CashFlowForecaster(config).training_fingerprint(history)
+        assert CashFlowForecaster(dict(config)).training_fingerprint(history) == fingerprint
+
+        trees = {'n_estimators': 40}
+        changed = [
+            {**config, 'model_params': {**config['model_params'], ModelType.XGBOOST: trees}},
+            {**config, 'feature_selection': {'max_features': 10}},
+            {**config, 'model_selection': True},
+            {**config, 'lags': [1, 7]},
+        ]
+        for other in changed:
+            assert CashFlowForecaster(other).training_fingerprint(history) != fingerprint
+        assert CashFlowForecaster(config).training_fingerprint(history, 'total_inflow') != fingerprint
+        assert CashFlowForecaster(config).training_fingerprint(history.iloc[:-1]) != fingerprint
+
+    def test_run_options_and_caches_do_not(self, history, config):
+        fingerprint = CashFlowForecaster(config).training_fingerprint(history)
+        for other in ({**config, 'backtest': {'n_cutoffs': 5}}, {**config, 'core_budget': 4},
+                      {**config, 'parallel_training': True}):
+            assert CashFlowForecaster(other).training_fingerprint(history) == fingerprint
+
+        selection = {'model_selection': {'tolerance': 0.1, 'cache': object()}}
+        assert (CashFlowForecaster({**config, **selection}).training_fingerprint(history)
+                == CashFlowForecaster({**config, **selection}).training_fingerprint(history))
+
+    def test_tuned_parameters_and_feature_set_version_are_included(self, history, config,
+                                                                   monkeypatch):
+        forecaster = CashFlowForecaster(config)
+        fingerprint = forecaster.training_fingerprint(history)
+        assert json.loads(forecaster.config_signature())['model_params']['xgboost'] == {'n_estimators': 20}
+
+        monkeypatch.setattr(FeatureEngineering, 'FEATURE_SET_VERSION',
+                            FeatureEngineering.FEATURE_SET_VERSION + 1)
+        assert forecaster.training_fingerprint(history) != fingerprint
+        monkeypatch.undo()
+
+        forecaster.model_params[ModelType.LIGHTGBM] = {'n_estimators': 20, 'num_leaves': 15}
+        assert forecaster.training_fingerprint(history) != fingerprint
+
+
+class TestModelRegistry:
+    def test_round_trip_restores_the_forecast(self, registered, history, config):
+        registry, trained = registered
+        restored = CashFlowForecaster(config, registry=registry)
+        assert restored.load_or_train(history, ORG)
+
+        assert restored.is_trained and restored.series_key == ORG
+        assert set(restored.models) == set(trained.models)
+        assert restored.feature_columns == trained.feature_columns
+        np.testing.assert_array_equal(restored.forecast(history, 14).predictions,
+                                      trained.forecast(history, 14).predictions)
+
+        metadata = registry.metadata(ORG, trained.training_fingerprint(history))
+        assert metadata['feature_count'] == len(trained.feature_columns)
+        assert sorted(metadata['model_types']) == sorted(m.value for m in trained.models)
+
+    def test_changed_model_config_misses(self, registered, history, config):
+        registry, _ = registered
+        params = {**config['model_params'], ModelType.RANDOM_FOREST: {'n_estimators': 10}}
+        retrained = CashFlowForecaster({**config, 'model_params': params}, registry=registry)
+        assert not retrained.load_or_train(history, ORG)
+        assert retrained.models[ModelType.RANDOM_FOREST].n_estimators == 10
+        assert len(list(registry.root.glob('*/*.pkl'))) == 2
+
+    def test_format_and_library_changes_invalidate_entries(self, registered, history, config,
+                                                           monkeypatch):
+        registry, trained = registered
+        fingerprint = trained.training_fingerprint(history)
+        monkeypatch.setattr(ModelRegistry, 'FORMAT_VERSION', ModelRegistry.FORMAT_VERSION + 1)
+        assert not registry.load(ORG, fingerprint, CashFlowForecaster(config))
+        monkeypatch.undo()
+
+        monkeypatch.setattr(ModelRegistry, '_library_versions',
+                            staticmethod(lambda names=None: {name: '0.0' for name in names or []}))
+        assert not registry.load(ORG, fingerprint, CashFlowForecaster(config))
+        monkeypatch.undo()
+        assert registry.load(ORG, fingerprint, CashFlowForecaster(config))
+
+    def test_least_recently_used_entries_are_evicted(self, registered, history, config):
+        registry, trained = registered
+        trained_path, = registry.root.glob('*/*.pkl')
+        paths = [trained_path] + [registry.save(ORG, fingerprint, trained)
+                                  for fingerprint in ('a' * 32, 'b' * 32)]
+        # Timestamps set apart (the clock may be coarse): the load_or_train entry
+        # is oldest, then 'a', then 'b'; reading 'a' makes 'b' the older of the two
+        for age, path in enumerate(paths):
+            os.utime(path, (age + 1, age + 1))
+        assert registry.load(ORG, 'a' * 32, CashFlowForecaster(config))
+
+        registry.max_entries = 1
+        assert registry.evict() == 2
+        assert [path.stem for path in registry.root.glob('*/*.pkl')] == ['a' * 32]
+
+    def test_untrained_forecasters_are_rejected(self, tmp_path):
+        with pytest.raises(ValueError, match='Only trained'):
+            ModelRegistry(str(tmp_path)).save(ORG, 'a' * 32, CashFlowForecaster())
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from forecasting_engine import CashFlowForecaster, ModelType
+from model_serving import (
+    CompactLinearModel, CompactTreeEnsemble, ModelServingCache, compact_forecaster, serving_size
+)
+
+
+@pytest.fixture(scope='module')
+def trained(history, model_config):
+    forecaster = CashFlowForecaster(model_config)
+    forecaster.train_ensemble(history)
+    X, _ = forecaster.prepare_data(history)
+    return forecaster, X.to_numpy()
+
+
+class TestCompactForecaster:
+    @pytest.mark.parametrize('model_type', [
+        ModelType.RANDOM_FOREST, ModelType.XGBOOST, ModelType.LIGHTGBM, ModelType.LINEAR_REGRESSION
+    ])
+    def test_members_predict_like_the_originals(self, trained, model_type):
+        forecaster, X = trained
+        serving = compact_forecaster(forecaster)
+        expected = forecaster.predict(X, model_type)
+        # XGBoost accumulates leaf values in float32
+        rtol = 1e-6 if model_type == ModelType.XGBOOST else 1e-9
+        np.testing.assert_allclose(serving.predict(X, model_type), expected, rtol=rtol,
+                                   atol=rtol * np.abs(expected).max())
+
+    def test_missing_values_follow_the_default_direction(self, trained):
+        forecaster, X = trained
+        serving = compact_forecaster(forecaster)
+        X = X[:50].copy()
+        X[::3, :5] = np.nan
+        for model_type in (ModelType.XGBOOST, ModelType.LIGHTGBM):
+            expected = forecaster.predict(X, model_type)
+            np.testing.assert_allclose(serving.predict(X, model_type), expected,
+                                       rtol=1e-6, atol=1e-6 * np.abs(expected).max())
+
+    def test_forecast_matches_and_update_state_is_dropped(self, trained, history):
+        forecaster, _ = trained
+        serving = compact_forecaster(forecaster)
+
+        assert isinstance(serving.models[ModelType.RANDOM_FOREST], CompactTreeEnsemble)
+        assert isinstance(serving.models[ModelType.LINEAR_REGRESSION], CompactLinearModel)
+        assert ModelType.LINEAR_REGRESSION not in serving.scalers
+        assert serving.online_state == {} and forecaster.online_state
+        assert serving_size(serving) < serving_size(forecaster)
+
+        expected = forecaster.forecast(history, 30).predictions
+        np.testing.assert_allclose(serving.forecast(history, 30).predictions, expected,
+                                   rtol=1e-6, atol=1e-6 * np.abs(expected).max())
+
+    def test_untrained_forecasters_are_rejected(self):
+        with pytest.raises(ValueError, match='Only trained'):
+            compact_forecaster(CashFlowForecaster())
+
+
+class TestModelServingCache:
+    def test_least_recently_used_entry_is_evicted(self, trained):
+        forecaster, X = trained
+        size = serving_size(compact_forecaster(forecaster))
+        cache = ModelServingCache(memory_budget=2 * size)
+
+        cache.put('a', 'v1', forecaster)
+        cache.put('b', 'v1', forecaster)
+        assert cache.get('a', 'v1') is not None
+        cache.put('c', 'v1', forecaster)
+
+        assert cache.get('b', 'v1') is None
+        assert cache.get('a', 'v1') is not None and cache.get('c', 'v1') is not None
+        stats = cache.stats()
+        assert stats['entries'] == 2 and stats['evictions'] == 1 and stats['size_bytes'] == 2 * size
+
+    def test_miss_loads_once_then_hits(self, trained):
+        forecaster, X = trained
+        cache = ModelServingCache()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return forecaster
+
+        first = cache.get('a', 'v1', loader)
+        assert cache.get('a', 'v1', loader) is first and len(loads) == 1
+        np.testing.assert_allclose(cache.predict('a', 'v1', X[:5])[0], forecaster.ensemble_predict(X[:5])[0],
+                                   rtol=1e-6)
+
+        cache.invalidate('a')
+        assert cache.stats()['entries'] == 0
+        with pytest.raises(ValueError, match='No model'):
+            cache.predict('a', 'v1', X[:5])
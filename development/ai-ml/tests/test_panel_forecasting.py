@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_matrix_benchmark import make_history
+from forecasting_engine import ModelType, RecursiveFeatureState
+from panel_forecasting import PanelFeatureState, PanelForecaster
+
+LAGS, WINDOWS = [1, 7, 30], [7, 30, 90]
+
+
+def panel(histories):
+    return pd.concat([df.assign(organization_id=org) for org, df in histories.items()],
+                     ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def trained(model_config):
+    histories = {f'org-{seed}': make_history(200, seed=seed) for seed in range(3)}
+    # Tenants of very different size share the one model
+    histories['org-2'][['total_inflow', 'total_outflow', 'net_flow', 'total_balance']] *= 100
+    forecaster = PanelForecaster(ModelType.LIGHTGBM, {**model_config, 'backtest': False})
+    forecaster.train(panel(histories))
+    return forecaster, histories
+
+
+class TestPanelFeatureState:
+    def test_matches_the_per_series_state(self):
+        histories = [make_history(120, seed=seed)['net_flow'].to_numpy() for seed in range(3)]
+        panel_state = PanelFeatureState(histories, LAGS, WINDOWS)
+        states = [RecursiveFeatureState(history, LAGS, WINDOWS) for history in histories]
+
+        for step in range(3):
+            for i, state in enumerate(states):
+                assert [panel_state.lag(lag)[i] for lag in LAGS] == [state.lag(lag) for lag in LAGS]
+                for window in WINDOWS:
+                    np.testing.assert_allclose([values[i] for values in panel_state.rolling(window)],
+                                               state.rolling(window), rtol=1e-9)
+            values = np.array([100.0, -50.0, 0.0]) * (step + 1)
+            panel_state.push(values)
+            for state, value in zip(states, values):
+                state.push(value)
+
+
+class TestPanelForecaster:
+    def test_served_tenants_get_panel_forecasts_on_their_own_scale(self, trained):
+        forecaster, histories = trained
+        result = forecaster.predict(panel(histories), forecast_days=14)
+
+        assert (result['model'] == 'panel_lightgbm').all()
+        for org, history in histories.items():
+            rows = result[result['organization_id'] == org]
+            expected = pd.date_range(history['date'].iloc[-1], periods=15, freq='D')[1:]
+            assert (pd.DatetimeIndex(rows['date']) == expected).all()
+            assert np.isfinite(rows['prediction']).all()
+        scale = {org: result.loc[result['organization_id'] == org, 'prediction'].abs().mean()
+                 for org in histories}
+        assert scale['org-2'] > 10 * scale['org-0']
+
+    @pytest.mark.filterwarnings('ignore::RuntimeWarning')
+    def test_unseen_and_short_tenants_fall_back(self, trained):
+        forecaster, histories = trained
+        tenants = {'org-0': histories['org-0'], 'new-org': make_history(200, seed=7),
+                   'short-org': make_history(60, seed=8)}
+        result = forecaster.predict(panel(tenants), forecast_days=7)
+
+        models = result.groupby('organization_id')['model'].unique()
+        assert list(models['org-0']) == ['panel_lightgbm']
+        assert list(models['new-org']) == ['per_org']
+        # Shorter than the longest window: not served by the panel model
+        assert 'panel_lightgbm' not in list(models.get('short-org', []))
+        assert (result.groupby('organization_id').size() == 7).all()
+
+    def test_untrained_and_unsupported_models_are_rejected(self):
+        with pytest.raises(ValueError, match='must be trained'):
+            PanelForecaster().predict(panel({'org': make_history(120)}))
+        with pytest.raises(ValueError, match='cannot be used'):
+            PanelForecaster(ModelType.LINEAR_REGRESSION)
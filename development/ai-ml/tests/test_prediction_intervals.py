@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from forecasting_engine import CashFlowForecaster
+from prediction_intervals import ConformalCalibrator
+
+
+def skewed_errors(rng, n, horizon):
+    """Right-skewed, zero-mean errors that grow with the horizon step"""
+    return (rng.exponential(1.0, size=(n, horizon)) - 1.0) * np.sqrt(np.arange(1, horizon + 1))
+
+
+class TestConformalCalibrator:
+    @pytest.mark.parametrize('level', [0.8, 0.95])
+    def test_empirical_coverage_meets_the_level(self, level):
+        rng = np.random.default_rng(0)
+        horizon, coverage = 5, []
+        for _ in range(200):
+            calibrator = ConformalCalibrator(skewed_errors(rng, 40, horizon), min_per_step=20)
+            lower, upper = calibrator.offsets(level, horizon)
+            errors = skewed_errors(rng, 2000, horizon)
+            coverage.append(((errors >= lower) & (errors <= upper)).mean(axis=0))
+
+        # Split-conformal coverage holds on average over calibration sets
+        coverage = np.mean(coverage, axis=0)
+        assert (coverage >= level - 0.005).all()
+        assert (coverage <= level + 0.04).all()
+
+    def test_bands_follow_skew_and_widen_with_the_horizon(self):
+        calibrator = ConformalCalibrator(skewed_errors(np.random.default_rng(1), 500, 10))
+        lower, upper = calibrator.offsets(0.9, 10)
+        assert (upper > -lower).all()
+        assert upper[-1] > 2 * upper[0]
+        intervals = calibrator.intervals(np.arange(10.0), 0.9)
+        np.testing.assert_allclose(intervals, np.column_stack([np.arange(10.0) + lower,
+                                                               np.arange(10.0) + upper]))
+
+    def test_few_cutoffs_calibrate_blocks_of_steps(self):
+        residuals = np.tile(np.arange(30.0), (3, 1))
+        calibrator = ConformalCalibrator(residuals, min_per_step=20)
+
+        # 3 cutoffs need blocks of 7 steps; the last block takes the remainder
+        assert calibrator.step_block.tolist() == [0] * 7 + [1] * 7 + [2] * 7 + [3] * 9
+        assert calibrator.counts.tolist() == [21, 21, 21, 27]
+        # 0.75 quantile of three copies of 0..6, then of 21..29 (also past the horizon)
+        lower, upper = calibrator.offsets(0.5, 35)
+        assert upper[:7].tolist() == [5.0] * 7 and upper[21:].tolist() == [27.0] * 14
+        assert lower[0] == 1.0
+
+    def test_non_finite_residuals_are_ignored(self):
+        residuals = np.array([[1.0, np.nan], [2.0, 5.0], [np.inf, 6.0]])
+        calibrator = ConformalCalibrator(residuals, min_per_step=1)
+        assert calibrator.counts.tolist() == [2, 2] and calibrator.n_samples == 4
+        with pytest.raises(ValueError, match='finite residuals'):
+            ConformalCalibrator(np.full((3, 2), np.nan))
+        with pytest.raises(ValueError, match='between 0 and 1'):
+            calibrator.offsets(1.0, 2)
+
+
+class TestForecastIntervals:
+    def test_forecast_uses_backtest_residuals(self, history, model_config):
+        forecaster = CashFlowForecaster(model_config)
+        result = forecaster.forecast(history, 14, confidence_level=0.9)
+
+        calibrator = ConformalCalibrator(forecaster.backtest_residuals)
+        np.testing.assert_allclose(result.confidence_intervals,
+                                   calibrator.intervals(result.predictions, 0.9))
+
+        forecaster.model_config = {**model_config, 'interval_method': 'spread'}
+        intervals, _ = forecaster.prediction_intervals(result.predictions, np.ones(14), 0.9)
+        np.testing.assert_allclose(intervals[:, 1] - result.predictions, 1.6448536, rtol=1e-6)
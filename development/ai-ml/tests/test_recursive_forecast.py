@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting_engine import CashFlowForecaster, FeatureEngineering, ModelType, RecursiveFeatureState
+
+LAGS, WINDOWS = [1, 7, 30], [7, 30, 90]
+
+
+def state_columns(target_col='net_flow'):
+    lag_names = [f'{target_col}_lag_{lag}' for lag in LAGS]
+    rolling_names = [f'{target_col}_rolling_{stat}_{window}'
+                     for window in WINDOWS for stat in FeatureEngineering.ROLLING_STATS]
+    return lag_names + rolling_names
+
+
+def state_row(state):
+    values = [state.lag(lag) for lag in LAGS]
+    for window in WINDOWS:
+        values += state.rolling(window)
+    return values
+
+
+def matrix_rows(df):
+    matrix = FeatureEngineering.build_feature_matrix(df, 'net_flow', lags=LAGS, windows=WINDOWS,
+                                                     dropna=False)
+    return matrix.values[:, [matrix.column_index(name) for name in state_columns()]]
+
+
+class LagOneModel:
+    """Predicts yesterday's value plus one, recording the rows it is given"""
+
+    def __init__(self, lag_index):
+        self.lag_index = lag_index
+        self.rows = []
+
+    def predict(self, X):
+        self.rows.append(np.array(X[0]))
+        return X[:, self.lag_index] + 1.0
+
+
+class TestRecursiveFeatureState:
+    def test_matches_the_feature_matrix_at_every_step(self, history):
+        expected = matrix_rows(history)
+        target = history['net_flow'].to_numpy()
+
+        # Built from a short history, then pushed one value at a time
+        state = RecursiveFeatureState(target[:5], LAGS, WINDOWS)
+        for t in range(5, len(history)):
+            np.testing.assert_allclose(state_row(state), expected[t], rtol=1e-9, atol=1e-6,
+                                       equal_nan=True)
+            state.push(target[t])
+
+    def test_built_from_a_long_history(self, history):
+        target = history['net_flow'].to_numpy()
+        state = RecursiveFeatureState(target[:300], LAGS, WINDOWS)
+        np.testing.assert_allclose(state_row(state), matrix_rows(history)[300], rtol=1e-9, atol=1e-6)
+
+    def test_variance_stays_accurate_for_large_values(self, history):
+        # A large mean would cancel catastrophically in a plain sum of squares
+        df = history.assign(net_flow=history['net_flow'] + 1e9)
+        target = df['net_flow'].to_numpy()
+        state = RecursiveFeatureState(target[:-1], LAGS, WINDOWS)
+        std = state.rolling(30)[1]
+        assert std == pytest.approx(np.std(target[-31:-1], ddof=1), rel=1e-6)
+
+
+class TestRecursivePredict:
+    def test_predictions_feed_the_next_step(self, history):
+        forecaster = CashFlowForecaster()
+        X, _ = forecaster.prepare_data(history)
+        model = LagOneModel(forecaster.feature_columns.index('net_flow_lag_1'))
+        forecaster.models = {ModelType.LINEAR_REGRESSION: model}
+        forecaster.is_trained = True
+
+        predictions, std = forecaster.recursive_predict(history, 10)
+        last = history['net_flow'].iloc[-1]
+        np.testing.assert_allclose(predictions, last + np.arange(1, 11))
+        assert (std == 0).all()
+
+        # Every step saw the lags and windows of history plus earlier predictions
+        dates = pd.date_range(history['date'].iloc[-1], periods=11, freq='D')[1:]
+        extended = pd.concat([history, pd.DataFrame({'date': dates, 'net_flow': predictions})],
+                             ignore_index=True)
+        expected = matrix_rows(extended)[-10:]
+        columns = [forecaster.feature_columns.index(name) for name in state_columns()]
+        np.testing.assert_allclose(np.array(model.rows)[:, columns], expected, rtol=1e-9, atol=1e-6)
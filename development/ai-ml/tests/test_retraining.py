@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting_engine import CashFlowForecaster
+from retraining import RetrainingScheduler, drift_statistics, reference_profile
+
+DAY = 86400
+
+
+class StubForecaster:
+    """Stands in for a trained model where only its metrics matter"""
+
+    def __init__(self, mae=100.0, in_sample=False):
+        self.model_metrics = {'mae': mae, **({'in_sample': 1.0} if in_sample else {})}
+
+    def training_fingerprint(self, df, target_col='net_flow'):
+        return CashFlowForecaster().training_fingerprint(df, target_col)
+
+
+def extend(df, days, scale=1.0, shift=0.0):
+    """df with `days` more days of flows resampled from its own history"""
+    rng = np.random.default_rng(days)
+    net_flow = rng.choice(df['net_flow'].to_numpy(), days) * scale + shift
+    extra = pd.DataFrame({
+        'date': df['date'].iloc[-1] + pd.to_timedelta(np.arange(1, days + 1), unit='D'),
+        'total_inflow': np.maximum(net_flow, 0),
+        'total_outflow': np.maximum(-net_flow, 0),
+        'net_flow': net_flow,
+    })
+    extra['total_balance'] = df['total_balance'].iloc[-1] + net_flow.cumsum()
+    return pd.concat([df, extra], ignore_index=True)
+
+
+class TestTriggers:
+    def test_untrained_and_unchanged(self, history):
+        scheduler = RetrainingScheduler(untrained_priority=10)
+        decision = scheduler.assess('org', history, importance=3)
+        assert decision.reasons == ['untrained'] and decision.priority == 30
+
+        scheduler.observe('org', StubForecaster(), history)
+        assert not scheduler.assess('org', history).needed
+
+    def test_new_data_alone_does_not_retrain(self, history):
+        scheduler = RetrainingScheduler()
+        scheduler.observe('org', StubForecaster(), history)
+        decision = scheduler.assess('org', extend(history, 7))
+        assert not decision.needed and decision.statistics['new_rows'] == 7
+
+    def test_stale_model(self, history):
+        scheduler = RetrainingScheduler(max_age_days=30)
+        scheduler.observe('org', StubForecaster(), history)
+        now = scheduler.status('org').trained_at + 45 * DAY
+        decision = scheduler.assess('org', extend(history, 1), now=now)
+        assert decision.reasons == ['stale'] and decision.priority == pytest.approx(1.5)
+
+    def test_error_spike(self, history):
+        scheduler = RetrainingScheduler(error_ratio=1.5, min_errors=7)
+        scheduler.observe('org', StubForecaster(mae=100.0), history)
+        scheduler.record_actuals('org', np.zeros(7), np.full(7, 400.0))
+        decision = scheduler.assess('org', extend(history, 7))
+        assert decision.reasons == ['degraded']
+        assert decision.statistics['error_ratio'] == pytest.approx(4.0)
+
+    def test_in_sample_metrics_are_no_baseline(self, history):
+        scheduler = RetrainingScheduler()
+        scheduler.observe('org', StubForecaster(mae=1.0, in_sample=True), history)
+        scheduler.record_actuals('org', np.zeros(7), np.full(7, 400.0))
+        assert scheduler.status('org').baseline_mae is None
+        assert not scheduler.assess('org', extend(history, 7)).needed
+
+    def test_drift(self, history):
+        scheduler = RetrainingScheduler(drift_window=60)
+        scheduler.observe('org', StubForecaster(), history)
+        decision = scheduler.assess('org', extend(history, 60, shift=4 * history['net_flow'].std()))
+        assert {'distribution_drift', 'mean_shift'} <= set(decision.reasons)
+
+    def test_plan_respects_priority_and_budget(self, history):
+        scheduler = RetrainingScheduler(default_train_seconds=10)
+        frames = {'a': history, 'b': history, 'c': history}
+        plan = scheduler.plan(frames, budget_seconds=25, importance={'c': 2.0})
+        assert [decision.organization_id for decision in plan] == ['c', 'a']
+
+
+class TestRun:
+    def test_error_spike_retrains_a_model_trained_without_backtest(self, history, model_config):
+        scheduler = RetrainingScheduler({**model_config, 'backtest': False}, min_errors=7)
+        assert set(scheduler.run({'org': history})) == {'org'}
+        baseline = scheduler.status('org').baseline_mae
+        assert baseline is not None and baseline > 0
+
+        newer = extend(history, 7)
+        assert scheduler.plan({'org': newer}) == []
+        scheduler.record_actuals('org', np.zeros(7), np.full(7, 10 * baseline))
+        retrained = scheduler.run({'org': newer})
+
+        assert set(retrained) == {'org'}
+        assert scheduler.status('org').n_obs == len(newer)
+        assert scheduler.status('org').errors == []
+
+
+class TestPersistence:
+    def test_errors_survive_a_restart(self, history, tmp_path):
+        path = str(tmp_path / 'retraining.json')
+        scheduler = RetrainingScheduler(path=path, compact_every=3)
+        scheduler.observe('org', StubForecaster(), history)
+        for value in range(5):
+            scheduler.record_actuals('org', [0.0], [float(value)])
+
+        restored = RetrainingScheduler(path=path)
+        assert restored.status('org').errors == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+class TestDriftStatistics:
+    def test_same_distribution_has_no_drift(self, history):
+        values = history['net_flow'].to_numpy()
+        statistics = drift_statistics(reference_profile(values), values)
+        assert statistics['psi'] == pytest.approx(0.0, abs=1e-6)
+        assert statistics['mean_shift'] == 0.0 and statistics['std_ratio'] == 1.0
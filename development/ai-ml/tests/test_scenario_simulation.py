@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from forecasting_engine import ForecastResult, ModelType
+from scenario_simulation import ScenarioSimulator, parse_adjustments
+
+START = datetime(2024, 1, 1)
+
+
+def forecast(predictions, sigma=None):
+    predictions = np.asarray(predictions, dtype=np.float64)
+    intervals = None
+    if sigma is not None:
+        intervals = np.column_stack([predictions - 1.96 * sigma, predictions + 1.96 * sigma])
+    return ForecastResult(predictions=predictions, confidence_intervals=intervals,
+                          feature_importance=None, model_metrics={}, model_type=ModelType.ENSEMBLE,
+                          forecast_dates=[START + timedelta(days=i) for i in range(len(predictions))],
+                          confidence_score=0.5)
+
+
+class TestScenarioSimulator:
+    def test_normal_paths_have_the_random_walk_quantiles(self):
+        horizon, sigma = 30, 50.0
+        simulator = ScenarioSimulator(n_paths=40000, seed=0)
+        result = simulator.simulate(forecast(np.full(horizon, 10.0), sigma), 1000.0, {'base': {}})['base']
+
+        days = np.arange(1, horizon + 1)
+        mean, spread = 1000.0 + 10.0 * days, sigma * np.sqrt(days)
+        for q, levels in result.quantiles.items():
+            expected = mean + NormalDist().inv_cdf(q) * spread
+            np.testing.assert_allclose(levels, expected, atol=0.05 * spread.max())
+        np.testing.assert_allclose(result.expected_balance, mean, atol=0.02 * spread.max())
+
+    def test_bootstrapped_residuals_set_the_quantiles(self):
+        simulator = ScenarioSimulator(n_paths=20000, quantiles=(0.05, 0.5, 0.95), seed=0)
+        result = simulator.simulate(forecast(np.zeros(2)), 0.0, {'base': {}},
+                                    residuals=np.array([-10.0, 10.0, np.nan]))['base']
+
+        # Day one is -10 or +10; day two -20, 0 or +20
+        assert [levels[0] for levels in result.quantiles.values()] == [-10.0, pytest.approx(0.0, abs=10), 10.0]
+        assert [levels[1] for levels in result.quantiles.values()] == [-20.0, 0.0, 20.0]
+        assert result.probability_negative[0] == pytest.approx(0.5, abs=0.02)
+        # A path that starts at +10 never drops below zero within two days
+        assert result.probability_negative_any == result.probability_negative[0]
+
+    def test_scenarios_share_the_draws(self):
+        simulator = ScenarioSimulator(n_paths=2000, seed=1)
+        scenarios = {'base': {}, 'unchanged': {'percentage': 0},
+                     'payment': {'fixed': [{'amount': 250.0, 'date': '2024-01-03'}]}}
+        results = simulator.simulate(forecast(np.full(5, 10.0), 20.0), 100.0, scenarios)
+
+        base = results['base'].quantiles
+        for q in base:
+            np.testing.assert_array_equal(results['unchanged'].quantiles[q], base[q])
+            np.testing.assert_allclose(results['payment'].quantiles[q] - base[q],
+                                       [0.0, 0.0, 250.0, 250.0, 250.0])
+
+    def test_runway(self):
+        simulator = ScenarioSimulator(n_paths=100)
+        burning = simulator.simulate(forecast(np.full(10, -30.0)), 100.0, {'base': {}},
+                                     residuals=np.zeros(1))['base']
+        assert set(burning.runway_quantiles.values()) == {4}
+        assert burning.probability_negative.tolist() == [0.0] * 3 + [1.0] * 7
+
+        growing = simulator.simulate(forecast(np.full(10, 30.0)), 100.0, {'base': {}},
+                                     residuals=np.zeros(1))['base']
+        assert set(growing.runway_quantiles.values()) == {None}
+        assert growing.to_dict()['horizon_days'] == 10
+
+    def test_needs_residuals_or_intervals(self):
+        with pytest.raises(ValueError, match='residuals or forecast intervals'):
+            ScenarioSimulator(n_paths=10).simulate(forecast(np.zeros(3)), 0.0, {'base': {}})
+
+
+class TestParseAdjustments:
+    def test_percentages_and_recurring_amounts(self):
+        dates = [datetime(2024, 1, 29) + timedelta(days=i) for i in range(35)]
+        scale, shift = parse_adjustments({
+            'percentage': [{'value': -20, 'start': '2024-02-01'}],
+            'fixed': [{'amount': 7.0, 'start': '2024-01-29', 'frequency': 'weekly'},
+                      {'amount': 100.0, 'start': '2024-01-31', 'frequency': 'monthly'}],
+        }, dates)
+
+        assert scale[:3].tolist() == [1.0] * 3 and (scale[3:] == 0.8).all()
+        weekly = [i for i in range(35) if i % 7 == 0]
+        # The 31st falls on the last day of February
+        monthly = [dates.index(datetime(2024, 1, 31)), dates.index(datetime(2024, 2, 29))]
+        expected = np.zeros(35)
+        expected[weekly] += 7.0
+        expected[monthly] += 100.0
+        np.testing.assert_array_equal(shift, expected)
+
+    @pytest.mark.parametrize('adjustments', [{'inflation': 2}, {'fixed': [{'amount': 1, 'frequency': 'hourly'}]}])
+    def test_unknown_adjustments_are_rejected(self, adjustments):
+        with pytest.raises(ValueError, match='Unknown'):
+            parse_adjustments(adjustments, [START])
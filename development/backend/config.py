@@ -53,6 +53,9 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = Field(default=100, env="RATE_LIMIT_REQUESTS")
     RATE_LIMIT_WINDOW: int = Field(default=60, env="RATE_LIMIT_WINDOW")  # seconds
+
+    # Bulk ingest
+    INGEST_MAX_BODY_BYTES: int = Field(default=100 * 1024 * 1024, env="INGEST_MAX_BODY_BYTES")
     
     # External APIs
     PLAID_CLIENT_ID: str = Field(default="", env="PLAID_CLIENT_ID")
@@ -81,7 +84,19 @@ class Settings(BaseSettings):
     ML_MODEL_PATH: str = Field(default="models/", env="ML_MODEL_PATH")
     ML_BATCH_SIZE: int = Field(default=32, env="ML_BATCH_SIZE")
     ML_TRAINING_DATA_DAYS: int = Field(default=365, env="ML_TRAINING_DATA_DAYS")
-    
+    ML_ENGINE_PATH: str = Field(
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai-ml"),
+        env="ML_ENGINE_PATH"
+    )
+
+    # Forecast jobs
+    FORECAST_WORKERS: int = Field(default=2, env="FORECAST_WORKERS")  # processes per runner
+    FORECAST_MAX_CONCURRENT_JOBS: int = Field(default=8, env="FORECAST_MAX_CONCURRENT_JOBS")
+    FORECAST_MAX_JOBS_PER_ORG: int = Field(default=1, env="FORECAST_MAX_JOBS_PER_ORG")
+    FORECAST_JOB_MAX_ATTEMPTS: int = Field(default=3, env="FORECAST_JOB_MAX_ATTEMPTS")
+    FORECAST_JOB_TIMEOUT: int = Field(default=300, env="FORECAST_JOB_TIMEOUT")  # seconds without heartbeat
+    FORECAST_JOB_EXECUTION_TIMEOUT: int = Field(default=1800, env="FORECAST_JOB_EXECUTION_TIMEOUT")  # seconds of training
+
     # Monitoring
     SENTRY_DSN: str = Field(default="", env="SENTRY_DSN")
     DATADOG_API_KEY: str = Field(default="", env="DATADOG_API_KEY")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Numeric, DateTime
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, Boolean
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -18,7 +18,8 @@ class BankAccount(Base):
     available_balance = Column(Numeric(15, 2))
     last_synced_at = Column(DateTime)
     is_active = Column(Boolean, default=True)
-    metadata = Column(JSONB, default={})
+    # "metadata" is reserved on declarative classes
+    metadata_ = Column("metadata", JSONB, default={})
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
@@ -1,10 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from database.connection import Database
 from models.forecast import Forecast, ForecastDataPoint
-from models.transaction import Transaction
-import pandas as pd
+from services.forecast_jobs import get_job_queue, job_status
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -12,63 +11,72 @@ router = APIRouter()
 @router.post("/{organization_id}/generate")
 async def generate_forecast(
     organization_id: str,
-    forecast_days: int = 30,
-    background_tasks: BackgroundTasks = BackgroundTasks(),
-    session: AsyncSession = Depends(Database.get_session)
+    forecast_days: int = Query(30, ge=1, le=365),
+    confidence_level: float = Query(0.95, gt=0, lt=1),
+    session: AsyncSession = Depends(Database.get_session),
+    queue = Depends(get_job_queue)
 ):
-    # Create forecast record
+    """
+    Create a draft forecast and queue a job to generate it.
+
+    The forecast is trained and stored by the forecast runner
+    (`python -m services.forecast_jobs`); poll /jobs/{job_id} for progress.
+    """
     new_forecast = Forecast(
         organization_id=organization_id,
         created_by=organization_id,  # Simplified for now
         name=f"AI Forecast - {datetime.now().strftime('%Y-%m-%d')}",
         forecast_start_date=datetime.now(),
         forecast_end_date=datetime.now() + timedelta(days=forecast_days),
-        status='active'
+        status='draft',
+        parameters={"forecast_days": forecast_days, "confidence_level": confidence_level}
     )
-    
+
     session.add(new_forecast)
     await session.commit()
     await session.refresh(new_forecast)
-    
-    # Queue background task to generate predictions
-    background_tasks.add_task(generate_forecast_data, str(new_forecast.id), organization_id, forecast_days)
-    
-    return {"forecast_id": str(new_forecast.id), "status": "generating"}
+
+    job = await queue.enqueue(organization_id, str(new_forecast.id), new_forecast.parameters)
+
+    return {"forecast_id": str(new_forecast.id), "job_id": str(job["id"]), "status": job["status"]}
+
+@router.get("/jobs/{job_id}")
+async def get_forecast_job(job_id: str, queue = Depends(get_job_queue)):
+    job = await queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Forecast job not found")
+    return job_status(job)
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_forecast_job(job_id: str, queue = Depends(get_job_queue)):
+    """Cancel a job that has not started yet"""
+    if not await queue.cancel(job_id):
+        job = await queue.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Forecast job not found")
+        raise HTTPException(status_code=409, detail=f"Forecast job is {job['status']}")
+    return job_status(await queue.get(job_id))
 
 @router.get("/{forecast_id}")
-async def get_forecast(forecast_id: str, session: AsyncSession = Depends(Database.get_session)):
+async def get_forecast(
+    forecast_id: str,
+    session: AsyncSession = Depends(Database.get_session),
+    queue = Depends(get_job_queue)
+):
     result = await session.execute(select(Forecast).where(Forecast.id == forecast_id))
     forecast = result.scalar()
     if not forecast:
         raise HTTPException(status_code=404, detail="Forecast not found")
-    
+
     # Get data points
     data_result = await session.execute(
         select(ForecastDataPoint).where(ForecastDataPoint.forecast_id == forecast_id)
     )
     data_points = data_result.scalars().all()
-    
+    job = await queue.latest_for_forecast(forecast_id)
+
     return {
         "forecast": forecast,
-        "data_points": data_points
+        "data_points": data_points,
+        "job": job_status(job) if job else None
     }
-
-async def generate_forecast_data(forecast_id: str, organization_id: str, forecast_days: int):
-    # This would integrate with the AI forecasting engine
-    # For now, generate dummy data
-    import asyncio
-    await asyncio.sleep(2)  # Simulate processing time
-    
-    async with Database.get_session() as session:
-        for i in range(forecast_days):
-            data_point = ForecastDataPoint(
-                forecast_id=forecast_id,
-                date=datetime.now() + timedelta(days=i+1),
-                predicted_inflow=10000 + (i * 100),
-                predicted_outflow=8000 + (i * 80),
-                predicted_balance=2000 + (i * 20),
-                confidence_score=0.85
-            )
-            session.add(data_point)
-        
-        await session.commit()
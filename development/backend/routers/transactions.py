@@ -1,34 +1,181 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import and_
+from sqlalchemy import select, tuple_
+from config import settings
 from database.connection import Database
 from models.transaction import Transaction
-from typing import Optional
+from services.transaction_export import MEDIA_TYPES, TransactionExporter
+from services.transaction_ingest import TransactionIngestor, parse_payload
+from typing import List, Optional, Tuple
 from datetime import date
+import base64
+import uuid
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Columns a client may request; the keyset columns are always returned
+TRANSACTION_FIELDS = {column.name: column for column in Transaction.__table__.columns}
+KEYSET_FIELDS = ["transaction_date", "id"]
+DEFAULT_FIELDS = [
+    "id", "transaction_date", "bank_account_id", "amount", "currency_code",
+    "transaction_type", "category", "description", "merchant_name"
+]
+
+
+def encode_cursor(transaction_date: date, transaction_id: uuid.UUID) -> str:
+    """Opaque cursor for the position after a row"""
+    raw = f"{transaction_date.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        transaction_date, transaction_id = raw.split("|")
+        return date.fromisoformat(transaction_date), uuid.UUID(transaction_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return DEFAULT_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TRANSACTION_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names + [name for name in KEYSET_FIELDS if name not in names]
+
+
+def listing_query(
+    organization_id,
+    columns: List[str],
+    limit: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    transaction_type: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """Select one page plus a look-ahead row, newest first"""
+    query = (
+        select(*[TRANSACTION_FIELDS[name] for name in columns])
+        .where(Transaction.organization_id == organization_id)
+        .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+        .limit(limit + 1)
+    )
+
+    if start_date:
+        query = query.where(Transaction.transaction_date >= start_date)
+    if end_date:
+        query = query.where(Transaction.transaction_date <= end_date)
+    if transaction_type:
+        query = query.where(Transaction.transaction_type == transaction_type)
+    if cursor:
+        query = query.where(
+            tuple_(Transaction.transaction_date, Transaction.id) < tuple_(*decode_cursor(cursor))
+        )
+    return query
+
+
+def paginate(rows, limit: int) -> dict:
+    """Trim the look-ahead row and point the cursor at the last row kept"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["transaction_date"], rows[-1]["id"])
+    return {"items": [dict(row) for row in rows], "next_cursor": next_cursor}
+
+
 @router.get("/")
 async def get_transactions(
     organization_id: str,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     transaction_type: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
     session: AsyncSession = Depends(Database.get_session)
 ):
-    query = select(Transaction).where(Transaction.organization_id == organization_id)
-    
-    if start_date:
-        query = query.where(Transaction.transaction_date >= start_date)
-    if end_date:
-        query = query.where(Transaction.transaction_date <= end_date)
-    if transaction_type:
-        query = query.where(Transaction.transaction_type == transaction_type)
-    
+    """
+    Newest-first page of an organization's transactions.
+
+    Pages are keyed on (transaction_date, id), so each one is a bounded
+    range scan of idx_transactions_org_date_id however deep the client has
+    paged. Rows hold only the requested columns.
+
+    The response is {"items": [...], "next_cursor": str | null} rather than
+    the bare list this endpoint used to return. Clients keep requesting with
+    cursor=next_cursor until it is null.
+    """
+    query = listing_query(organization_id, parse_fields(fields), limit, start_date,
+                          end_date, transaction_type, cursor)
     result = await session.execute(query)
-    transactions = result.scalars().all()
-    return transactions
+    return paginate(result.mappings().all(), limit)
+
+@router.get("/export")
+async def export_transactions(
+    organization_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|arrow)$"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export"),
+):
+    """Stream the full transaction history as NDJSON, CSV or an Arrow IPC stream"""
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    try:
+        chunks = await TransactionExporter().stream(organization_id, format, start_date, end_date, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    extension = "arrows" if format == "arrow" else format
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions-{organization_id}.{extension}"'}
+    )
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """Request body, refused with 413 once it grows past max_bytes"""
+    too_large = HTTPException(status_code=413, detail=f"Body larger than {max_bytes} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise too_large
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@router.post("/bulk")
+async def bulk_ingest_transactions(
+    organization_id: str,
+    request: Request,
+    batch_size: int = Query(10000, ge=1, le=100000),
+):
+    """
+    Upsert a JSON array, NDJSON or CSV body of transactions (by Content-Type).
+
+    Rows with an external_id replace the stored row with the same
+    external_id and transaction_date. Returns counts per batch, the first
+    rejected rows with their reasons and any batch the database rejected.
+    """
+    body = await read_body(request, settings.INGEST_MAX_BODY_BYTES)
+    try:
+        frame = await run_in_threadpool(
+            parse_payload, body, request.headers.get("content-type", "application/json")
+        )
+        result = await TransactionIngestor(batch_size).ingest(organization_id, frame)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result.to_dict()
 
 @router.post("/")
 async def create_transaction(transaction_data: dict, session: AsyncSession = Depends(Database.get_session)):
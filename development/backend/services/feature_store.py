@@ -0,0 +1,238 @@
+"""
+Daily Cash Flow Feature Store
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from database.connection import Database
+
+logger = logging.getLogger(__name__)
+
+DAILY_FLOWS_QUERY = """
+    SELECT day::date AS day,
+           SUM(total_inflow)::float8 AS total_inflow,
+           SUM(total_outflow)::float8 AS total_outflow
+    FROM daily_cash_flow
+    WHERE organization_id = $1
+      AND day BETWEEN $2 AND $3
+      AND ($4::uuid IS NULL OR bank_account_id = $4)
+    GROUP BY day
+    ORDER BY day
+"""
+
+# Balance at the close of $3: today's balance of the active accounts less
+# the net flow they booked after $3. Read from transactions, since those
+# days may not be materialized in daily_cash_flow yet.
+BALANCE_AT_QUERY = """
+    WITH accounts AS (
+        SELECT id, current_balance
+        FROM bank_accounts
+        WHERE organization_id = $1
+          AND is_active = TRUE
+          AND ($2::uuid IS NULL OR id = $2)
+    )
+    SELECT (
+        (SELECT COALESCE(SUM(current_balance), 0) FROM accounts)
+        - (SELECT COALESCE(SUM(CASE WHEN t.transaction_type = 'income' THEN t.amount
+                                    WHEN t.transaction_type = 'expense' THEN -t.amount
+                                    ELSE 0 END), 0)
+           FROM transactions t
+           WHERE t.organization_id = $1
+             AND t.bank_account_id IN (SELECT id FROM accounts)
+             AND t.transaction_date > $3::date
+             AND t.transaction_date <= CURRENT_DATE)
+    )::float8
+"""
+
+# The same daily sums straight from transactions, for days the aggregate
+# may not have re-materialized since they changed
+TRANSACTION_FLOWS_QUERY = """
+    SELECT transaction_date AS day,
+           SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END)::float8 AS total_inflow,
+           SUM(CASE WHEN transaction_type = 'expense' THEN amount ELSE 0 END)::float8 AS total_outflow
+    FROM transactions
+    WHERE organization_id = $1
+      AND transaction_date BETWEEN $2 AND $3
+      AND ($4::uuid IS NULL OR bank_account_id = $4)
+    GROUP BY transaction_date
+    ORDER BY transaction_date
+"""
+
+# Earliest day with an insert, update or delete since $2 (see the
+# transaction_changes trigger in schema.sql)
+CHANGED_SINCE_QUERY = """
+    SELECT MIN(day)
+    FROM transaction_changes
+    WHERE organization_id = $1 AND changed_at > $2
+"""
+
+
+@dataclass
+class DailySeries:
+    """Gap-filled daily cash flow arrays for one organization (or account)"""
+    date: np.ndarray
+    total_inflow: np.ndarray
+    total_outflow: np.ndarray
+    net_flow: np.ndarray
+    total_balance: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    @property
+    def start(self) -> date:
+        return self.date[0].astype(date) if len(self) else None
+
+    @property
+    def end(self) -> date:
+        return self.date[-1].astype(date) if len(self) else None
+
+    def to_frame(self) -> pd.DataFrame:
+        """Frame in the layout CashFlowForecaster.prepare_data expects"""
+        return pd.DataFrame({
+            'date': self.date,
+            'total_inflow': self.total_inflow,
+            'total_outflow': self.total_outflow,
+            'net_flow': self.net_flow,
+            'total_balance': self.total_balance,
+        }, copy=False)
+
+
+def gap_fill(days: np.ndarray, inflow: np.ndarray, outflow: np.ndarray,
+             start: date, end: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Scatter sparse daily sums onto every day from start to end, zero-filling gaps"""
+    dates = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    full_inflow = np.zeros(len(dates))
+    full_outflow = np.zeros(len(dates))
+    if len(days):
+        index = (days.astype('datetime64[D]') - dates[0]).astype(np.int64)
+        full_inflow[index] = inflow
+        full_outflow[index] = outflow
+    return dates, full_inflow, full_outflow
+
+
+def balance_history(net_flow: np.ndarray, end_balance: float) -> np.ndarray:
+    """
+    End-of-day balances implied by the balance at the close of the last day
+    (BALANCE_AT_QUERY for the series end, not today's balance) and the flows
+    after each day
+    """
+    later_flows = net_flow[::-1].cumsum()[::-1] - net_flow
+    return end_balance - later_flows
+
+
+class DailyFeatureStore:
+    """
+    Loads per-organization daily training data from the daily_cash_flow
+    continuous aggregate.
+
+    Series are kept in memory per (organization, account). A repeat load
+    asks transaction_changes for the earliest day inserted, updated or
+    deleted since the last load and re-reads only the days from there on
+    (never less than `overlap_days`), so building a tenant's training frame
+    touches days, not years of transactions.
+
+    Re-read days come straight from transactions: a changed day may be
+    materialized in the aggregate from before the change, and loads never
+    refresh the aggregate, since a refresh re-materializes every tenant's
+    days. First loads read the aggregate, whose policy re-materializes the
+    last 30 days hourly; changes dated further back need a scheduled
+    refresh() before they show up there.
+    """
+
+    def __init__(self, history_days: Optional[int] = None, overlap_days: int = 3):
+        self.history_days = history_days or settings.ML_TRAINING_DATA_DAYS
+        self.overlap_days = overlap_days
+        self._series: Dict[Tuple[str, Optional[str]], Tuple[DailySeries, datetime]] = {}
+
+    @staticmethod
+    def _pool():
+        if not Database._pool:
+            raise RuntimeError("Database not initialized")
+        return Database._pool
+
+    @staticmethod
+    async def _refresh(conn, start: date, end: date) -> None:
+        # CALL refresh_continuous_aggregate must run outside a transaction block
+        await conn.execute(
+            "CALL refresh_continuous_aggregate('daily_cash_flow', $1::date, $2::date)",
+            start, end + timedelta(days=1)
+        )
+
+    async def refresh(self, start: date, end: date) -> None:
+        """
+        Re-materialize the continuous aggregate for days in [start, end], for
+        all tenants; meant for scheduled jobs after backdated imports
+        """
+        async with self._pool().acquire() as conn:
+            await self._refresh(conn, start, end)
+
+    async def _fetch(self, conn, query: str, organization_id: str, account_id: Optional[str],
+                     start: date, end: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = await conn.fetch(query, organization_id, start, end, account_id)
+        days = np.array([row['day'] for row in rows], dtype='datetime64[D]')
+        inflow = np.fromiter((row['total_inflow'] for row in rows), np.float64, len(rows))
+        outflow = np.fromiter((row['total_outflow'] for row in rows), np.float64, len(rows))
+        return gap_fill(days, inflow, outflow, start, end)
+
+    async def load(self, organization_id: str, account_id: Optional[str] = None,
+                   end: Optional[date] = None) -> DailySeries:
+        """Gap-filled daily series of history_days days ending at `end` (default today)"""
+        end = end or date.today()
+        start = end - timedelta(days=self.history_days - 1)
+        key = (str(organization_id), account_id)
+        cached = self._series.get(key)
+
+        async with self._pool().acquire() as conn:
+            # Database clock, so the next change check is not skewed by this host's
+            loaded_at = await conn.fetchval("SELECT NOW()")
+            series, fetch_from, query = None, start, DAILY_FLOWS_QUERY
+            if cached is not None and cached[0].start <= start:
+                series, last_loaded = cached
+                fetch_from = min(max(series.end - timedelta(days=self.overlap_days - 1), start), end)
+                changed = await conn.fetchval(CHANGED_SINCE_QUERY, organization_id, last_loaded)
+                if changed is not None:
+                    fetch_from = max(min(fetch_from, changed), start)
+                query = TRANSACTION_FLOWS_QUERY
+
+            dates, inflow, outflow = await self._fetch(conn, query, organization_id, account_id,
+                                                       fetch_from, end)
+            end_balance = await conn.fetchval(BALANCE_AT_QUERY, organization_id, account_id, end)
+
+        if series is not None and fetch_from > start:
+            # Keep the unchanged days of the cached series and splice in the re-read ones
+            keep = (series.date >= np.datetime64(start, 'D')) & (series.date < dates[0])
+            dates = np.concatenate([series.date[keep], dates])
+            inflow = np.concatenate([series.total_inflow[keep], inflow])
+            outflow = np.concatenate([series.total_outflow[keep], outflow])
+            logger.info(f"Re-read {len(dates) - keep.sum()} days of cash flow for {organization_id}")
+
+        net_flow = inflow - outflow
+        series = DailySeries(
+            date=dates,
+            total_inflow=inflow,
+            total_outflow=outflow,
+            net_flow=net_flow,
+            total_balance=balance_history(net_flow, end_balance),
+        )
+        self._series[key] = (series, loaded_at)
+        return series
+
+    async def load_frame(self, organization_id: str, account_id: Optional[str] = None,
+                         end: Optional[date] = None) -> pd.DataFrame:
+        return (await self.load(organization_id, account_id, end)).to_frame()
+
+    def invalidate(self, organization_id: Optional[str] = None) -> None:
+        """Drop cached series for one organization, or all of them"""
+        if organization_id is None:
+            self._series.clear()
+            return
+        for key in [key for key in self._series if key[0] == str(organization_id)]:
+            del self._series[key]
@@ -0,0 +1,560 @@
+"""
+Forecast Job Queue and Worker Runner
+
+Forecast generation runs outside the API process: the API enqueues a job
+row, and a runner (`python -m services.forecast_jobs`) claims jobs and
+trains/forecasts in a pool of worker processes.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+import uuid
+import weakref
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from database.connection import Database
+from services.forecast_store import ForecastStore
+from services.training_data import TrainingDataLoader
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+# Claims are serialized with this advisory lock so concurrent runners cannot
+# both see a free slot and overshoot the concurrency limits
+CLAIM_LOCK_KEY = 727001
+
+ENQUEUE_QUERY = """
+    INSERT INTO forecast_jobs (forecast_id, organization_id, parameters, max_attempts)
+    VALUES ($1, $2, $3::jsonb, $4)
+    RETURNING *
+"""
+
+CLAIM_QUERY = """
+    WITH running AS (
+        SELECT organization_id, COUNT(*) AS jobs
+        FROM forecast_jobs
+        WHERE status = 'running'
+        GROUP BY organization_id
+    ), candidate AS (
+        SELECT j.id
+        FROM forecast_jobs j
+        LEFT JOIN running r ON r.organization_id = j.organization_id
+        WHERE j.status = 'queued'
+          AND j.run_after <= NOW()
+          AND COALESCE(r.jobs, 0) < $2
+          AND (SELECT COALESCE(SUM(jobs), 0) FROM running) < $3
+        ORDER BY j.run_after, j.created_at
+        LIMIT 1
+        FOR UPDATE OF j SKIP LOCKED
+    )
+    UPDATE forecast_jobs j
+    SET status = 'running', attempts = j.attempts + 1, locked_by = $1,
+        started_at = NOW(), heartbeat_at = NOW(), progress = 0, stage = 'claimed',
+        updated_at = NOW()
+    FROM candidate
+    WHERE j.id = candidate.id
+    RETURNING j.*
+"""
+
+# Updates to a running job only apply while the runner still owns it: once
+# a job has been requeued as stale and claimed elsewhere, the old runner's
+# late progress, completion or failure is ignored
+PROGRESS_QUERY = """
+    UPDATE forecast_jobs
+    SET progress = $2, stage = $3, heartbeat_at = NOW(), updated_at = NOW()
+    WHERE id = $1 AND status = 'running' AND locked_by = $4
+"""
+
+HEARTBEAT_QUERY = """
+    UPDATE forecast_jobs SET heartbeat_at = NOW()
+    WHERE id = ANY($1::uuid[]) AND status = 'running' AND locked_by = $2
+"""
+
+COMPLETE_QUERY = """
+    UPDATE forecast_jobs
+    SET status = 'succeeded', progress = 1, stage = 'done', error = NULL,
+        finished_at = NOW(), updated_at = NOW()
+    WHERE id = $1 AND status = 'running' AND locked_by = $2
+    RETURNING id
+"""
+
+# Failed attempts are retried with exponential backoff until max_attempts
+FAIL_QUERY = """
+    UPDATE forecast_jobs
+    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END::forecast_job_status,
+        run_after = NOW() + make_interval(secs => $3 * power(2, attempts - 1)),
+        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+        error = $2, locked_by = NULL, updated_at = NOW()
+    WHERE id = $1 AND status = 'running' AND locked_by = $4
+    RETURNING status::text
+"""
+
+# Puts a job back without counting the attempt, for failures that were not its own
+RELEASE_QUERY = """
+    UPDATE forecast_jobs
+    SET status = 'queued', attempts = GREATEST(attempts - 1, 0), run_after = NOW(),
+        error = $2, locked_by = NULL, updated_at = NOW()
+    WHERE id = $1 AND status = 'running' AND locked_by = $3
+    RETURNING status::text
+"""
+
+# Jobs whose runner stopped heartbeating (crashed or killed) count as a failed attempt
+REQUEUE_STALE_QUERY = """
+    UPDATE forecast_jobs
+    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END::forecast_job_status,
+        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+        error = 'worker heartbeat timed out', locked_by = NULL, updated_at = NOW()
+    WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => $1)
+"""
+
+CANCEL_QUERY = """
+    UPDATE forecast_jobs
+    SET status = 'cancelled', finished_at = NOW(), updated_at = NOW()
+    WHERE id = $1 AND status = 'queued'
+"""
+
+
+def _job(record: Any) -> Optional[Dict[str, Any]]:
+    if record is None:
+        return None
+    job = dict(record)
+    if isinstance(job.get("parameters"), str):
+        job["parameters"] = json.loads(job["parameters"])
+    if "status" in job:
+        job["status"] = str(job["status"])
+    return job
+
+
+class PostgresJobQueue:
+    """Durable job queue in the forecast_jobs table, over Database._pool"""
+
+    @staticmethod
+    def _pool():
+        if not Database._pool:
+            raise RuntimeError("Database not initialized")
+        return Database._pool
+
+    async def enqueue(self, organization_id: str, forecast_id: str, parameters: Dict[str, Any],
+                      max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        async with self._pool().acquire() as conn:
+            return _job(await conn.fetchrow(
+                ENQUEUE_QUERY, uuid.UUID(str(forecast_id)), uuid.UUID(str(organization_id)),
+                json.dumps(parameters), max_attempts or settings.FORECAST_JOB_MAX_ATTEMPTS
+            ))
+
+    async def claim(self, worker_id: str, max_per_org: int, max_concurrent: int) -> Optional[Dict[str, Any]]:
+        async with self._pool().acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", CLAIM_LOCK_KEY)
+                return _job(await conn.fetchrow(CLAIM_QUERY, worker_id, max_per_org, max_concurrent))
+
+    async def progress(self, job_id: Any, worker_id: str, progress: float, stage: str) -> None:
+        async with self._pool().acquire() as conn:
+            await conn.execute(PROGRESS_QUERY, job_id, progress, stage, worker_id)
+
+    async def heartbeat(self, job_ids: List[Any], worker_id: str) -> None:
+        if job_ids:
+            async with self._pool().acquire() as conn:
+                await conn.execute(HEARTBEAT_QUERY, job_ids, worker_id)
+
+    async def complete(self, job_id: Any, worker_id: str) -> bool:
+        """Mark an owned job succeeded; False if the runner no longer owns it"""
+        async with self._pool().acquire() as conn:
+            return await conn.fetchval(COMPLETE_QUERY, job_id, worker_id) is not None
+
+    async def fail(self, job_id: Any, worker_id: str, error: str, retry_delay: float) -> Optional[str]:
+        """Retry or fail an owned job; its new status, or None if no longer owned"""
+        async with self._pool().acquire() as conn:
+            return await conn.fetchval(FAIL_QUERY, job_id, error, retry_delay, worker_id)
+
+    async def release(self, job_id: Any, worker_id: str, error: str) -> Optional[str]:
+        """Requeue an owned job without counting the attempt"""
+        async with self._pool().acquire() as conn:
+            return await conn.fetchval(RELEASE_QUERY, job_id, error, worker_id)
+
+    async def requeue_stale(self, timeout: float) -> int:
+        async with self._pool().acquire() as conn:
+            result = await conn.execute(REQUEUE_STALE_QUERY, timeout)
+        return int(result.split()[-1])
+
+    async def cancel(self, job_id: Any) -> bool:
+        async with self._pool().acquire() as conn:
+            result = await conn.execute(CANCEL_QUERY, uuid.UUID(str(job_id)))
+        return result.split()[-1] == "1"
+
+    async def get(self, job_id: Any) -> Optional[Dict[str, Any]]:
+        async with self._pool().acquire() as conn:
+            return _job(await conn.fetchrow(
+                "SELECT * FROM forecast_jobs WHERE id = $1", uuid.UUID(str(job_id))
+            ))
+
+    async def latest_for_forecast(self, forecast_id: Any) -> Optional[Dict[str, Any]]:
+        async with self._pool().acquire() as conn:
+            return _job(await conn.fetchrow(
+                "SELECT * FROM forecast_jobs WHERE forecast_id = $1 ORDER BY created_at DESC LIMIT 1",
+                uuid.UUID(str(forecast_id))
+            ))
+
+
+class InMemoryJobQueue:
+    """
+    In-process stand-in for PostgresJobQueue with the same semantics
+    (limits, retries with backoff, stale requeue), for tests and local runs
+    without a database.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def enqueue(self, organization_id: str, forecast_id: str, parameters: Dict[str, Any],
+                      max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        now = self._now()
+        job = {
+            "id": uuid.uuid4(), "forecast_id": uuid.UUID(str(forecast_id)),
+            "organization_id": uuid.UUID(str(organization_id)), "status": "queued",
+            "parameters": dict(parameters), "progress": 0.0, "stage": None, "attempts": 0,
+            "max_attempts": max_attempts or settings.FORECAST_JOB_MAX_ATTEMPTS,
+            "run_after": now, "locked_by": None, "heartbeat_at": None, "error": None,
+            "created_at": now, "started_at": None, "finished_at": None, "updated_at": now,
+        }
+        self._jobs[str(job["id"])] = job
+        return dict(job)
+
+    async def claim(self, worker_id: str, max_per_org: int, max_concurrent: int) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            now = self._now()
+            running = [job for job in self._jobs.values() if job["status"] == "running"]
+            if len(running) >= max_concurrent:
+                return None
+            per_org: Dict[Any, int] = {}
+            for job in running:
+                per_org[job["organization_id"]] = per_org.get(job["organization_id"], 0) + 1
+            queued = sorted(
+                (job for job in self._jobs.values()
+                 if job["status"] == "queued" and job["run_after"] <= now
+                 and per_org.get(job["organization_id"], 0) < max_per_org),
+                key=lambda job: (job["run_after"], job["created_at"])
+            )
+            if not queued:
+                return None
+            job = queued[0]
+            job.update(status="running", attempts=job["attempts"] + 1, locked_by=worker_id,
+                       started_at=now, heartbeat_at=now, progress=0.0, stage="claimed", updated_at=now)
+            return dict(job)
+
+    def _owned(self, job_id: Any, worker_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(str(job_id))
+        if job is None or job["status"] != "running" or job["locked_by"] != worker_id:
+            return None
+        return job
+
+    async def progress(self, job_id: Any, worker_id: str, progress: float, stage: str) -> None:
+        job = self._owned(job_id, worker_id)
+        if job is not None:
+            job.update(progress=progress, stage=stage, heartbeat_at=self._now(), updated_at=self._now())
+
+    async def heartbeat(self, job_ids: List[Any], worker_id: str) -> None:
+        for job_id in job_ids:
+            job = self._owned(job_id, worker_id)
+            if job is not None:
+                job["heartbeat_at"] = self._now()
+
+    async def complete(self, job_id: Any, worker_id: str) -> bool:
+        job = self._owned(job_id, worker_id)
+        if job is None:
+            return False
+        job.update(status="succeeded", progress=1.0, stage="done", error=None,
+                   finished_at=self._now(), updated_at=self._now())
+        return True
+
+    def _retry_or_fail(self, job: Dict[str, Any], error: str, retry_delay: float) -> str:
+        now = self._now()
+        if job["attempts"] < job["max_attempts"]:
+            job.update(status="queued", finished_at=None,
+                       run_after=now + timedelta(seconds=retry_delay * 2 ** (job["attempts"] - 1)))
+        else:
+            job.update(status="failed", finished_at=now)
+        job.update(error=error, locked_by=None, updated_at=now)
+        return job["status"]
+
+    async def fail(self, job_id: Any, worker_id: str, error: str, retry_delay: float) -> Optional[str]:
+        job = self._owned(job_id, worker_id)
+        return self._retry_or_fail(job, error, retry_delay) if job is not None else None
+
+    async def release(self, job_id: Any, worker_id: str, error: str) -> Optional[str]:
+        job = self._owned(job_id, worker_id)
+        if job is None:
+            return None
+        job.update(status="queued", attempts=max(job["attempts"] - 1, 0), run_after=self._now(),
+                   error=error, locked_by=None, updated_at=self._now())
+        return job["status"]
+
+    async def requeue_stale(self, timeout: float) -> int:
+        cutoff = self._now() - timedelta(seconds=timeout)
+        stale = [job for job in self._jobs.values()
+                 if job["status"] == "running" and job["heartbeat_at"] < cutoff]
+        for job in stale:
+            self._retry_or_fail(job, "worker heartbeat timed out", 0.0)
+        return len(stale)
+
+    async def cancel(self, job_id: Any) -> bool:
+        job = self._jobs.get(str(job_id))
+        if job is None or job["status"] != "queued":
+            return False
+        job.update(status="cancelled", finished_at=self._now(), updated_at=self._now())
+        return True
+
+    async def get(self, job_id: Any) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(str(job_id))
+        return dict(job) if job is not None else None
+
+    async def latest_for_forecast(self, forecast_id: Any) -> Optional[Dict[str, Any]]:
+        jobs = [job for job in self._jobs.values() if str(job["forecast_id"]) == str(forecast_id)]
+        return dict(max(jobs, key=lambda job: job["created_at"])) if jobs else None
+
+
+_job_queue = None
+
+
+def get_job_queue():
+    """FastAPI dependency for the job queue; override it to use InMemoryJobQueue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = PostgresJobQueue()
+    return _job_queue
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """API view of a job"""
+    def iso(value: Any) -> Optional[str]:
+        return value.isoformat() if value is not None else None
+
+    return {
+        "job_id": str(job["id"]),
+        "forecast_id": str(job["forecast_id"]),
+        "status": job["status"],
+        "progress": float(job["progress"] or 0.0),
+        "stage": job["stage"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "error": job["error"],
+        "created_at": iso(job["created_at"]),
+        "started_at": iso(job["started_at"]),
+        "finished_at": iso(job["finished_at"]),
+    }
+
+
+class _PoolLost(Exception):
+    """A job's worker pool broke because of another job"""
+
+
+def _init_worker(engine_path: str) -> None:
+    if engine_path not in sys.path:
+        sys.path.insert(0, engine_path)
+
+
+def run_forecast(frame: Any, organization_id: str, forecast_days: int,
+                 confidence_level: float, model_config: Optional[Dict] = None) -> Any:
+    """Worker process entry point: train (or load) the org's ensemble and forecast"""
+    from forecasting_engine import CashFlowForecaster
+    from model_registry import ModelRegistry
+
+    forecaster = CashFlowForecaster(model_config, registry=ModelRegistry(settings.ML_MODEL_PATH))
+    return forecaster.forecast(frame, forecast_days, confidence_level,
+                               organization_id=organization_id)
+
+
+class ForecastJobRunner:
+    """
+    Claims forecast jobs and runs them in a pool of worker processes.
+
+    Data loading and persistence run on this process's event loop; model
+    training and forecasting run in the pool. At most `workers` jobs run
+    here at once, and claims respect the per-organization and global
+    limits across every runner sharing the queue. Running jobs are
+    heartbeated each poll; jobs of a runner that died are requeued by the
+    others after job_timeout seconds. Failed jobs are retried with
+    exponential backoff up to their max_attempts.
+
+    A job whose training exceeds execution_timeout fails, and the pool is
+    recycled to stop its hung worker. When the pool breaks (a worker was
+    killed, e.g. by the OOM killer) it is replaced for later jobs; the jobs
+    it took down are requeued without using an attempt, unless the job was
+    alone in the pool or keeps being there when pools break.
+    """
+
+    def __init__(self, queue: Any = None, workers: Optional[int] = None,
+                 max_per_org: Optional[int] = None, max_concurrent: Optional[int] = None,
+                 executor: Optional[Executor] = None, poll_interval: float = 1.0,
+                 job_timeout: Optional[float] = None, execution_timeout: Optional[float] = None,
+                 retry_delay: float = 30.0, model_config: Optional[Dict] = None):
+        self.queue = queue or get_job_queue()
+        self.workers = workers or settings.FORECAST_WORKERS
+        self.max_per_org = max_per_org or settings.FORECAST_MAX_JOBS_PER_ORG
+        self.max_concurrent = max_concurrent or settings.FORECAST_MAX_CONCURRENT_JOBS
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout or settings.FORECAST_JOB_TIMEOUT
+        self.execution_timeout = execution_timeout or settings.FORECAST_JOB_EXECUTION_TIMEOUT
+        self.retry_delay = retry_delay
+        self.model_config = model_config
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.loader = TrainingDataLoader()
+        self.store = ForecastStore()
+        self._executor = executor
+        self._running: Dict[asyncio.Task, Any] = {}
+        # Jobs currently in each executor, and per broken executor the jobs
+        # it held when it broke plus the job known to have caused it
+        self._in_pool: Dict[Any, Executor] = {}
+        self._broken = weakref.WeakKeyDictionary()
+        self._pool_crashes: Dict[Any, int] = {}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            _init_worker(settings.ML_ENGINE_PATH)
+            # forkserver: workers never inherit this process's event loop or connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=get_context("forkserver"),
+                initializer=_init_worker, initargs=(settings.ML_ENGINE_PATH,)
+            )
+        return self._executor
+
+    def _retire_executor(self, executor: Executor, culprit: Any = None,
+                         terminate: bool = False) -> Tuple[Set[Any], Any]:
+        """
+        Drop a broken (or hung) executor so the next job gets a new one;
+        returns the jobs it held and the job that caused it, if known.
+        """
+        if executor not in self._broken:
+            jobs = {job_id for job_id, pool in self._in_pool.items() if pool is executor}
+            self._broken[executor] = (jobs, culprit)
+            if self._executor is executor:
+                self._executor = None
+            if terminate:
+                for process in list(getattr(executor, "_processes", {}).values()):
+                    process.terminate()
+            # Jobs still queued in it fail with BrokenExecutor rather than being cancelled
+            executor.shutdown(wait=False)
+            logger.warning(f"Replacing forecast worker pool ({len(jobs)} jobs in flight)")
+        return self._broken[executor]
+
+    async def _train(self, job: Dict[str, Any], frame: Any) -> Any:
+        job_id, parameters = job["id"], job["parameters"] or {}
+        executor = self._get_executor()
+        self._in_pool[job_id] = executor
+        try:
+            return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(
+                executor, run_forecast, frame, str(job["organization_id"]),
+                int(parameters.get("forecast_days", 30)),
+                float(parameters.get("confidence_level", 0.95)), self.model_config
+            ), self.execution_timeout)
+        except asyncio.TimeoutError:
+            # The worker keeps running a hung task, so the pool has to go
+            self._retire_executor(executor, culprit=job_id, terminate=True)
+            raise TimeoutError(f"training exceeded {self.execution_timeout:g}s")
+        except BrokenExecutor as e:
+            jobs, culprit = self._retire_executor(executor)
+            crashes = self._pool_crashes[job_id] = self._pool_crashes.get(job_id, 0) + 1
+            innocent = culprit is not None or len(jobs) > 1
+            if culprit != job_id and innocent and crashes < job["max_attempts"]:
+                raise _PoolLost(str(e) or "worker pool broke") from e
+            raise
+        finally:
+            self._in_pool.pop(job_id, None)
+
+    async def execute(self, job: Dict[str, Any]) -> Optional[str]:
+        """
+        Run one claimed job to completion; returns its resulting status, or
+        None if another runner took the job over meanwhile.
+        """
+        job_id, worker_id = job["id"], self.worker_id
+        organization_id = str(job["organization_id"])
+        try:
+            await self.queue.progress(job_id, worker_id, 0.05, "loading_data")
+            series = await self.loader.load(organization_id)
+
+            await self.queue.progress(job_id, worker_id, 0.2, "training")
+            result = await self._train(job, series.to_frame())
+
+            await self.queue.progress(job_id, worker_id, 0.9, "saving")
+            starting_balance = float(series.total_balance[-1]) if len(series) else 0.0
+            await self.store.save(job["forecast_id"], result, starting_balance)
+            if not await self.queue.complete(job_id, worker_id):
+                logger.warning(f"Forecast job {job_id} was taken over before it completed here")
+                return None
+            self._pool_crashes.pop(job_id, None)
+            logger.info(f"Forecast job {job_id} for {organization_id} succeeded")
+            return "succeeded"
+        except _PoolLost as e:
+            status = await self.queue.release(job_id, worker_id, f"worker pool broke: {str(e)}")
+            logger.warning(f"Forecast job {job_id} for {organization_id} requeued: worker pool broke")
+            return status
+        except Exception as e:
+            status = await self.queue.fail(job_id, worker_id, f"{type(e).__name__}: {str(e)}",
+                                           self.retry_delay)
+            logger.error(f"Forecast job {job_id} for {organization_id} failed ({status}): {str(e)}")
+            return status
+
+    async def run_once(self) -> int:
+        """Claim jobs into free slots; returns how many were started"""
+        started = 0
+        while len(self._running) < self.workers:
+            job = await self.queue.claim(self.worker_id, self.max_per_org, self.max_concurrent)
+            if job is None:
+                break
+            task = asyncio.create_task(self.execute(job))
+            self._running[task] = job["id"]
+            started += 1
+        return started
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Poll for jobs until stop is set, then wait for running jobs"""
+        stop = stop or asyncio.Event()
+        logger.info(f"Forecast runner {self.worker_id} started with {self.workers} workers")
+        try:
+            while not stop.is_set():
+                await self.queue.requeue_stale(self.job_timeout)
+                await self.run_once()
+                await self.queue.heartbeat(list(self._running.values()), self.worker_id)
+
+                waits: Set[asyncio.Future] = set(self._running)
+                waits.add(asyncio.ensure_future(stop.wait()))
+                done, _ = await asyncio.wait(waits, timeout=self.poll_interval,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._running.pop(task, None)
+                for waiter in waits - set(self._running) - done:
+                    waiter.cancel()
+
+            if self._running:
+                await asyncio.gather(*self._running)
+        finally:
+            self._running.clear()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def main() -> None:
+    await Database.connect()
+    try:
+        await ForecastJobRunner().run()
+    finally:
+        await Database.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    asyncio.run(main())
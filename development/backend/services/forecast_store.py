@@ -0,0 +1,130 @@
+"""
+Bulk Forecast Persistence
+"""
+
+import logging
+import uuid
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from database.connection import Database
+
+logger = logging.getLogger(__name__)
+
+# Replaces every point of the given forecasts in one statement: the old
+# points are deleted, the new ones inserted from parallel arrays and the
+# forecasts activated, so readers see either the old or the new set. The
+# insert waits on the delete through its WHERE clause, and the
+# (forecast_id, date) key makes a concurrent writer to the same forecast
+# update these rows rather than add a second set.
+REPLACE_POINTS_QUERY = """
+    WITH deleted AS (
+        DELETE FROM forecast_data_points WHERE forecast_id = ANY($1::uuid[])
+        RETURNING 1
+    ), inserted AS (
+        INSERT INTO forecast_data_points AS d (
+            forecast_id, date, predicted_inflow, predicted_outflow, predicted_balance,
+            confidence_score, model_features
+        )
+        SELECT p.forecast_id, p.date, p.inflow, p.outflow, p.balance, p.confidence,
+               CASE WHEN p.lower IS NULL THEN '{}'::jsonb
+                    ELSE jsonb_build_object('lower', p.lower, 'upper', p.upper) END
+        FROM unnest($2::uuid[], $3::date[], $4::float8[], $5::float8[], $6::float8[],
+                    $7::float8[], $8::float8[], $9::float8[])
+             AS p(forecast_id, date, inflow, outflow, balance, confidence, lower, upper)
+        WHERE (SELECT COUNT(*) FROM deleted) >= 0
+        ON CONFLICT (forecast_id, date) DO UPDATE SET
+            predicted_inflow = EXCLUDED.predicted_inflow,
+            predicted_outflow = EXCLUDED.predicted_outflow,
+            predicted_balance = EXCLUDED.predicted_balance,
+            confidence_score = EXCLUDED.confidence_score,
+            model_features = EXCLUDED.model_features
+        RETURNING 1
+    ), activated AS (
+        UPDATE forecasts f
+        SET status = 'active', model_version = v.model_version
+        FROM unnest($1::uuid[], $10::text[]) AS v(id, model_version)
+        WHERE f.id = v.id
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM inserted) AS inserted,
+           (SELECT COUNT(*) FROM deleted) AS deleted,
+           (SELECT COUNT(*) FROM activated) AS activated
+"""
+
+
+def point_columns(result: Any, starting_balance: float) -> Dict[str, np.ndarray]:
+    """
+    Data point columns of one ForecastResult: the predicted net flow split
+    into inflow/outflow, the running balance from starting_balance, and the
+    confidence interval bounds (NaN when the result has none).
+    """
+    predictions = np.asarray(result.predictions, dtype=np.float64)
+    n_points = len(predictions)
+    if result.confidence_intervals is not None:
+        intervals = np.asarray(result.confidence_intervals, dtype=np.float64).reshape(n_points, 2)
+    else:
+        intervals = np.full((n_points, 2), np.nan)
+
+    return {
+        "date": np.asarray(result.forecast_dates, dtype="datetime64[D]"),
+        "inflow": np.maximum(predictions, 0.0),
+        "outflow": np.maximum(-predictions, 0.0),
+        "balance": starting_balance + np.cumsum(predictions),
+        "confidence": np.full(n_points, float(result.confidence_score)),
+        "lower": intervals[:, 0],
+        "upper": intervals[:, 1],
+    }
+
+
+def _nullable(values: np.ndarray) -> list:
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+class ForecastStore:
+    """
+    Writes forecast results over Database._pool.
+
+    Results go straight from their NumPy arrays into array parameters of
+    REPLACE_POINTS_QUERY, so any number of forecasts and points are stored
+    in one statement and one round trip, with no per-row objects.
+    """
+
+    @staticmethod
+    def _pool():
+        if not Database._pool:
+            raise RuntimeError("Database not initialized")
+        return Database._pool
+
+    async def replace(self, results: Mapping[Any, Tuple[Any, float]]) -> Dict[str, int]:
+        """
+        Replace the points of each forecast id in results, given as
+        (ForecastResult, starting balance), and mark the forecasts active.
+        """
+        forecast_ids = [uuid.UUID(str(forecast_id)) for forecast_id in results]
+        columns = [point_columns(result, starting_balance)
+                   for result, starting_balance in results.values()]
+        model_versions = [result.model_type.value for result, _ in results.values()]
+
+        def concat(name: str) -> np.ndarray:
+            return np.concatenate([column[name] for column in columns]) if columns else np.empty(0)
+
+        point_ids = np.repeat(np.asarray(forecast_ids, dtype=object),
+                              [len(column["date"]) for column in columns])
+        async with self._pool().acquire() as conn:
+            counts = await conn.fetchrow(
+                REPLACE_POINTS_QUERY, forecast_ids, point_ids.tolist(),
+                concat("date").astype("datetime64[D]").astype(object).tolist(),
+                concat("inflow").tolist(), concat("outflow").tolist(), concat("balance").tolist(),
+                concat("confidence").tolist(), _nullable(concat("lower")),
+                _nullable(concat("upper")), model_versions
+            )
+
+        logger.info(f"Stored {counts['inserted']} points for {len(forecast_ids)} forecasts "
+                    f"(replaced {counts['deleted']})")
+        return dict(counts)
+
+    async def save(self, forecast_id: Any, result: Any, starting_balance: float) -> Dict[str, int]:
+        """Replace one forecast's points with result"""
+        return await self.replace({forecast_id: (result, starting_balance)})
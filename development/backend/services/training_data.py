@@ -0,0 +1,244 @@
+"""
+Bulk Training Data Loader
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from database.connection import Database
+from services.feature_store import BALANCE_AT_QUERY, DailySeries, balance_history
+
+logger = logging.getLogger(__name__)
+
+# Postgres binary COPY framing
+COPY_SIGNATURE = b'PGCOPY\n\377\r\n\0'
+COPY_HEADER_SIZE = len(COPY_SIGNATURE) + 8
+COPY_TRAILER = b'\xff\xff'
+POSTGRES_EPOCH = np.datetime64('2000-01-01', 'D')
+
+# Wire format of the fixed-width column types the loaders request
+COPY_FIELD_TYPES = {'date': '>i4', 'int4': '>i4', 'float8': '>f8'}
+
+GRANULARITIES = {'day': '1 day', 'week': '1 week', 'month': '1 month'}
+
+# Aggregation and gap filling run in Postgres; every output column is NOT NULL
+# and fixed-width so the binary COPY of the result decodes straight into a
+# NumPy record array (asyncpg wraps these in COPY (...) TO STDOUT)
+AGGREGATED_FLOWS_QUERY = """
+    SELECT p.period::date AS period,
+           COALESCE(f.total_inflow, 0)::float8 AS total_inflow,
+           COALESCE(f.total_outflow, 0)::float8 AS total_outflow
+    FROM generate_series(
+        date_trunc('{unit}', $2::date::timestamp), date_trunc('{unit}', $3::date::timestamp),
+        INTERVAL '{step}'
+    ) AS p(period)
+    LEFT JOIN (
+        SELECT date_trunc('{unit}', transaction_date::timestamp) AS period,
+               SUM(amount) FILTER (WHERE transaction_type = 'income') AS total_inflow,
+               SUM(amount) FILTER (WHERE transaction_type = 'expense') AS total_outflow
+        FROM transactions
+        WHERE organization_id = $1
+          AND transaction_date BETWEEN $2 AND $3
+        GROUP BY 1
+    ) f ON f.period = p.period
+    ORDER BY p.period
+"""
+
+PANEL_FLOWS_QUERY = """
+    SELECT o.idx::int4 AS org_index,
+           p.period::date AS period,
+           COALESCE(f.total_inflow, 0)::float8 AS total_inflow,
+           COALESCE(f.total_outflow, 0)::float8 AS total_outflow
+    FROM unnest($1::uuid[]) WITH ORDINALITY AS o(organization_id, idx)
+    CROSS JOIN generate_series($2::date::timestamp, $3::date::timestamp, INTERVAL '1 day') AS p(period)
+    LEFT JOIN (
+        SELECT organization_id, transaction_date::timestamp AS period,
+               SUM(amount) FILTER (WHERE transaction_type = 'income') AS total_inflow,
+               SUM(amount) FILTER (WHERE transaction_type = 'expense') AS total_outflow
+        FROM transactions
+        WHERE organization_id = ANY($1::uuid[])
+          AND transaction_date BETWEEN $2 AND $3
+        GROUP BY 1, 2
+    ) f ON f.organization_id = o.organization_id AND f.period = p.period
+    ORDER BY o.idx, p.period
+"""
+
+# Per-organization balance at the close of $2, as in BALANCE_AT_QUERY
+PANEL_BALANCES_QUERY = """
+    SELECT COALESCE(array_agg(b.balance - f.later_flow ORDER BY o.idx), '{}')::float8[]
+    FROM unnest($1::uuid[]) WITH ORDINALITY AS o(organization_id, idx)
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(SUM(current_balance), 0) AS balance
+        FROM bank_accounts
+        WHERE organization_id = o.organization_id AND is_active = TRUE
+    ) b
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(SUM(CASE WHEN t.transaction_type = 'income' THEN t.amount
+                                 WHEN t.transaction_type = 'expense' THEN -t.amount
+                                 ELSE 0 END), 0) AS later_flow
+        FROM transactions t
+        JOIN bank_accounts a ON a.id = t.bank_account_id AND a.is_active = TRUE
+        WHERE t.organization_id = o.organization_id
+          AND t.transaction_date > $2::date
+          AND t.transaction_date <= CURRENT_DATE
+    ) f
+"""
+
+
+def copy_row_dtype(fields: Sequence[Tuple[str, str]]) -> np.dtype:
+    """
+    Record layout of one binary COPY tuple with fixed-width, non-null fields:
+    an int16 field count, then an int32 length before each big-endian value.
+    """
+    layout = [('field_count', '>i2')]
+    for name, pg_type in fields:
+        layout += [(f'{name}_length', '>i4'), (name, COPY_FIELD_TYPES[pg_type])]
+    return np.dtype(layout)
+
+
+class BinaryCopyDecoder:
+    """
+    Incremental decoder for a binary COPY stream of fixed-width rows.
+
+    Chunks are decoded as they arrive, so peak memory is the decoded
+    columns plus one chunk, and no Python object is created per row.
+    """
+
+    def __init__(self, fields: Sequence[Tuple[str, str]]):
+        self.fields = list(fields)
+        self.dtype = copy_row_dtype(fields)
+        self._pending = b''
+        self._header_seen = False
+        self._blocks: List[np.ndarray] = []
+
+    def feed(self, chunk: bytes) -> None:
+        data = self._pending + bytes(chunk)
+        if not self._header_seen:
+            if len(data) >= len(COPY_SIGNATURE) and not data.startswith(COPY_SIGNATURE):
+                raise ValueError("Not a binary COPY stream")
+            extension = int.from_bytes(data[COPY_HEADER_SIZE - 4:COPY_HEADER_SIZE], 'big')
+            # Wait for the whole header, including its extension area
+            if len(data) < COPY_HEADER_SIZE + extension:
+                self._pending = data
+                return
+            data = data[COPY_HEADER_SIZE + extension:]
+            self._header_seen = True
+
+        n_rows = len(data) // self.dtype.itemsize
+        if n_rows:
+            self._blocks.append(np.frombuffer(data, self.dtype, count=n_rows).copy())
+        self._pending = data[n_rows * self.dtype.itemsize:]
+
+    async def __call__(self, chunk: bytes) -> None:
+        # asyncpg copy output sink
+        self.feed(chunk)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Decoded columns in native byte order"""
+        if self._pending not in (b'', COPY_TRAILER):
+            raise ValueError("Truncated binary COPY stream")
+        rows = np.concatenate(self._blocks) if self._blocks else np.empty(0, self.dtype)
+        if len(rows) and not (rows['field_count'] == len(self.fields)).all():
+            raise ValueError("Unexpected field count in binary COPY stream")
+
+        columns = {}
+        for name, pg_type in self.fields:
+            values = rows[name].astype(np.dtype(COPY_FIELD_TYPES[pg_type]).newbyteorder('='))
+            if pg_type == 'date':
+                # Days since the Postgres epoch
+                values = POSTGRES_EPOCH + values.astype('timedelta64[D]')
+            columns[name] = values
+        return columns
+
+
+class TrainingDataLoader:
+    """
+    Loads forecaster training data over Database._pool (asyncpg).
+
+    Daily (or weekly/monthly) bucketing, gap filling with generate_series
+    and the income/expense split all run in Postgres, and the result is
+    streamed as a binary COPY into NumPy columns.
+    """
+
+    def __init__(self, history_days: Optional[int] = None):
+        self.history_days = history_days or settings.ML_TRAINING_DATA_DAYS
+
+    @staticmethod
+    def _pool():
+        if not Database._pool:
+            raise RuntimeError("Database not initialized")
+        return Database._pool
+
+    def _range(self, start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+        end = end or date.today()
+        return start or end - timedelta(days=self.history_days - 1), end
+
+    async def load(self, organization_id: str, start: Optional[date] = None,
+                   end: Optional[date] = None, granularity: str = 'day') -> DailySeries:
+        """One organization's gap-filled cash flow series"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        start, end = self._range(start, end)
+        query = AGGREGATED_FLOWS_QUERY.format(unit=granularity, step=GRANULARITIES[granularity])
+        decoder = BinaryCopyDecoder([('period', 'date'), ('total_inflow', 'float8'),
+                                     ('total_outflow', 'float8')])
+
+        async with self._pool().acquire() as conn:
+            await conn.copy_from_query(query, organization_id, start, end,
+                                       output=decoder, format='binary')
+            end_balance = await conn.fetchval(BALANCE_AT_QUERY, organization_id, None, end)
+
+        columns = decoder.columns()
+        net_flow = columns['total_inflow'] - columns['total_outflow']
+        logger.info(f"Loaded {len(net_flow)} {granularity}s of cash flow for {organization_id}")
+        return DailySeries(
+            date=columns['period'],
+            total_inflow=columns['total_inflow'],
+            total_outflow=columns['total_outflow'],
+            net_flow=net_flow,
+            total_balance=balance_history(net_flow, end_balance),
+        )
+
+    async def load_panel(self, organization_ids: Sequence[str], start: Optional[date] = None,
+                         end: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """
+        Daily series for many organizations in one round trip, as long-format
+        columns (organization_id, date, flows, balance) for PanelForecaster.
+        """
+        start, end = self._range(start, end)
+        organization_ids = [str(org) for org in organization_ids]
+        decoder = BinaryCopyDecoder([('org_index', 'int4'), ('period', 'date'),
+                                     ('total_inflow', 'float8'), ('total_outflow', 'float8')])
+
+        async with self._pool().acquire() as conn:
+            await conn.copy_from_query(PANEL_FLOWS_QUERY, organization_ids, start, end,
+                                       output=decoder, format='binary')
+            balances = np.asarray(await conn.fetchval(PANEL_BALANCES_QUERY, organization_ids, end),
+                                  dtype=np.float64)
+
+        columns = decoder.columns()
+        net_flow = columns['total_inflow'] - columns['total_outflow']
+        # Rows are ordered by organization then day, each org a contiguous block
+        org_index = columns['org_index'] - 1
+        n_days = (end - start).days + 1
+        later_flows = net_flow.reshape(-1, n_days)
+        later_flows = later_flows[:, ::-1].cumsum(axis=1)[:, ::-1] - later_flows
+
+        return {
+            'organization_id': np.asarray(organization_ids, dtype=object)[org_index],
+            'date': columns['period'],
+            'total_inflow': columns['total_inflow'],
+            'total_outflow': columns['total_outflow'],
+            'net_flow': net_flow,
+            'total_balance': (balances[:, np.newaxis] - later_flows).ravel(),
+        }
+
+    @staticmethod
+    def to_arrow(columns: Dict[str, np.ndarray]):
+        """Arrow table of loaded columns; numeric columns are not copied (needs pyarrow)"""
+        import pyarrow as pa
+        return pa.table({name: pa.array(values) for name, values in columns.items()})
@@ -0,0 +1,221 @@
+"""
+Streaming Transaction Export
+"""
+
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from database.connection import Database
+
+logger = logging.getLogger(__name__)
+
+# Exportable columns: SQL expression and Arrow type name
+EXPORT_COLUMNS: Dict[str, Any] = {
+    "id": ("id::text", "string"),
+    "bank_account_id": ("bank_account_id::text", "string"),
+    "external_id": ("external_id", "string"),
+    "transaction_date": ("transaction_date", "date32"),
+    "posted_date": ("posted_date", "date32"),
+    "amount": ("amount", "decimal"),
+    "currency_code": ("currency_code::text", "string"),
+    "transaction_type": ("transaction_type::text", "string"),
+    "category": ("category", "string"),
+    "subcategory": ("subcategory", "string"),
+    "description": ("description", "string"),
+    "merchant_name": ("merchant_name", "string"),
+    "reference_number": ("reference_number", "string"),
+    "is_recurring": ("is_recurring", "bool"),
+    "tags": ("array_to_string(tags, ',')", "string"),
+    "metadata": ("metadata::text", "string"),
+    "created_at": ("created_at", "timestamp"),
+    "updated_at": ("updated_at", "timestamp"),
+}
+DEFAULT_EXPORT_COLUMNS = [
+    "id", "transaction_date", "bank_account_id", "amount", "currency_code",
+    "transaction_type", "category", "description", "merchant_name"
+]
+
+EXPORT_QUERY = """
+    SELECT {columns}
+    FROM transactions
+    WHERE organization_id = $1
+      AND ($2::date IS NULL OR transaction_date >= $2)
+      AND ($3::date IS NULL OR transaction_date <= $3)
+    ORDER BY transaction_date, id
+"""
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands accumulated bytes back on demand"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, records: Sequence[Any]) -> bytes:
+        lines = [json.dumps(dict(record), default=_json_default) for record in records]
+        return ("\n".join(lines) + "\n").encode()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class CsvEncoder:
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+
+    def _rows(self, rows: Any) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def header(self) -> bytes:
+        return self._rows([self.columns])
+
+    def encode(self, records: Sequence[Any]) -> bytes:
+        return self._rows(tuple(record.values()) for record in records)
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class ArrowEncoder:
+    """Arrow IPC stream: the schema message, then one record batch per chunk"""
+
+    def __init__(self, columns: List[str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Arrow export needs pyarrow; install it with `pip install pyarrow`") from e
+        self.pa = pa
+        types = {
+            "string": pa.string(), "date32": pa.date32(), "decimal": pa.decimal128(15, 2),
+            "bool": pa.bool_(), "timestamp": pa.timestamp("us", tz="UTC"),
+        }
+        self.schema = pa.schema([(name, types[EXPORT_COLUMNS[name][1]]) for name in columns])
+        self._sink = _ChunkSink()
+        self._writer = None
+
+    def header(self) -> bytes:
+        self._writer = self.pa.ipc.new_stream(self._sink, self.schema)
+        return self._sink.take()
+
+    def encode(self, records: Sequence[Any]) -> bytes:
+        columns = zip(*(tuple(record.values()) for record in records))
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+        self._writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self._sink.take()
+
+    def footer(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
+
+
+class TransactionExporter:
+    """
+    Streams an organization's transactions from a server-side cursor.
+
+    Rows are fetched chunk_size at a time (the first chunk smaller, so the
+    first rows go out at once) and encoded chunk by chunk. The generator
+    only fetches the next chunk once the previous one has been sent, so
+    memory stays at about one chunk whatever the export size. The pooled
+    connection is held for the whole export, inside one read-only
+    transaction so the export is a consistent snapshot.
+    """
+
+    def __init__(self, chunk_size: int = 5000, first_chunk_size: int = 500):
+        self.chunk_size = chunk_size
+        self.first_chunk_size = first_chunk_size
+
+    @staticmethod
+    def columns(fields: Optional[Sequence[str]]) -> List[str]:
+        columns = list(fields) if fields else DEFAULT_EXPORT_COLUMNS
+        unknown = [name for name in columns if name not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown export fields: {', '.join(unknown)}")
+        return columns
+
+    @staticmethod
+    def encoder(export_format: str, columns: List[str]) -> Any:
+        if export_format == "ndjson":
+            return NdjsonEncoder()
+        elif export_format == "csv":
+            return CsvEncoder(columns)
+        elif export_format == "arrow":
+            return ArrowEncoder(columns)
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    async def stream(self, organization_id: str, export_format: str = "ndjson",
+                     start_date: Optional[date] = None, end_date: Optional[date] = None,
+                     fields: Optional[Sequence[str]] = None) -> AsyncIterator[bytes]:
+        """Iterator of encoded chunks; fields and format are checked before the response starts"""
+        columns = self.columns(fields)
+        encoder = self.encoder(export_format, columns)
+        query = EXPORT_QUERY.format(
+            columns=", ".join(f"{EXPORT_COLUMNS[name][0]} AS {name}" for name in columns)
+        )
+        return self._generate(query, encoder, organization_id, start_date, end_date)
+
+    async def _generate(self, query: str, encoder: Any, organization_id: str,
+                        start_date: Optional[date], end_date: Optional[date]) -> AsyncIterator[bytes]:
+        header = encoder.header()
+        if header:
+            yield header
+
+        if not Database._pool:
+            raise RuntimeError("Database not initialized")
+
+        exported = 0
+        async with Database._pool.acquire() as conn:
+            async with conn.transaction(readonly=True, isolation="repeatable_read"):
+                cursor = await conn.cursor(query, organization_id, start_date, end_date)
+                size = self.first_chunk_size
+                while True:
+                    records = await cursor.fetch(size)
+                    if not records:
+                        break
+                    exported += len(records)
+                    yield encoder.encode(records)
+                    size = self.chunk_size
+
+        footer = encoder.footer()
+        if footer:
+            yield footer
+        logger.info(f"Exported {exported} transactions for {organization_id}")
@@ -0,0 +1,297 @@
+"""
+Bulk Transaction Ingest
+"""
+
+import asyncio
+import io
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+import numpy as np
+import pandas as pd
+
+from database.connection import Database
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_TYPES = ("income", "expense", "transfer")
+REQUIRED_COLUMNS = ["transaction_date", "amount", "transaction_type"]
+TEXT_COLUMNS = {
+    "external_id": 255, "currency_code": 3, "category": 100, "subcategory": 100,
+    "description": None, "merchant_name": 255, "reference_number": 100,
+}
+# Staging column order, as sent to COPY
+STAGING_COLUMNS = [
+    "external_id", "bank_account_id", "transaction_date", "posted_date", "amount",
+    "currency_code", "transaction_type", "category", "subcategory", "description",
+    "merchant_name", "reference_number",
+]
+UUID_PATTERN = r"[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}"
+MAX_AMOUNT = 1e13
+MAX_REPORTED_ERRORS = 100
+
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE transactions_staging (
+        external_id TEXT,
+        bank_account_id TEXT,
+        transaction_date DATE NOT NULL,
+        posted_date DATE,
+        amount FLOAT8 NOT NULL,
+        currency_code TEXT,
+        transaction_type TEXT NOT NULL,
+        category TEXT,
+        subcategory TEXT,
+        description TEXT,
+        merchant_name TEXT,
+        reference_number TEXT
+    ) ON COMMIT DROP
+"""
+
+# Rows with an external_id replace the existing row for it (the unique key
+# must include transaction_date, the hypertable's partitioning column);
+# identical rows are left untouched so re-syncs do not rewrite them
+UPSERT_QUERY = """
+    WITH upserted AS (
+        INSERT INTO transactions AS t (
+            organization_id, external_id, bank_account_id, transaction_date, posted_date,
+            amount, currency_code, transaction_type, category, subcategory, description,
+            merchant_name, reference_number
+        )
+        SELECT $1::uuid, external_id, bank_account_id::uuid, transaction_date, posted_date,
+               round(amount::numeric, 2), COALESCE(currency_code, 'USD'),
+               transaction_type::transaction_type, category, subcategory, description,
+               merchant_name, reference_number
+        FROM transactions_staging
+        ON CONFLICT (organization_id, external_id, transaction_date) DO UPDATE SET
+            bank_account_id = EXCLUDED.bank_account_id,
+            posted_date = EXCLUDED.posted_date,
+            amount = EXCLUDED.amount,
+            currency_code = EXCLUDED.currency_code,
+            transaction_type = EXCLUDED.transaction_type,
+            category = EXCLUDED.category,
+            subcategory = EXCLUDED.subcategory,
+            description = EXCLUDED.description,
+            merchant_name = EXCLUDED.merchant_name,
+            reference_number = EXCLUDED.reference_number
+        WHERE (t.bank_account_id, t.posted_date, t.amount, t.currency_code, t.transaction_type,
+               t.category, t.subcategory, t.description, t.merchant_name, t.reference_number)
+              IS DISTINCT FROM
+              (EXCLUDED.bank_account_id, EXCLUDED.posted_date, EXCLUDED.amount,
+               EXCLUDED.currency_code, EXCLUDED.transaction_type, EXCLUDED.category,
+               EXCLUDED.subcategory, EXCLUDED.description, EXCLUDED.merchant_name,
+               EXCLUDED.reference_number)
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT COUNT(*) FILTER (WHERE inserted) AS inserted,
+           COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted
+"""
+
+
+@dataclass
+class BatchResult:
+    batch: int
+    received: int
+    rejected: int
+    duplicates: int
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestResult:
+    received: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    batches: List[BatchResult] = field(default_factory=list)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_payload(body: bytes, content_type: str) -> pd.DataFrame:
+    """Frame of raw rows from a JSON array, NDJSON or CSV body"""
+    content_type = content_type.split(";")[0].strip().lower()
+    try:
+        if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+            return pd.read_json(io.BytesIO(body), lines=True, dtype=False, convert_dates=False)
+        elif content_type in ("text/csv", "application/csv"):
+            return pd.read_csv(io.BytesIO(body), dtype=str, keep_default_na=False, na_values=[""])
+        elif content_type == "application/json":
+            rows = json.loads(body)
+            if isinstance(rows, dict):
+                rows = rows.get("transactions")
+            if not isinstance(rows, list):
+                raise ValueError("Expected a JSON array of transactions")
+            return pd.DataFrame.from_records(rows)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Malformed {content_type} payload: {str(e)}") from e
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def validate(frame: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Normalized valid rows plus the rejection reason of every invalid row,
+    checked column by column over the whole frame.
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    n_rows = len(frame)
+    reasons = pd.Series(np.full(n_rows, None, dtype=object), index=frame.index)
+
+    def reject(mask: Any, reason: str) -> None:
+        reasons[np.asarray(mask, dtype=bool) & reasons.isna().to_numpy()] = reason
+
+    def text(name: str) -> pd.Series:
+        # Blank strings are nulls, as they are when read from CSV
+        if name not in frame.columns:
+            return pd.Series(pd.NA, index=frame.index, dtype="string")
+        values = frame[name].astype("string").str.strip()
+        return values.mask(values == "")
+
+    out = pd.DataFrame(index=frame.index)
+    # Both dates are DATE columns: times are dropped here, before dedupe, so
+    # two timestamps on one day are duplicates and not two upserts of one row
+    out["transaction_date"] = pd.to_datetime(frame["transaction_date"], errors="coerce",
+                                             format="mixed").dt.normalize()
+    reject(out["transaction_date"].isna(), "invalid transaction_date")
+    posted_date = text("posted_date")
+    out["posted_date"] = pd.to_datetime(posted_date.astype(object), errors="coerce",
+                                        format="mixed").dt.normalize()
+    reject(out["posted_date"].isna() & posted_date.notna(), "invalid posted_date")
+
+    amount = pd.to_numeric(frame["amount"], errors="coerce").astype(np.float64)
+    reject(~np.isfinite(amount) | (np.abs(amount) >= MAX_AMOUNT), "invalid amount")
+    out["amount"] = amount
+
+    transaction_type = text("transaction_type").str.lower()
+    reject(~transaction_type.isin(TRANSACTION_TYPES), "invalid transaction_type")
+    out["transaction_type"] = transaction_type
+
+    bank_account_id = text("bank_account_id")
+    reject(bank_account_id.notna() & ~bank_account_id.str.fullmatch(UUID_PATTERN).fillna(False),
+           "invalid bank_account_id")
+    out["bank_account_id"] = bank_account_id
+
+    for name, max_length in TEXT_COLUMNS.items():
+        values = text(name)
+        if max_length is not None:
+            reject((values.str.len() > max_length).fillna(False), f"{name} longer than {max_length}")
+        out[name] = values
+    out["currency_code"] = out["currency_code"].str.upper()
+
+    valid = reasons.isna().to_numpy()
+    return out[valid], reasons[~valid]
+
+
+def dedupe(frame: pd.DataFrame) -> pd.DataFrame:
+    """Keep the last row for each (external_id, transaction_date) in the batch"""
+    keyed = frame["external_id"].notna().to_numpy()
+    duplicated = frame.duplicated(subset=["external_id", "transaction_date"], keep="last").to_numpy()
+    return frame[~(keyed & duplicated)]
+
+
+def prepare_batch(batch: pd.DataFrame) -> Tuple[int, List[Tuple]]:
+    """Number of unique rows in a validated batch and their COPY records"""
+    unique = dedupe(batch)
+    return len(unique), to_records(unique)
+
+
+def to_records(frame: pd.DataFrame) -> List[Tuple]:
+    """COPY records in STAGING_COLUMNS order"""
+    columns = []
+    for name in STAGING_COLUMNS:
+        values = frame[name]
+        if name in ("transaction_date", "posted_date"):
+            values = values.dt.date
+        elif name == "amount":
+            columns.append(values.tolist())
+            continue
+        columns.append(values.astype(object).where(values.notna(), None).tolist())
+    return list(zip(*columns))
+
+
+class TransactionIngestor:
+    """
+    Validates and upserts large transaction batches over Database._pool.
+
+    Each batch is validated and de-duplicated in pandas, COPYed into a
+    temporary staging table and merged into transactions with a single
+    INSERT ... ON CONFLICT, all in one transaction per batch. A batch the
+    database rejects rolls back on its own and is reported as failed in its
+    BatchResult; the other batches still run. The pandas work runs in a
+    worker thread so it does not block the event loop.
+    """
+
+    def __init__(self, batch_size: int = 10000):
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _pool():
+        if not Database._pool:
+            raise RuntimeError("Database not initialized")
+        return Database._pool
+
+    async def ingest(self, organization_id: str, frame: pd.DataFrame) -> IngestResult:
+        valid, reasons = await asyncio.to_thread(validate, frame.reset_index(drop=True))
+        result = IngestResult(received=len(frame), rejected=len(reasons))
+        result.errors = [{"row": int(row), "error": reason}
+                         for row, reason in reasons.head(MAX_REPORTED_ERRORS).items()]
+
+        async with self._pool().acquire() as conn:
+            for number, start in enumerate(range(0, len(frame), self.batch_size)):
+                stop = start + self.batch_size
+                batch = valid[(valid.index >= start) & (valid.index < stop)]
+                n_unique, records = await asyncio.to_thread(prepare_batch, batch)
+                inserted = updated = failed = 0
+                error = None
+                if n_unique:
+                    try:
+                        async with conn.transaction():
+                            await conn.execute(CREATE_STAGING_TABLE)
+                            await conn.copy_records_to_table(
+                                "transactions_staging", records=records, columns=STAGING_COLUMNS
+                            )
+                            counts = await conn.fetchrow(UPSERT_QUERY, organization_id)
+                        inserted, updated = counts["inserted"], counts["updated"]
+                    except asyncpg.PostgresError as e:
+                        failed, error = n_unique, f"{type(e).__name__}: {str(e)}"
+                        logger.error(f"Ingest batch {number} for {organization_id} failed: {error}")
+
+                batch_result = BatchResult(
+                    batch=number,
+                    received=min(stop, len(frame)) - start,
+                    rejected=int(((reasons.index >= start) & (reasons.index < stop)).sum()),
+                    duplicates=len(batch) - n_unique,
+                    inserted=inserted,
+                    updated=updated,
+                    unchanged=n_unique - inserted - updated - failed,
+                    failed=failed,
+                    error=error,
+                )
+                result.batches.append(batch_result)
+                if error is not None and len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append({"batch": number, "error": error})
+                for name in ("duplicates", "inserted", "updated", "unchanged", "failed"):
+                    setattr(result, name, getattr(result, name) + getattr(batch_result, name))
+
+        logger.info(f"Ingested {result.received} transactions for {organization_id}: "
+                    f"{result.inserted} inserted, {result.updated} updated, "
+                    f"{result.unchanged} unchanged, {result.rejected} rejected, "
+                    f"{result.failed} failed")
+        return result
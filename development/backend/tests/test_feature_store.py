@@ -0,0 +1,156 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database.connection import Database
+from services.feature_store import (
+    BALANCE_AT_QUERY, CHANGED_SINCE_QUERY, DAILY_FLOWS_QUERY, TRANSACTION_FLOWS_QUERY,
+    DailyFeatureStore, balance_history, gap_fill
+)
+
+ORG = "5f0c6d2e-8a1b-4c3d-9e4f-0a1b2c3d4e5f"
+END = date(2024, 3, 31)
+
+
+class FakeTimescale:
+    """
+    transactions, the transaction_changes log its trigger keeps, and a
+    daily_cash_flow aggregate that only changes when refreshed
+    """
+
+    def __init__(self):
+        self.clock = datetime(2024, 4, 1)
+        self.transactions = {}
+        self.changes = {}
+        self.aggregate = {}
+        self.queries = []
+
+    def tick(self):
+        self.clock += timedelta(minutes=1)
+        return self.clock
+
+    def write(self, transaction_id, day, amount):
+        previous = self.transactions.get(transaction_id)
+        for changed_day in {day, previous and previous[0]} - {None}:
+            self.changes[changed_day] = self.tick()
+        if amount is None:
+            del self.transactions[transaction_id]
+        else:
+            self.transactions[transaction_id] = (day, amount)
+
+    def sums(self):
+        inflow, outflow = defaultdict(float), defaultdict(float)
+        for day, amount in self.transactions.values():
+            (inflow if amount > 0 else outflow)[day] += abs(amount)
+        return {day: (inflow[day], outflow[day]) for day in set(inflow) | set(outflow)}
+
+    def refresh(self):
+        self.aggregate = self.sums()
+
+    async def fetchval(self, query, *args):
+        self.queries.append(query)
+        if query == "SELECT NOW()":
+            return self.tick()
+        if query == CHANGED_SINCE_QUERY:
+            days = [day for day, changed_at in self.changes.items() if changed_at > args[1]]
+            return min(days, default=None)
+        if query == BALANCE_AT_QUERY:
+            return 1000.0
+        raise AssertionError(query)
+
+    async def fetch(self, query, organization_id, start, end, account_id):
+        self.queries.append(query)
+        sums = {DAILY_FLOWS_QUERY: self.aggregate, TRANSACTION_FLOWS_QUERY: self.sums()}[query]
+        return [{"day": day, "total_inflow": inflow, "total_outflow": outflow}
+                for day, (inflow, outflow) in sorted(sums.items()) if start <= day <= end]
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeTimescale()
+    monkeypatch.setattr(Database, "_pool", fake)
+    for i in range(90):
+        fake.write(f"t{i}", END - timedelta(days=i), 10.0 if i % 2 else -4.0)
+    fake.refresh()
+    return fake
+
+
+def flows_on(series, day):
+    index = int((np.datetime64(day, "D") - series.date[0]).astype(int))
+    return series.total_inflow[index], series.total_outflow[index]
+
+
+def load(store):
+    return asyncio.run(store.load(ORG, end=END))
+
+
+class TestDailyFeatureStore:
+    def test_first_load_reads_the_aggregate(self, db):
+        series = load(DailyFeatureStore(history_days=60))
+        assert len(series) == 60 and series.end == END
+        assert db.queries.count(DAILY_FLOWS_QUERY) == 1
+        assert series.total_balance[-1] == 1000.0
+
+    def test_backdated_change_is_read_from_transactions(self, db):
+        store = DailyFeatureStore(history_days=60)
+        load(store)
+        # Changed after the aggregate was materialized and never refreshed
+        changed_day = END - timedelta(days=40)
+        db.write("t40", changed_day, 99.0)
+
+        db.queries.clear()
+        series = load(store)
+        assert DAILY_FLOWS_QUERY not in db.queries
+        assert flows_on(series, changed_day) == (99.0, 0.0)
+        assert flows_on(series, changed_day - timedelta(days=1)) == (10.0, 0.0)
+
+        # Still correct on the next load, with nothing changed in between
+        assert flows_on(load(store), changed_day) == (99.0, 0.0)
+
+    def test_deletes_are_seen(self, db):
+        store = DailyFeatureStore(history_days=60)
+        load(store)
+        db.write("t41", END - timedelta(days=41), None)
+        assert flows_on(load(store), END - timedelta(days=41)) == (0.0, 0.0)
+
+    def test_moved_transaction_updates_both_days(self, db):
+        store = DailyFeatureStore(history_days=60)
+        load(store)
+        db.write("t50", END - timedelta(days=20), 10.0)
+        series = load(store)
+        assert flows_on(series, END - timedelta(days=50)) == (0.0, 0.0)
+        assert flows_on(series, END - timedelta(days=20)) == (10.0, 4.0)
+
+    def test_unchanged_repeat_load_reads_only_the_overlap(self, db, monkeypatch):
+        store = DailyFeatureStore(history_days=60, overlap_days=3)
+        load(store)
+        fetched = []
+        fetch = store._fetch
+
+        async def spy(conn, query, organization_id, account_id, start, end):
+            fetched.append((start, end))
+            return await fetch(conn, query, organization_id, account_id, start, end)
+
+        monkeypatch.setattr(store, "_fetch", spy)
+        series = load(store)
+        assert fetched == [(END - timedelta(days=2), END)]
+        assert len(series) == 60
+
+
+class TestHelpers:
+    def test_gap_fill_zero_fills_missing_days(self):
+        days = np.array(["2024-01-02"], dtype="datetime64[D]")
+        dates, inflow, outflow = gap_fill(days, np.array([5.0]), np.array([1.0]),
+                                          date(2024, 1, 1), date(2024, 1, 3))
+        assert len(dates) == 3 and inflow.tolist() == [0.0, 5.0, 0.0] and outflow.tolist() == [0.0, 1.0, 0.0]
+
+    def test_balance_history_ends_at_the_end_balance(self):
+        assert balance_history(np.array([10.0, -5.0, 2.0]), 100.0).tolist() == [103.0, 98.0, 100.0]
@@ -0,0 +1,267 @@
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+
+import numpy as np
+import pytest
+
+import services.forecast_jobs as forecast_jobs
+from services.feature_store import DailySeries
+from services.forecast_jobs import ForecastJobRunner, InMemoryJobQueue, job_status
+
+CRASH_ORG = "00000000-0000-0000-0000-00000000dead"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def org():
+    return str(uuid.uuid4())
+
+
+class FakeLoader:
+    async def load(self, organization_id):
+        days = np.arange("2024-01-01", "2024-03-01", dtype="datetime64[D]")
+        flows = np.ones(len(days))
+        return DailySeries(days, flows * 2, flows, flows, np.cumsum(flows))
+
+
+class FakeStore:
+    def __init__(self):
+        self.saved = []
+
+    async def save(self, forecast_id, result, starting_balance):
+        self.saved.append((forecast_id, result, starting_balance))
+
+
+def fake_forecast(frame, organization_id, forecast_days, confidence_level, model_config=None):
+    if organization_id == CRASH_ORG:
+        os._exit(1)
+    if (model_config or {}).get("sleep"):
+        time.sleep(model_config["sleep"])
+    return {"organization_id": organization_id, "days": forecast_days}
+
+
+def make_runner(queue, monkeypatch, executor=None, **kwargs):
+    monkeypatch.setattr(forecast_jobs, "run_forecast", fake_forecast)
+    runner = ForecastJobRunner(queue, executor=executor or ThreadPoolExecutor(4), poll_interval=0.01,
+                               retry_delay=0.01, **kwargs)
+    runner.loader = FakeLoader()
+    runner.store = FakeStore()
+    return runner
+
+
+class TestInMemoryJobQueue:
+    def test_claim_respects_per_org_and_global_limits(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            orgs = [org(), org(), org()]
+            for organization_id in orgs:
+                for _ in range(2):
+                    await queue.enqueue(organization_id, str(uuid.uuid4()), {})
+
+            claimed = []
+            while (job := await queue.claim("w1", max_per_org=1, max_concurrent=2)) is not None:
+                claimed.append(job)
+            return claimed
+
+        claimed = run(scenario())
+        assert len(claimed) == 2
+        assert len({job["organization_id"] for job in claimed}) == 2
+
+    def test_claim_is_fifo(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            first = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            await queue.enqueue(org(), str(uuid.uuid4()), {})
+            return first, await queue.claim("w1", max_per_org=1, max_concurrent=1)
+
+        first, claimed = run(scenario())
+        assert claimed["id"] == first["id"]
+        assert claimed["status"] == "running" and claimed["attempts"] == 1
+
+    def test_failures_retry_with_backoff_until_max_attempts(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            job = await queue.enqueue(org(), str(uuid.uuid4()), {}, max_attempts=3)
+            delays, statuses = [], []
+            for _ in range(3):
+                queue._jobs[str(job["id"])]["run_after"] = queue._now()
+                claimed = await queue.claim("w1", 1, 1)
+                before = queue._now()
+                statuses.append(await queue.fail(claimed["id"], "w1", "boom", retry_delay=10))
+                delays.append((queue._jobs[str(job["id"])]["run_after"] - before).total_seconds())
+            return statuses, delays, await queue.get(job["id"])
+
+        statuses, delays, job = run(scenario())
+        assert statuses == ["queued", "queued", "failed"]
+        assert delays[0] == pytest.approx(10, abs=1) and delays[1] == pytest.approx(20, abs=1)
+        assert job["attempts"] == 3 and job["error"] == "boom" and job["finished_at"] is not None
+
+    def test_backoff_delays_the_next_claim(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            job = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            await queue.claim("w1", 1, 1)
+            await queue.fail(job["id"], "w1", "boom", retry_delay=60)
+            return await queue.claim("w1", 1, 1)
+
+        assert run(scenario()) is None
+
+    def test_stale_jobs_are_requeued_and_count_an_attempt(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            job = await queue.enqueue(org(), str(uuid.uuid4()), {}, max_attempts=2)
+            await queue.claim("w1", 1, 1)
+            assert await queue.requeue_stale(timeout=60) == 0
+
+            queue._jobs[str(job["id"])]["heartbeat_at"] -= timedelta(seconds=120)
+            assert await queue.requeue_stale(timeout=60) == 1
+            requeued = await queue.get(job["id"])
+
+            await queue.claim("w2", 1, 1)
+            queue._jobs[str(job["id"])]["heartbeat_at"] -= timedelta(seconds=120)
+            await queue.requeue_stale(timeout=60)
+            return requeued, await queue.get(job["id"])
+
+        requeued, failed = run(scenario())
+        assert requeued["status"] == "queued" and requeued["locked_by"] is None
+        assert requeued["error"] == "worker heartbeat timed out"
+        assert failed["status"] == "failed" and failed["attempts"] == 2
+
+    def test_stale_owner_cannot_overwrite_new_owner(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            job = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            await queue.claim("w1", 1, 1)
+            queue._jobs[str(job["id"])]["heartbeat_at"] -= timedelta(seconds=120)
+            await queue.requeue_stale(timeout=60)
+            await queue.claim("w2", 1, 1)
+
+            completed = await queue.complete(job["id"], "w1")
+            failed = await queue.fail(job["id"], "w1", "late", retry_delay=0)
+            await queue.progress(job["id"], "w1", 0.5, "late")
+            return completed, failed, await queue.get(job["id"])
+
+        completed, failed, job = run(scenario())
+        assert completed is False and failed is None
+        assert job["status"] == "running" and job["locked_by"] == "w2" and job["stage"] == "claimed"
+
+    def test_cancel_only_queued_jobs(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            queued = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            running = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            queue._jobs[str(queued["id"])]["run_after"] += timedelta(seconds=1)
+            await queue.claim("w1", 1, 1)
+            return (await queue.cancel(queued["id"]), await queue.cancel(running["id"]),
+                    await queue.cancel(uuid.uuid4()), await queue.get(queued["id"]))
+
+        cancelled, running_cancelled, missing, job = run(scenario())
+        assert cancelled is True and running_cancelled is False and missing is False
+        assert job["status"] == "cancelled"
+        assert job_status(job)["status"] == "cancelled"
+
+    def test_release_does_not_count_the_attempt(self):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            job = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            await queue.claim("w1", 1, 1)
+            status = await queue.release(job["id"], "w1", "pool broke")
+            return status, await queue.get(job["id"])
+
+        status, job = run(scenario())
+        assert status == "queued" and job["attempts"] == 0
+
+
+class TestForecastJobRunner:
+    def test_runs_jobs_to_completion(self, monkeypatch):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            jobs = [await queue.enqueue(org(), str(uuid.uuid4()), {"forecast_days": 7}) for _ in range(3)]
+            runner = make_runner(queue, monkeypatch, workers=2)
+            statuses = await asyncio.gather(*[runner.execute(await queue.claim(runner.worker_id, 1, 3))
+                                              for _ in jobs])
+            return statuses, runner.store.saved, [await queue.get(job["id"]) for job in jobs]
+
+        statuses, saved, jobs = run(scenario())
+        assert statuses == ["succeeded"] * 3
+        assert len(saved) == 3 and saved[0][1]["days"] == 7 and saved[0][2] == 60.0
+        assert all(job["status"] == "succeeded" and job["progress"] == 1.0 for job in jobs)
+
+    def test_run_loop_respects_limits_and_stops(self, monkeypatch):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            organization_id = org()
+            for _ in range(3):
+                await queue.enqueue(organization_id, str(uuid.uuid4()), {})
+            runner = make_runner(queue, monkeypatch, workers=2, max_per_org=1, max_concurrent=2,
+                                 model_config={"sleep": 0.05})
+            stop = asyncio.Event()
+            peak = 0
+
+            async def watch():
+                nonlocal peak
+                while any(job["status"] != "succeeded" for job in queue._jobs.values()):
+                    peak = max(peak, sum(job["status"] == "running" for job in queue._jobs.values()))
+                    await asyncio.sleep(0.005)
+                stop.set()
+
+            await asyncio.wait_for(asyncio.gather(runner.run(stop), watch()), timeout=10)
+            return peak
+
+        assert run(scenario()) == 1
+
+    def test_execution_timeout_fails_the_job(self, monkeypatch):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            job = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            runner = make_runner(queue, monkeypatch, execution_timeout=0.05,
+                                 model_config={"sleep": 0.5})
+            status = await runner.execute(await queue.claim(runner.worker_id, 1, 1))
+            return status, await queue.get(job["id"])
+
+        status, job = run(scenario())
+        assert status == "queued"
+        assert job["attempts"] == 1 and job["error"].startswith("TimeoutError")
+
+    def test_broken_pool_is_replaced(self, monkeypatch):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            crashing = await queue.enqueue(CRASH_ORG, str(uuid.uuid4()), {})
+            pool = ProcessPoolExecutor(2, mp_context=get_context("spawn"))
+            runner = make_runner(queue, monkeypatch, executor=pool)
+            crash_status = await runner.execute(await queue.claim(runner.worker_id, 1, 2))
+            # The next job must get a fresh pool rather than the broken one
+            monkeypatch.setattr(runner, "_get_executor", lambda: runner._executor or ThreadPoolExecutor(1))
+            healthy = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            queue._jobs[str(crashing["id"])]["run_after"] += timedelta(hours=1)
+            healthy_status = await runner.execute(await queue.claim(runner.worker_id, 1, 2))
+            return crash_status, healthy_status, runner._executor, await queue.get(crashing["id"])
+
+        crash_status, healthy_status, executor, crashed = run(scenario())
+        # Alone in the pool, the crashing job is charged the attempt
+        assert crash_status == "queued" and crashed["attempts"] == 1
+        assert "BrokenProcessPool" in crashed["error"]
+        assert healthy_status == "succeeded"
+
+    def test_broken_pool_does_not_charge_other_jobs(self, monkeypatch):
+        async def scenario():
+            queue = InMemoryJobQueue()
+            crashing = await queue.enqueue(CRASH_ORG, str(uuid.uuid4()), {})
+            other = await queue.enqueue(org(), str(uuid.uuid4()), {})
+            pool = ProcessPoolExecutor(2, mp_context=get_context("spawn"))
+            runner = make_runner(queue, monkeypatch, executor=pool, model_config={"sleep": 2})
+            claimed = [await queue.claim(runner.worker_id, 1, 2) for _ in range(2)]
+            await asyncio.gather(*[runner.execute(job) for job in claimed])
+            return await queue.get(crashing["id"]), await queue.get(other["id"]), runner._executor
+
+        crashed, other, executor = run(scenario())
+        assert other["status"] == "queued" and other["attempts"] == 0
+        assert crashed["status"] == "queued" and crashed["attempts"] == 0
+        assert executor is None
@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import List, Optional
+
+import numpy as np
+import pytest
+
+from database.connection import Database
+from services.forecast_store import REPLACE_POINTS_QUERY, ForecastStore, point_columns
+
+
+class Model(Enum):
+    ENSEMBLE = "ensemble"
+
+
+@dataclass
+class Result:
+    predictions: np.ndarray
+    confidence_intervals: Optional[np.ndarray]
+    forecast_dates: List[datetime]
+    confidence_score: float
+    model_type: Model = Model.ENSEMBLE
+
+
+def result(intervals=True, predictions=(100.0, -40.0, 0.0), first_day=1):
+    predictions = np.array(predictions)
+    return Result(
+        predictions=predictions,
+        confidence_intervals=np.column_stack([predictions - 10, predictions + 10]) if intervals else None,
+        forecast_dates=[datetime(2024, 1, first_day + i) for i in range(len(predictions))],
+        confidence_score=0.8,
+    )
+
+
+class TestPointColumns:
+    def test_flows_balance_and_intervals(self):
+        columns = point_columns(result(), starting_balance=1000.0)
+
+        assert columns["date"].tolist() == [np.datetime64("2024-01-01"), np.datetime64("2024-01-02"),
+                                            np.datetime64("2024-01-03")]
+        assert columns["inflow"].tolist() == [100.0, 0.0, 0.0]
+        assert columns["outflow"].tolist() == [0.0, 40.0, 0.0]
+        assert columns["balance"].tolist() == [1100.0, 1060.0, 1060.0]
+        assert columns["confidence"].tolist() == [0.8] * 3
+        assert columns["lower"].tolist() == [90.0, -50.0, -10.0]
+        assert columns["upper"].tolist() == [110.0, -30.0, 10.0]
+
+    def test_missing_intervals_are_nan(self):
+        columns = point_columns(result(intervals=False), starting_balance=0.0)
+        assert np.isnan(columns["lower"]).all() and np.isnan(columns["upper"]).all()
+
+    def test_columns_are_parallel(self):
+        columns = point_columns(result(), starting_balance=0.0)
+        assert {len(values) for values in columns.values()} == {3}
+
+
+class FakeConnection:
+    """forecast_data_points and forecasts with REPLACE_POINTS_QUERY's effect"""
+
+    def __init__(self):
+        self.calls = []
+        self.points = {}
+        self.status = {}
+
+    async def fetchrow(self, query, *args):
+        self.calls.append((query, args))
+        assert query == REPLACE_POINTS_QUERY
+        forecast_ids, model_versions = args[0], args[9]
+        deleted = [key for key in self.points if key[0] in forecast_ids]
+        for key in deleted:
+            del self.points[key]
+        columns = args[1:9]
+        assert len({len(column) for column in columns}) == 1
+        for forecast_id, day, *values in zip(*columns):
+            self.points[(forecast_id, day)] = values
+        self.status.update({forecast_id: ("active", version)
+                            for forecast_id, version in zip(forecast_ids, model_versions)})
+        return {"inserted": len(columns[0]), "deleted": len(deleted), "activated": len(forecast_ids)}
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    fake = FakeConnection()
+    monkeypatch.setattr(Database, "_pool", fake)
+    return fake
+
+
+class TestForecastStore:
+    def test_save_is_one_statement_with_array_arguments(self, conn):
+        forecast_id = uuid.uuid4()
+        counts = asyncio.run(ForecastStore().save(str(forecast_id), result(), 1000.0))
+
+        assert counts == {"inserted": 3, "deleted": 0, "activated": 1}
+        assert len(conn.calls) == 1
+        _, args = conn.calls[0]
+        assert args[0] == [forecast_id] and args[1] == [forecast_id] * 3
+        assert args[2] == [date(2024, 1, day) for day in (1, 2, 3)]
+        assert args[3:6] == ([100.0, 0.0, 0.0], [0.0, 40.0, 0.0], [1100.0, 1060.0, 1060.0])
+        assert args[6:9] == ([0.8] * 3, [90.0, -50.0, -10.0], [110.0, -30.0, 10.0])
+        assert args[9] == ["ensemble"]
+        assert all(type(value) is float for column in args[3:9] for value in column)
+
+    def test_resave_replaces_the_points(self, conn):
+        forecast_id, other_id = uuid.uuid4(), uuid.uuid4()
+        store = ForecastStore()
+        asyncio.run(store.save(forecast_id, result(), 0.0))
+        asyncio.run(store.save(other_id, result(), 0.0))
+        # A shorter, shifted forecast leaves none of the old points behind
+        counts = asyncio.run(store.save(forecast_id, result(predictions=(5.0, 6.0), first_day=2), 0.0))
+
+        assert counts == {"inserted": 2, "deleted": 3, "activated": 1}
+        days = sorted(day for key_id, day in conn.points if key_id == forecast_id)
+        assert days == [date(2024, 1, 2), date(2024, 1, 3)]
+        assert conn.points[(forecast_id, date(2024, 1, 3))][:3] == [6.0, 0.0, 11.0]
+        assert len([key for key in conn.points if key[0] == other_id]) == 3
+
+    def test_many_forecasts_in_one_round_trip(self, conn):
+        results = {uuid.uuid4(): (result(), 0.0), uuid.uuid4(): (result(intervals=False), 50.0)}
+        counts = asyncio.run(ForecastStore().replace(results))
+
+        assert len(conn.calls) == 1 and counts["inserted"] == 6 and counts["activated"] == 2
+        _, args = conn.calls[0]
+        # Missing interval bounds are sent as NULL
+        assert args[7][3:] == [None] * 3 and args[8][3:] == [None] * 3
+        assert args[5][3:] == [150.0, 110.0, 110.0]
+        assert set(conn.status) == set(results)
@@ -0,0 +1,55 @@
+import struct
+from datetime import date
+
+import numpy as np
+import pytest
+
+from services.training_data import COPY_SIGNATURE, COPY_TRAILER, BinaryCopyDecoder
+
+FIELDS = [("period", "date"), ("org_index", "int4"), ("total_inflow", "float8")]
+ROWS = [(date(2000, 1, 1), 1, 10.5), (date(2024, 2, 29), 2, -3.25), (date(1999, 12, 31), 3, 0.0)]
+
+
+def copy_stream(rows, extension=b""):
+    """Binary COPY output as Postgres writes it"""
+    header = COPY_SIGNATURE + struct.pack(">ii", 0, len(extension)) + extension
+    body = b"".join(
+        struct.pack(">hii", 3, 4, (day - date(2000, 1, 1)).days)
+        + struct.pack(">ii", 4, org_index) + struct.pack(">id", 8, inflow)
+        for day, org_index, inflow in rows
+    )
+    return header + body + COPY_TRAILER
+
+
+def decode(stream, chunk_size):
+    decoder = BinaryCopyDecoder(FIELDS)
+    for start in range(0, len(stream), chunk_size):
+        decoder.feed(stream[start:start + chunk_size])
+    return decoder.columns()
+
+
+class TestBinaryCopyDecoder:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 26, 10_000])
+    def test_rows_split_across_chunks_decode_the_same(self, chunk_size):
+        columns = decode(copy_stream(ROWS, extension=b"ext!"), chunk_size)
+        assert columns["period"].dtype == np.dtype("datetime64[D]")
+        assert columns["period"].tolist() == [row[0] for row in ROWS]
+        assert columns["org_index"].tolist() == [1, 2, 3]
+        assert columns["total_inflow"].tolist() == [10.5, -3.25, 0.0]
+        assert columns["total_inflow"].dtype.isnative
+
+    def test_empty_stream(self):
+        columns = decode(copy_stream([]), 5)
+        assert all(len(values) == 0 for values in columns.values())
+
+    def test_rejects_other_streams(self):
+        with pytest.raises(ValueError, match="Not a binary COPY stream"):
+            decode(b"id,amount\n" * 4, 100)
+        with pytest.raises(ValueError, match="Truncated"):
+            decode(copy_stream(ROWS)[:-5], 100)
+        # A row of the same width whose field count is wrong
+        header_size = len(copy_stream([])) - len(COPY_TRAILER)
+        stream = bytearray(copy_stream(ROWS[:1]))
+        stream[header_size:header_size + 2] = struct.pack(">h", 2)
+        with pytest.raises(ValueError, match="field count"):
+            decode(bytes(stream), 100)
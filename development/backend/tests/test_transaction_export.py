@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pyarrow as pa
+import pytest
+
+from services.transaction_export import DEFAULT_EXPORT_COLUMNS, TransactionExporter
+
+COLUMNS = ["id", "transaction_date", "amount", "is_recurring", "description", "created_at"]
+RECORDS = [
+    {"id": str(uuid.uuid4()), "transaction_date": date(2024, 1, 2), "amount": Decimal("12.50"),
+     "is_recurring": True, "description": 'Rent, "office"\nJanuary',
+     "created_at": datetime(2024, 1, 2, 9, 30, tzinfo=timezone.utc)},
+    {"id": str(uuid.uuid4()), "transaction_date": date(2024, 1, 3), "amount": Decimal("-4.00"),
+     "is_recurring": False, "description": None,
+     "created_at": datetime(2024, 1, 3, 17, 0, tzinfo=timezone.utc)},
+]
+
+
+def export(export_format, chunks):
+    """Encoded body as the exporter streams it: header, one part per chunk, footer"""
+    encoder = TransactionExporter.encoder(export_format, COLUMNS)
+    parts = [encoder.header()] + [encoder.encode(chunk) for chunk in chunks] + [encoder.footer()]
+    return b"".join(parts)
+
+
+class TestEncoders:
+    def test_ndjson_round_trip(self):
+        lines = export("ndjson", [RECORDS[:1], RECORDS[1:]]).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert rows[0] == {
+            "id": RECORDS[0]["id"], "transaction_date": "2024-01-02", "amount": "12.50",
+            "is_recurring": True, "description": 'Rent, "office"\nJanuary',
+            "created_at": "2024-01-02T09:30:00+00:00",
+        }
+        assert rows[1]["description"] is None
+
+    def test_csv_round_trip(self):
+        rows = list(csv.reader(io.StringIO(export("csv", [RECORDS[:1], RECORDS[1:]]).decode())))
+        assert rows[0] == COLUMNS
+        assert rows[1][:5] == [RECORDS[0]["id"], "2024-01-02", "12.50", "True", 'Rent, "office"\nJanuary']
+        assert rows[2][4] == ""
+
+    def test_arrow_round_trip(self):
+        table = pa.ipc.open_stream(export("arrow", [RECORDS[:1], RECORDS[1:]])).read_all()
+        assert table.column_names == COLUMNS
+        assert table.to_pylist() == RECORDS
+
+    def test_arrow_stream_without_rows_has_the_schema(self):
+        table = pa.ipc.open_stream(export("arrow", [])).read_all()
+        assert table.num_rows == 0 and table.schema.field("amount").type == pa.decimal128(15, 2)
+
+
+class TestColumns:
+    def test_default_and_unknown_fields(self):
+        assert TransactionExporter.columns(None) == DEFAULT_EXPORT_COLUMNS
+        with pytest.raises(ValueError, match="balance"):
+            TransactionExporter.columns(["amount", "balance"])
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError, match="Unknown export format"):
+            TransactionExporter.encoder("xml", COLUMNS)
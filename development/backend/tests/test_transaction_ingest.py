@@ -0,0 +1,204 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import date
+
+import asyncpg
+import pandas as pd
+import pytest
+
+from database.connection import Database
+from services.transaction_ingest import (
+    STAGING_COLUMNS, TransactionIngestor, dedupe, parse_payload, prepare_batch, to_records, validate
+)
+
+ACCOUNT_ID = "5f0c6d2e-8a1b-4c3d-9e4f-0a1b2c3d4e5f"
+
+ROWS = [
+    {"external_id": "a", "transaction_date": "2024-01-02", "posted_date": "2024-01-03",
+     "amount": "12.50", "transaction_type": "Income", "bank_account_id": ACCOUNT_ID,
+     "currency_code": "usd"},
+    {"external_id": "b", "transaction_date": "2024-01-02", "posted_date": "",
+     "amount": "-4", "transaction_type": "expense", "bank_account_id": "",
+     "currency_code": ""},
+]
+
+
+def json_body(rows):
+    return json.dumps(rows).encode()
+
+
+def csv_body(rows):
+    return pd.DataFrame(rows).to_csv(index=False).encode()
+
+
+def ndjson_body(rows):
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+class TestParsePayload:
+    @pytest.mark.parametrize("content_type,encode", [
+        ("application/json", json_body),
+        ("application/json; charset=utf-8", json_body),
+        ("text/csv", csv_body),
+        ("application/x-ndjson", ndjson_body),
+    ])
+    def test_formats_parse_to_the_same_rows(self, content_type, encode):
+        frame = parse_payload(encode(ROWS), content_type)
+        assert len(frame) == 2
+        assert list(frame["external_id"]) == ["a", "b"]
+
+    def test_json_object_with_transactions_key(self):
+        frame = parse_payload(json.dumps({"transactions": ROWS}).encode(), "application/json")
+        assert len(frame) == 2
+
+    def test_rejects_unsupported_and_malformed_bodies(self):
+        with pytest.raises(ValueError, match="Unsupported content type"):
+            parse_payload(b"<xml/>", "application/xml")
+        with pytest.raises(ValueError, match="Expected a JSON array"):
+            parse_payload(b'{"rows": []}', "application/json")
+        with pytest.raises(ValueError):
+            parse_payload(b"[{", "application/json")
+
+
+class TestValidate:
+    def test_valid_rows_are_normalized(self):
+        valid, reasons = validate(parse_payload(json_body(ROWS), "application/json"))
+        assert reasons.empty and len(valid) == 2
+        assert list(valid["transaction_type"]) == ["income", "expense"]
+        assert list(valid["amount"]) == [12.5, -4.0]
+        assert valid["currency_code"].iloc[0] == "USD"
+
+    @pytest.mark.parametrize("content_type,encode", [
+        ("application/json", json_body), ("text/csv", csv_body),
+    ])
+    def test_blank_strings_are_null_in_json_and_csv(self, content_type, encode):
+        valid, reasons = validate(parse_payload(encode(ROWS), content_type))
+        assert reasons.empty
+        blank = valid.iloc[1]
+        assert pd.isna(blank["posted_date"]) and pd.isna(blank["bank_account_id"])
+        assert pd.isna(blank["currency_code"])
+
+    def test_each_invalid_row_gets_its_first_reason(self):
+        frame = pd.DataFrame([
+            {"transaction_date": "not a date", "amount": "1", "transaction_type": "income"},
+            {"transaction_date": "2024-01-01", "amount": "inf", "transaction_type": "income"},
+            {"transaction_date": "2024-01-01", "amount": "1", "transaction_type": "gift"},
+            {"transaction_date": "2024-01-01", "amount": "1", "transaction_type": "income",
+             "bank_account_id": "nope"},
+            {"transaction_date": "2024-01-01", "amount": "1", "transaction_type": "income",
+             "currency_code": "EURO"},
+            {"transaction_date": "2024-01-01", "amount": "1", "transaction_type": "income",
+             "posted_date": "later"},
+            {"transaction_date": "bad", "amount": "bad", "transaction_type": "bad"},
+        ])
+        valid, reasons = validate(frame)
+        assert valid.empty
+        assert reasons.tolist() == [
+            "invalid transaction_date", "invalid amount", "invalid transaction_type",
+            "invalid bank_account_id", "currency_code longer than 3", "invalid posted_date",
+            "invalid transaction_date",
+        ]
+
+    def test_times_are_dropped_from_dates(self):
+        frame = pd.DataFrame([
+            {"transaction_date": "2024-01-01T10:00:00", "posted_date": "2024-01-02 23:59",
+             "amount": "1", "transaction_type": "income"},
+        ])
+        valid, _ = validate(frame)
+        assert valid["transaction_date"].iloc[0] == pd.Timestamp("2024-01-01")
+        assert valid["posted_date"].iloc[0] == pd.Timestamp("2024-01-02")
+
+    def test_missing_required_columns(self):
+        with pytest.raises(ValueError, match="amount, transaction_type"):
+            validate(pd.DataFrame({"transaction_date": ["2024-01-01"]}))
+
+
+class TestDedupe:
+    def test_keeps_last_row_per_external_id_and_date(self):
+        frame = pd.DataFrame([
+            {"external_id": "a", "transaction_date": "2024-01-01", "amount": 1.0},
+            {"external_id": "a", "transaction_date": "2024-01-01", "amount": 2.0},
+            {"external_id": "a", "transaction_date": "2024-01-02", "amount": 3.0},
+            {"external_id": None, "transaction_date": "2024-01-01", "amount": 4.0},
+            {"external_id": None, "transaction_date": "2024-01-01", "amount": 5.0},
+        ])
+        assert dedupe(frame)["amount"].tolist() == [2.0, 3.0, 4.0, 5.0]
+
+    def test_timestamps_on_one_day_are_duplicates(self):
+        frame = pd.DataFrame([
+            {"external_id": "a", "transaction_date": "2024-01-01T10:00", "amount": "1",
+             "transaction_type": "income"},
+            {"external_id": "a", "transaction_date": "2024-01-01T11:00", "amount": "2",
+             "transaction_type": "income"},
+        ])
+        n_unique, records = prepare_batch(validate(frame)[0])
+        assert n_unique == 1 and len(records) == 1
+        assert dict(zip(STAGING_COLUMNS, records[0]))["amount"] == 2.0
+
+
+class TestToRecords:
+    def test_records_follow_staging_columns_with_nulls(self):
+        valid, _ = validate(parse_payload(json_body(ROWS), "application/json"))
+        records = to_records(valid)
+        assert len(records) == 2 and all(len(record) == len(STAGING_COLUMNS) for record in records)
+
+        first = dict(zip(STAGING_COLUMNS, records[0]))
+        assert first["transaction_date"] == date(2024, 1, 2)
+        assert first["posted_date"] == date(2024, 1, 3)
+        assert first["amount"] == 12.5 and first["bank_account_id"] == ACCOUNT_ID
+
+        second = dict(zip(STAGING_COLUMNS, records[1]))
+        assert second["posted_date"] is None and second["bank_account_id"] is None
+        assert second["category"] is None
+
+    def test_prepare_batch_counts_unique_rows(self):
+        valid, _ = validate(parse_payload(json_body(ROWS + ROWS[:1]), "application/json"))
+        n_unique, records = prepare_batch(valid)
+        assert n_unique == 2 and len(records) == 2
+
+
+class FakeConnection:
+    """Upserts every batch except those whose first external_id is in `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.committed = []
+        self._staged = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        self._staged = []
+        yield
+        self.committed.append(self._staged)
+
+    async def execute(self, query, *args):
+        pass
+
+    async def copy_records_to_table(self, table, records, columns):
+        self._staged = records
+
+    async def fetchrow(self, query, *args):
+        if self._staged[0][0] in self.failing:
+            raise asyncpg.exceptions.CardinalityViolationError("cannot affect row a second time")
+        return {"inserted": len(self._staged), "updated": 0}
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+class TestIngest:
+    def test_a_failed_batch_is_reported_and_the_others_run(self, monkeypatch):
+        conn = FakeConnection(failing={"c"})
+        monkeypatch.setattr(Database, "_pool", conn)
+        rows = [{"external_id": name, "transaction_date": "2024-01-02", "amount": "1",
+                 "transaction_type": "income"} for name in "abcdef"]
+
+        result = asyncio.run(TransactionIngestor(batch_size=2).ingest(ACCOUNT_ID, pd.DataFrame(rows)))
+
+        assert [batch.failed for batch in result.batches] == [0, 2, 0]
+        assert result.batches[1].error.startswith("CardinalityViolationError")
+        assert result.inserted == 4 and result.failed == 2 and result.unchanged == 0
+        assert result.errors == [{"batch": 1, "error": result.batches[1].error}]
+        assert len(conn.committed) == 2
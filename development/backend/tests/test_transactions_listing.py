@@ -0,0 +1,102 @@
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert
+
+from models.transaction import Transaction
+from routers.transactions import (
+    DEFAULT_FIELDS, decode_cursor, encode_cursor, listing_query, paginate, parse_fields
+)
+
+ORG = uuid.uuid4()
+OTHER_ORG = uuid.uuid4()
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        # The columns the listing reads plus those with insert defaults
+        conn.exec_driver_sql(
+            "CREATE TABLE transactions (id CHAR(32) PRIMARY KEY, organization_id CHAR(32),"
+            " bank_account_id CHAR(32), transaction_date DATE, amount NUMERIC,"
+            " currency_code VARCHAR(3), transaction_type VARCHAR(30), category VARCHAR(100),"
+            " description TEXT, merchant_name VARCHAR(255), is_recurring BOOLEAN, metadata TEXT,"
+            " created_at TIMESTAMP, updated_at TIMESTAMP)"
+        )
+        yield conn
+
+
+def insert_rows(conn, organization_id, dates):
+    rows = [
+        {"id": uuid.uuid4(), "organization_id": organization_id, "transaction_date": day,
+         "amount": 1, "transaction_type": "income" if i % 2 else "expense"}
+        for i, day in enumerate(dates)
+    ]
+    conn.execute(insert(Transaction.__table__), rows)
+    return rows
+
+
+def pages(conn, limit, **filters):
+    cursor, seen = None, []
+    while True:
+        query = listing_query(ORG, parse_fields(None), limit, cursor=cursor, **filters)
+        page = paginate(conn.execute(query).mappings().all(), limit)
+        seen.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+class TestCursor:
+    def test_round_trip(self):
+        transaction_id = uuid.uuid4()
+        cursor = encode_cursor(date(2024, 2, 29), transaction_id)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (date(2024, 2, 29), transaction_id)
+
+    @pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(date(2024, 1, 1), uuid.uuid4())[:-4]])
+    def test_invalid_cursor_is_a_bad_request(self, cursor):
+        with pytest.raises(HTTPException) as excinfo:
+            decode_cursor(cursor)
+        assert excinfo.value.status_code == 400
+
+
+class TestParseFields:
+    def test_keyset_columns_are_always_returned(self):
+        assert parse_fields(None) == DEFAULT_FIELDS
+        assert parse_fields("amount, category") == ["amount", "category", "transaction_date", "id"]
+
+    def test_unknown_fields_are_rejected(self):
+        with pytest.raises(HTTPException, match="balance"):
+            parse_fields("amount,balance")
+
+
+class TestListing:
+    def test_pages_break_ties_on_id(self, connection):
+        start = date(2024, 1, 1)
+        # Three rows per day so page boundaries fall inside runs of equal dates
+        rows = insert_rows(connection, ORG, [start + timedelta(days=i // 3) for i in range(10)])
+        insert_rows(connection, OTHER_ORG, [start] * 3)
+
+        seen = pages(connection, limit=4)
+        assert [len(page) for page in seen] == [4, 4, 2]
+
+        listed = [(row["transaction_date"], row["id"]) for page in seen for row in page]
+        expected = sorted(((row["transaction_date"], row["id"]) for row in rows), reverse=True)
+        assert listed == expected
+
+    def test_exact_final_page_has_no_cursor(self, connection):
+        insert_rows(connection, ORG, [date(2024, 1, 1)] * 4)
+        assert [len(page) for page in pages(connection, limit=2)] == [2, 2]
+
+    def test_filters_apply_on_every_page(self, connection):
+        start = date(2024, 1, 1)
+        insert_rows(connection, ORG, [start + timedelta(days=i // 2) for i in range(12)])
+
+        seen = pages(connection, limit=2, start_date=start + timedelta(days=1),
+                     end_date=start + timedelta(days=4), transaction_type="income")
+        days = [row["transaction_date"] for page in seen for row in page]
+        assert days == [start + timedelta(days=i) for i in (4, 3, 2, 1)]
@@ -13,6 +13,7 @@ CREATE TYPE transaction_type AS ENUM ('income', 'expense', 'transfer');
 CREATE TYPE integration_status AS ENUM ('active', 'inactive', 'error', 'pending');
 CREATE TYPE forecast_status AS ENUM ('draft', 'active', 'archived');
 CREATE TYPE confidence_level AS ENUM ('low', 'medium', 'high');
+CREATE TYPE forecast_job_status AS ENUM ('queued', 'running', 'succeeded', 'failed', 'cancelled');
 
 -- Organizations table
 CREATE TABLE organizations (
@@ -99,7 +100,10 @@ CREATE TABLE transactions (
     tags TEXT[],
     metadata JSONB DEFAULT '{}',
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    updated_at TIMESTAMPTZ DEFAULT NOW()
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    -- Bulk ingest dedupe key; unique constraints on a hypertable must include
+    -- its partitioning column
+    CONSTRAINT uq_transactions_external_id UNIQUE (organization_id, external_id, transaction_date)
 );
 
 -- Convert to hypertable for time-series optimization
@@ -162,11 +166,33 @@ CREATE TABLE forecast_data_points (
     predicted_balance DECIMAL(15,2) DEFAULT 0,
     confidence_score DECIMAL(5,4), -- 0.0000 to 1.0000
     model_features JSONB DEFAULT '{}',
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT uq_forecast_data_points_forecast_date UNIQUE (forecast_id, date)
 );
 
 SELECT create_hypertable('forecast_data_points', 'date', if_not_exists => TRUE);
 
+-- Forecast Jobs table (queue for the out-of-process forecast runner)
+CREATE TABLE forecast_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    forecast_id UUID NOT NULL REFERENCES forecasts(id) ON DELETE CASCADE,
+    organization_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    status forecast_job_status NOT NULL DEFAULT 'queued',
+    parameters JSONB DEFAULT '{}',
+    progress REAL DEFAULT 0, -- 0 to 1
+    stage VARCHAR(50),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(), -- retry backoff
+    locked_by VARCHAR(255), -- runner host:pid
+    heartbeat_at TIMESTAMPTZ,
+    error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- Scenarios table
 CREATE TABLE scenarios (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -231,7 +257,8 @@ CREATE INDEX idx_organizations_active ON organizations(is_active);
 CREATE INDEX idx_users_organization_id ON users(organization_id);
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_bank_accounts_organization_id ON bank_accounts(organization_id);
-CREATE INDEX idx_transactions_organization_id ON transactions(organization_id);
+-- Keyset pagination of an organization's transactions; also serves organization-only lookups
+CREATE INDEX idx_transactions_org_date_id ON transactions(organization_id, transaction_date, id);
 CREATE INDEX idx_transactions_bank_account_id ON transactions(bank_account_id);
 CREATE INDEX idx_transactions_date ON transactions(transaction_date);
 CREATE INDEX idx_transactions_type ON transactions(transaction_type);
@@ -239,8 +266,10 @@ CREATE INDEX idx_transactions_category ON transactions(category);
 CREATE INDEX idx_categories_organization_id ON categories(organization_id);
 CREATE INDEX idx_budgets_organization_id ON budgets(organization_id);
 CREATE INDEX idx_forecasts_organization_id ON forecasts(organization_id);
-CREATE INDEX idx_forecast_data_points_forecast_id ON forecast_data_points(forecast_id);
 CREATE INDEX idx_forecast_data_points_date ON forecast_data_points(date);
+CREATE INDEX idx_forecast_jobs_queued ON forecast_jobs(run_after, created_at) WHERE status = 'queued';
+CREATE INDEX idx_forecast_jobs_running ON forecast_jobs(organization_id, heartbeat_at) WHERE status = 'running';
+CREATE INDEX idx_forecast_jobs_forecast_id ON forecast_jobs(forecast_id, created_at);
 CREATE INDEX idx_scenarios_forecast_id ON scenarios(forecast_id);
 CREATE INDEX idx_integrations_organization_id ON integrations(organization_id);
 CREATE INDEX idx_alerts_organization_id ON alerts(organization_id);
@@ -284,6 +313,62 @@ INSERT INTO categories (id, organization_id, name, type, is_system) VALUES
 (uuid_generate_v4(), '00000000-0000-0000-0000-000000000000', 'Technology', 'expense', TRUE),
 (uuid_generate_v4(), '00000000-0000-0000-0000-000000000000', 'Other Expenses', 'expense', TRUE);
 
+-- Daily cash flow feature store (continuous aggregate per organization/account/day).
+-- Real-time aggregation serves days not yet materialized; back-dated edits are
+-- re-materialized by the refresh policy or an explicit refresh_continuous_aggregate.
+CREATE MATERIALIZED VIEW daily_cash_flow
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    t.organization_id,
+    t.bank_account_id,
+    time_bucket(INTERVAL '1 day', t.transaction_date) AS day,
+    SUM(CASE WHEN t.transaction_type = 'income' THEN t.amount ELSE 0 END) AS total_inflow,
+    SUM(CASE WHEN t.transaction_type = 'expense' THEN t.amount ELSE 0 END) AS total_outflow,
+    COUNT(*) AS transaction_count
+FROM transactions t
+GROUP BY t.organization_id, t.bank_account_id, time_bucket(INTERVAL '1 day', t.transaction_date)
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('daily_cash_flow',
+    start_offset => INTERVAL '30 days',
+    end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 hour');
+
+CREATE INDEX idx_daily_cash_flow_organization_day ON daily_cash_flow(organization_id, day);
+
+-- Last change to each organization's transactions per day, deletes included;
+-- the feature store re-reads days changed since its last load. One row per
+-- organization and day, so the table stays small without pruning.
+CREATE TABLE transaction_changes (
+    organization_id UUID NOT NULL,
+    day DATE NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (organization_id, day)
+);
+
+CREATE INDEX idx_transaction_changes_changed_at ON transaction_changes(organization_id, changed_at);
+
+CREATE OR REPLACE FUNCTION record_transaction_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO transaction_changes (organization_id, day)
+        VALUES (OLD.organization_id, OLD.transaction_date)
+        ON CONFLICT (organization_id, day) DO UPDATE SET changed_at = NOW();
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO transaction_changes (organization_id, day)
+        VALUES (NEW.organization_id, NEW.transaction_date)
+        ON CONFLICT (organization_id, day) DO UPDATE SET changed_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Row-level: hypertables do not support transition tables
+CREATE TRIGGER record_transactions_change AFTER INSERT OR UPDATE OR DELETE ON transactions
+    FOR EACH ROW EXECUTE FUNCTION record_transaction_change();
+
 -- Create views for common queries
 CREATE VIEW current_cash_position AS
 SELECT 